@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+    Runs the list and download actions end to end against a local stand-in
+    for the Humble Bundle API and its file servers (see local_humble.py), and
+    writes the results to a JSON file so that they can be compared across
+    commits.
+
+    Scenarios, each run in a process of its own so that its peak memory is
+    its own:
+
+    list:  Action.list_downloads, i.e. retrieving and printing every order.
+    download:  Action.batch_download into an empty library.  Discovery is
+    the time until the first file starts downloading.
+    rehash:  Action.batch_download again, every file being present and
+    hashed, as MD5 files are disabled.
+
+    Usage:  python3 benchmarks/end_to_end_benchmark.py [--orders N]
+            [--file_size KiB] [--latency ms] [--output results.json]
+"""
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                ".."))
+
+from benchmarks.local_humble import LocalHumble  # noqa: E402
+import hb_downloader.logger as logger  # noqa: E402
+from hb_downloader.actions import Action  # noqa: E402
+from hb_downloader.config_data import ConfigData  # noqa: E402
+from hb_downloader.configuration import Configuration  # noqa: E402
+from hb_downloader.humble_api.events import Events  # noqa: E402
+from hb_downloader.humble_api.humble_api import HumbleApi  # noqa: E402
+
+__license__ = "MIT"
+
+SCENARIOS = ["list", "download", "rehash"]
+
+
+def configure(library, options):
+    """ Configures hb-downloader like the command line would. """
+    ConfigData.download_location = library
+    ConfigData.engine = options["engine"]
+    ConfigData.order_workers = options["order_workers"]
+    ConfigData.hash_workers = options["hash_workers"]
+    ConfigData.download_workers = options["download_workers"]
+    ConfigData.segment_threshold = options["segment_threshold"]
+    ConfigData.segment_count = options["segment_count"]
+    # Every file must be hashed by the rehash scenario.
+    ConfigData.write_md5 = False
+    ConfigData.read_md5 = False
+    ConfigData.order_cache_directory = ""
+    ConfigData.state_database = ""
+    Configuration.push_configuration()
+
+
+def run_scenario(name, base_url, directory, options, results):
+    """
+        Runs a scenario and puts its measurements in the results queue.  It
+        runs in a process of its own.
+    """
+    # The log file is written to the working directory.
+    os.chdir(directory)
+    configure(os.path.join(directory, "library"), options)
+    HumbleApi.ORDER_LIST_URL, HumbleApi.ORDER_URL = LocalHumble.api_urls(
+            base_url)
+
+    first_download = []
+    Events.on(Events.EVENT_DOWNLOAD_START,
+              lambda filename: first_download or first_download.append(
+                      time.perf_counter()))
+
+    with open(os.devnull, "w") as devnull, \
+            contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        cpu_start = time.process_time()
+        hapi = HumbleApi("benchmark")
+        game_keys = hapi.get_gamekeys()
+        if name == "list":
+            Action.list_downloads(hapi, game_keys)
+        else:
+            Action.batch_download(hapi, game_keys)
+        elapsed = time.perf_counter() - start
+        cpu = time.process_time() - cpu_start
+        # The messages still queued are printed to devnull too.
+        logger.flush()
+
+    result = {"seconds": elapsed, "cpu_seconds": cpu, "peak_rss_mib": None}
+    if resource is not None:
+        # Kilobytes on Linux, bytes on macOS.
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if sys.platform == "darwin":
+            peak /= 1024
+        result["peak_rss_mib"] = peak / 1024
+
+    size = 1024 * 1024
+    if name == "list":
+        result["discovery_seconds"] = elapsed
+        result["orders_per_second"] = len(game_keys) / elapsed
+    elif name == "download":
+        discovery = (first_download[0] - start) if first_download else elapsed
+        transfer = max(elapsed - discovery, 1e-9)
+        result["discovery_seconds"] = discovery
+        result["transfer_seconds"] = transfer
+        result["download_mib_per_second"] = \
+            library_size(directory) / size / transfer
+    else:
+        result["hash_mib_per_second"] = library_size(directory) / size / elapsed
+    result["files"] = library_files(directory)
+
+    results.put(result)
+
+
+def library_files(directory):
+    return sum(len(files) for _, _, files in
+               os.walk(os.path.join(directory, "library")))
+
+
+def library_size(directory):
+    return sum(os.path.getsize(os.path.join(root, filename))
+               for root, _, files in os.walk(os.path.join(directory, "library"))
+               for filename in files)
+
+
+def commit():
+    """ Returns the commit being benchmarked, if known. """
+    try:
+        return subprocess.check_output(
+                ["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL,
+                cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--orders", type=int, default=40,
+                        help="Number of orders of the synthetic account.")
+    parser.add_argument("--files_per_order", type=int, default=4,
+                        help="Number of files per order.")
+    parser.add_argument("--file_size", type=int, default=2048,
+                        help="Size of every file, in KiB.")
+    parser.add_argument("--latency", type=float, default=0,
+                        help="Delay before every response, in milliseconds.")
+    parser.add_argument("--bandwidth", type=int, default=0,
+                        help="Maximum rate of a single transfer, in KiB/s. "
+                             "0 means no limit.")
+    parser.add_argument("--no_range", action="store_true",
+                        help="The file server ignores Range requests.")
+    parser.add_argument("--engine", default="sync", choices=["sync", "async"])
+    parser.add_argument("--order_workers", type=int,
+                        default=ConfigData.order_workers)
+    parser.add_argument("--hash_workers", type=int,
+                        default=ConfigData.hash_workers)
+    parser.add_argument("--download_workers", type=int, default=4)
+    parser.add_argument("--segment_threshold", type=int, default=0,
+                        help="Files of at least this many bytes are "
+                             "downloaded in segments.")
+    parser.add_argument("--segment_count", type=int,
+                        default=ConfigData.segment_count)
+    parser.add_argument("--scenarios", nargs="+", default=SCENARIOS,
+                        choices=SCENARIOS)
+    parser.add_argument("--output", default="end_to_end_benchmark.json",
+                        help="The JSON file the results are written to.")
+    args = parser.parse_args()
+
+    options = {"engine": args.engine,
+               "order_workers": args.order_workers,
+               "hash_workers": args.hash_workers,
+               "download_workers": args.download_workers,
+               "segment_threshold": args.segment_threshold,
+               "segment_count": args.segment_count}
+    report = {"commit": commit(),
+              "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+              "python": platform.python_version(),
+              "platform": platform.platform(),
+              "parameters": dict(vars(args)),
+              "results": {}}
+
+    context = multiprocessing.get_context("spawn")
+    with LocalHumble(args.orders, args.files_per_order, args.file_size * 1024,
+                     args.latency / 1000, args.bandwidth * 1024,
+                     not args.no_range) as server, \
+            tempfile.TemporaryDirectory() as directory:
+        print("%d orders, %d files, %.1f MiB" %
+              (args.orders, args.orders * args.files_per_order,
+               server.total_size / (1024 * 1024)))
+        print("%-10s %10s %10s %12s %12s %10s" %
+              ("scenario", "seconds", "discovery", "MiB/s", "peak MiB",
+               "requests"))
+
+        for name in args.scenarios:
+            requests_before = server.requests
+            results = context.Queue()
+            process = context.Process(
+                    target=run_scenario,
+                    args=(name, server.base_url, directory, options, results))
+            process.start()
+            result = results.get()
+            process.join()
+            result["requests"] = server.requests - requests_before
+            report["results"][name] = result
+
+            print("%-10s %10.3f %10s %12s %12s %10d" % (
+                    name, result["seconds"],
+                    "%.3f" % result["discovery_seconds"]
+                    if "discovery_seconds" in result else "",
+                    "%.1f" % result.get("download_mib_per_second",
+                                        result.get("hash_mib_per_second"))
+                    if name != "list" else "",
+                    "%.1f" % result["peak_rss_mib"]
+                    if result["peak_rss_mib"] is not None else "",
+                    result["requests"]))
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print("Results written to %s" % args.output)
+
+
+if __name__ == "__main__":
+    main()
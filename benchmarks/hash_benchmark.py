@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+    Compares the throughput of HumbleHash.calculate_checksum with the
+    implementation it replaced, which allocated a new bytes object for every
+    chunk read.
+
+    Usage:  python3 benchmarks/hash_benchmark.py [--size MiB] [--runs N]
+"""
+import argparse
+import hashlib
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                ".."))
+
+from hb_downloader.humble_api.humble_hash import HumbleHash  # noqa: E402
+
+__license__ = "MIT"
+
+
+def legacy_checksum(full_filename):
+    """ The read loop HumbleHash.calculate_checksum used to run. """
+    md5_hash = hashlib.md5()
+    with open(full_filename, "rb") as f:
+        while True:
+            data = f.read(HumbleHash.chunk_size)
+            if not data:
+                break
+            md5_hash.update(data)
+    return md5_hash.hexdigest()
+
+
+def current_checksum(full_filename):
+    """ The read loop of HumbleHash.calculate_checksum, without the MD5 file. """
+    write_md5 = HumbleHash.write_md5
+    HumbleHash.write_md5 = False
+    try:
+        return HumbleHash.calculate_checksum(full_filename)
+    finally:
+        HumbleHash.write_md5 = write_md5
+
+
+def measure(function, full_filename, runs):
+    """
+        Runs a checksum function several times.
+
+        :return:  A tuple of the checksum, the best throughput in MiB/s and
+        the peak memory allocated by Python during a run, in bytes.
+    """
+    best = None
+    peak = 0
+    checksum = None
+    size = os.path.getsize(full_filename)
+
+    for _ in range(runs):
+        tracemalloc.start()
+        start = time.perf_counter()
+        checksum = function(full_filename)
+        elapsed = time.perf_counter() - start
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        best = elapsed if best is None else min(best, elapsed)
+
+    return checksum, size / (1024 * 1024) / best, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=512,
+                        help="Size of the file to hash, in MiB.")
+    parser.add_argument("--runs", type=int, default=3,
+                        help="Number of runs of each implementation.")
+    parser.add_argument("--chunk_size", type=int,
+                        default=HumbleHash.chunk_size,
+                        help="The size of a single read.")
+    args = parser.parse_args()
+
+    HumbleHash.chunk_size = args.chunk_size
+
+    with tempfile.TemporaryDirectory() as directory:
+        full_filename = os.path.join(directory, "benchmark.bin")
+        with open(full_filename, "wb") as f:
+            block = os.urandom(1024 * 1024)
+            for _ in range(args.size):
+                f.write(block)
+
+        results = [("legacy read()", measure(legacy_checksum, full_filename,
+                                             args.runs)),
+                   ("readinto()", measure(current_checksum, full_filename,
+                                          args.runs))]
+
+    if results[0][1][0] != results[1][1][0]:
+        sys.exit("Checksums differ: %s / %s" %
+                 (results[0][1][0], results[1][1][0]))
+
+    print("%-16s %12s %16s" % ("implementation", "MiB/s", "peak alloc (KiB)"))
+    for name, (_, throughput, peak) in results:
+        print("%-16s %12.1f %16.1f" % (name, throughput, peak / 1024))
+
+
+if __name__ == "__main__":
+    main()
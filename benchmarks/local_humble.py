@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+    A local stand-in for the Humble Bundle API and its file servers, serving a
+    synthetic account over HTTP so that hb-downloader can be benchmarked
+    without network access or an account.
+
+        with LocalHumble(orders=50, files_per_order=4) as server:
+            server.patch()
+            hapi = HumbleApi("cookie")
+            ...
+
+    /api/v1/user/order  The gamekeys of the account, like ORDER_LIST_URL.
+    /api/v1/order/KEY   The order KEY, like ORDER_URL.
+    /cdn/NAME           The files, with optional Range support.
+
+    Every file has its own deterministic content, generated on the fly, so
+    serving large files doesn't use memory and no two files are identical.
+"""
+import hashlib
+import json
+import random
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import urlparse
+
+__license__ = "MIT"
+
+# Every file repeats a random block of this size.
+BLOCK_SIZE = 64 * 1024
+
+PLATFORMS = ["windows", "mac", "linux", "ebook", "audio"]
+
+
+class LocalHumble(object):
+    """
+        Serves a synthetic account on a local port, on a thread of its own.
+    """
+
+    def __init__(self, orders=20, files_per_order=4, file_size=1024 * 1024,
+                 latency=0.0, bandwidth=0, range_support=True):
+        """
+            Parameterized constructor for the LocalHumble.
+
+            :param int orders:  The number of orders of the account.
+            :param int files_per_order:  The number of files of each order.
+            :param int file_size:  The size of every file, in bytes.
+            :param float latency:  The delay before every response, in
+            seconds.
+            :param int bandwidth:  The maximum rate of a single file transfer,
+            in bytes per second.  0 means no limit.
+            :param bool range_support:  Whether Range requests are honored.
+        """
+        self.orders = orders
+        self.files_per_order = files_per_order
+        self.file_size = file_size
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.range_support = range_support
+        self.requests = 0
+        self.bytes_sent = 0
+        self.__lock = threading.Lock()
+        self.__server = None
+        self.__patched = None
+        self.__md5s = {}
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+        return False
+
+    @property
+    def base_url(self):
+        return "http://127.0.0.1:%d" % self.__server.server_port
+
+    @property
+    def total_size(self):
+        """ The size of every file of the account, in bytes. """
+        return self.orders * self.files_per_order * self.file_size
+
+    def start(self):
+        """ Calculates the checksums of the files and starts serving. """
+        for order in range(self.orders):
+            for index in range(self.files_per_order):
+                name = LocalHumble.filename(order, index)
+                md5_hash = hashlib.md5()
+                for chunk in self.content(name, 0, self.file_size):
+                    md5_hash.update(chunk)
+                self.__md5s[name] = md5_hash.hexdigest()
+
+        self.__server = _Server(("127.0.0.1", 0), _Handler)
+        self.__server.humble = self
+        threading.Thread(target=self.__server.serve_forever,
+                         daemon=True).start()
+
+    def stop(self):
+        """ Stops serving and restores the URLs of HumbleApi. """
+        self.unpatch()
+        if self.__server is not None:
+            self.__server.shutdown()
+            self.__server.server_close()
+            self.__server = None
+
+    def patch(self):
+        """ Points HumbleApi to the local server. """
+        from hb_downloader.humble_api.humble_api import HumbleApi
+
+        if self.__patched is None:
+            self.__patched = (HumbleApi.ORDER_LIST_URL, HumbleApi.ORDER_URL)
+        HumbleApi.ORDER_LIST_URL, HumbleApi.ORDER_URL = LocalHumble.api_urls(
+                self.base_url)
+
+    def unpatch(self):
+        """ Restores the URLs of HumbleApi. """
+        from hb_downloader.humble_api.humble_api import HumbleApi
+
+        if self.__patched is not None:
+            HumbleApi.ORDER_LIST_URL, HumbleApi.ORDER_URL = self.__patched
+            self.__patched = None
+
+    def gamekeys(self):
+        return [{"gamekey": LocalHumble.gamekey(order)}
+                for order in range(self.orders)]
+
+    def order(self, key):
+        """
+            Builds the JSON data of an order, shaped like the real responses.
+
+            :return:  The order, or None if the key is unknown.
+        """
+        try:
+            order = int(key[len("key"):])
+        except ValueError:
+            return None
+        if not 0 <= order < self.orders:
+            return None
+
+        # The URLs carry an expiry date far in the future, so they are never
+        # refreshed.
+        ttl = int(time.time()) + 86400
+        return {
+            "gamekey": key,
+            "created": "2016-01-%02dT00:00:00" % (order % 28 + 1),
+            "product": {"machine_name": "bundle%d" % order,
+                        "human_name": "Bundle %d" % order,
+                        "category": "bundle"},
+            "subscriptions": [],
+            "subproducts": [{
+                "machine_name": "game%d_%d" % (order, index),
+                "human_name": "Game %d %d" % (order, index),
+                "payee": {"machine_name": "dev", "human_name": "Developer"},
+                "downloads": [{
+                    "machine_name": "game%d_%d" % (order, index),
+                    "platform": PLATFORMS[index % len(PLATFORMS)],
+                    "options_dict": {},
+                    "download_struct": [{
+                        "name": "Download",
+                        "md5": self.__md5s[name],
+                        "file_size": self.file_size,
+                        "human_size": "%d bytes" % self.file_size,
+                        "url": {"web": "%s/cdn/%s?gamekey=%s&ttl=%d" %
+                                       (self.base_url, name, key, ttl)}}]}]}
+                for index, name in (
+                    (index, LocalHumble.filename(order, index))
+                    for index in range(self.files_per_order))]}
+
+    def content(self, name, start, end):
+        """
+            Generates a part of the content of a file.
+
+            :return:  A generator of chunks of at most BLOCK_SIZE bytes.
+        """
+        block = random.Random(name).getrandbits(BLOCK_SIZE * 8).to_bytes(
+                BLOCK_SIZE, "little")
+        position = start
+        while position < end:
+            offset = position % BLOCK_SIZE
+            chunk = block[offset:min(BLOCK_SIZE, offset + end - position)]
+            position += len(chunk)
+            yield chunk
+
+    def record(self, sent):
+        with self.__lock:
+            self.requests += 1
+            self.bytes_sent += sent
+
+    @staticmethod
+    def api_urls(base_url):
+        """
+            Returns the URLs of the API of a local server, to be assigned to
+            HumbleApi.ORDER_LIST_URL and HumbleApi.ORDER_URL, e.g. in another
+            process.
+        """
+        return (base_url + "/api/v1/user/order",
+                base_url + "/api/v1/order/{order_id}")
+
+    @staticmethod
+    def gamekey(order):
+        return "key%06d" % order
+
+    @staticmethod
+    def filename(order, index):
+        return "file%06d_%d.bin" % (order, index)
+
+
+class _Server(socketserver.ThreadingMixIn, HTTPServer):
+    """ Serves every request on a thread of its own. """
+    daemon_threads = True
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """ Serves the API and the files of the LocalHumble of the server. """
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        humble = self.server.humble
+        if humble.latency > 0:
+            time.sleep(humble.latency)
+
+        path = urlparse(self.path).path
+        if path == "/api/v1/user/order":
+            self.__send_json(humble.gamekeys())
+        elif path.startswith("/api/v1/order/"):
+            self.__send_json(humble.order(path[len("/api/v1/order/"):]))
+        elif path.startswith("/cdn/"):
+            self.__send_file(humble, path[len("/cdn/"):])
+        else:
+            self.__send_json(None)
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header("Content-Length", str(self.server.humble.file_size))
+        self.send_header("Last-Modified", "Fri, 01 Jan 2016 00:00:00 GMT")
+        self.end_headers()
+
+    def __send_json(self, data):
+        if data is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            self.server.humble.record(0)
+            return
+
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.humble.record(len(body))
+
+    def __send_file(self, humble, name):
+        start, end = 0, humble.file_size
+        requested = self.headers.get("Range")
+        if humble.range_support and requested:
+            first, _, last = requested[len("bytes="):].partition("-")
+            start = int(first)
+            if last:
+                end = min(end, int(last) + 1)
+            self.send_response(206)
+            self.send_header("Content-Range", "bytes %d-%d/%d" %
+                             (start, end - 1, humble.file_size))
+        else:
+            self.send_response(200)
+        self.send_header("Content-Length", str(end - start))
+        self.send_header("Accept-Ranges",
+                         "bytes" if humble.range_support else "none")
+        self.end_headers()
+
+        sent = 0
+        began = time.perf_counter()
+        try:
+            for chunk in humble.content(name, start, end):
+                self.wfile.write(chunk)
+                sent += len(chunk)
+                if humble.bandwidth > 0:
+                    ahead = sent / humble.bandwidth - (time.perf_counter() -
+                                                       began)
+                    if ahead > 0:
+                        time.sleep(ahead)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        humble.record(sent)
+
+    def log_message(self, *args):
+        pass
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+    Measures the time and memory needed to build the order models of a large
+    account, and to walk them the way the list and download actions do.
+
+    Usage:  python3 benchmarks/model_benchmark.py [--orders N] [--runs N]
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                ".."))
+
+from hb_downloader.humble_api.model.base_model import BaseModel  # noqa: E402
+from hb_downloader.humble_api.model.order import Order  # noqa: E402
+
+__license__ = "MIT"
+
+
+def synthetic_order(index, subproducts, downloads, structs):
+    """ Builds the JSON data of an order shaped like the real responses. """
+    return {
+        "gamekey": "key%06d" % index,
+        "created": "2016-01-01T00:00:00",
+        "amount_to_charge": 12.0,
+        "product": {"machine_name": "bundle%d" % index,
+                    "human_name": "Bundle %d" % index,
+                    "category": "bundle"},
+        "subscriptions": [],
+        "subproducts": [{
+            "machine_name": "game%d_%d" % (index, s),
+            "human_name": "Game %d %d" % (index, s),
+            "url": "https://www.example.com/game%d_%d" % (index, s),
+            "icon": "https://www.example.com/game%d_%d.png" % (index, s),
+            "payee": {"machine_name": "dev%d" % s,
+                      "human_name": "Developer %d" % s},
+            "downloads": [{
+                "machine_name": "game%d_%d_%d" % (index, s, d),
+                "platform": ["windows", "mac", "linux", "ebook"][d % 4],
+                "options_dict": {},
+                "download_struct": [{
+                    "name": "Download %d" % t,
+                    "md5": "%032x" % (index * 1000 + s * 100 + d * 10 + t),
+                    "sha1": "%040x" % t,
+                    "file_size": 1024 * 1024 * (t + 1),
+                    "human_size": "%d MB" % (t + 1),
+                    "timestamp": 1500000000 + t,
+                    "url": {
+                        "web": "https://dl.example.com/game%d_%d_%d_%d.zip"
+                               "?gamekey=key%06d&ttl=1500000000&t=abcdef"
+                               % (index, s, d, t, index),
+                        "bittorrent": "https://dl.example.com/game%d_%d_%d_%d"
+                                      ".zip.torrent" % (index, s, d, t)}}
+                    for t in range(structs)]}
+                for d in range(downloads)]}
+            for s in range(subproducts)]}
+
+
+def list_products(orders):
+    """ Reads the fields the list action prints for an order only. """
+    return sum(len(order.product.human_name) for order in orders)
+
+
+def walk_files(orders):
+    """ Reads every field the download action uses. """
+    total = 0
+    for order in orders:
+        for subproduct in order.subproducts or []:
+            for download in subproduct.downloads or []:
+                for ds in download.download_structs:
+                    total += len(ds.filename) + len(subproduct.product_name)
+                    total += len(ds.timestamp) + len(download.platform)
+    return total
+
+
+def measure(payloads, walk, retain_data, runs):
+    """
+        Parses and builds the orders, then walks them, several times.  Like
+        HumbleApi.get_order, the parsed JSON is only referenced by the models.
+
+        :return:  A tuple of the best time in seconds and the memory retained
+        by the models after the walk, in bytes.
+    """
+    BaseModel.retain_data = retain_data
+    best = None
+
+    for _ in range(runs):
+        gc.collect()
+        start = time.perf_counter()
+        walk([Order(json.loads(payload)) for payload in payloads])
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    # Memory is measured separately, tracing allocations slows everything down.
+    gc.collect()
+    tracemalloc.start()
+    orders = [Order(json.loads(payload)) for payload in payloads]
+    walk(orders)
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del orders
+
+    return best, retained
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--orders", type=int, default=1500,
+                        help="Number of orders of the synthetic account.")
+    parser.add_argument("--subproducts", type=int, default=8,
+                        help="Number of subproducts per order.")
+    parser.add_argument("--downloads", type=int, default=3,
+                        help="Number of downloads per subproduct.")
+    parser.add_argument("--structs", type=int, default=2,
+                        help="Number of files per download.")
+    parser.add_argument("--runs", type=int, default=3,
+                        help="Number of runs of each scenario.")
+    args = parser.parse_args()
+
+    payloads = [json.dumps(synthetic_order(i, args.subproducts, args.downloads,
+                                           args.structs))
+                for i in range(args.orders)]
+    files = args.orders * args.subproducts * args.downloads * args.structs
+    print("%d orders, %d files" % (args.orders, files))
+
+    print("%-28s %10s %10s %18s" % ("scenario", "seconds", "files/s",
+                                    "model memory (MiB)"))
+    for name, walk, retain_data in [
+            ("list, lazy", list_products, False),
+            ("download, lazy", walk_files, False),
+            ("download, raw data (debug)", walk_files, True)]:
+        elapsed, retained = measure(payloads, walk, retain_data, args.runs)
+        print("%-28s %10.3f %10.0f %18.1f" % (name, elapsed, files / elapsed,
+                                              retained / (1024 * 1024)))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,15 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
+import atexit
 import os
 import hb_downloader.logger as logger
 from hb_downloader.config_data import ConfigData
 from hb_downloader.configuration import Configuration
 from hb_downloader.event_handler import EventHandler
 from hb_downloader.humble_api.humble_api import HumbleApi
+from hb_downloader.humble_api.profiler import Profiler
 from hb_downloader.actions import Action
+from hb_downloader.metrics_exporter import MetricsExporter
 
 __author__ = "Brian Schkerke"
 __copyright__ = "Copyright 2020 Brian Schkerke"
@@ -65,6 +68,26 @@ if not validation_status:
 # Initialize the event handlers.
 EventHandler.initialize()
 
+# The report is written however the run exits.
+if ConfigData.profile:
+    Profiler.start(ConfigData.profiler)
+    atexit.register(lambda: logger.display_message(
+        False, "Profile", "Profile written to %s" %
+        Profiler.stop(os.path.expanduser(ConfigData.profile_output))))
+
+if ConfigData.metrics_textfile or ConfigData.metrics_port:
+    exporter = MetricsExporter(
+            os.path.expanduser(ConfigData.metrics_textfile),
+            ConfigData.metrics_port, ConfigData.metrics_address,
+            ConfigData.metrics_interval)
+    exporter.start()
+    atexit.register(exporter.stop)
+
+# Importing MD5 files works offline, no need to log in.
+if ConfigData.action == "import-md5":
+    Action.import_md5_files()
+    exit()
+
 hapi = HumbleApi(ConfigData.auth_sess_cookie)
 
 if not hapi.check_login():
@@ -84,6 +107,8 @@ elif ConfigData.action == "download-product":
     else:
         exit("Specified product key '" + ConfigData.download_product + "' was not found. These are the valid keys:\n" +
             ', '.join(game_keys))
+elif ConfigData.action == "verify":
+    Action.verify_library(hapi, game_keys)
 else:
     Action.list_downloads(hapi, game_keys)
 
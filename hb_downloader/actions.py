@@ -3,18 +3,47 @@
 
 __license__ = "MIT"
 
+from concurrent.futures import ThreadPoolExecutor
+from hb_downloader.async_engine import AsyncEngine
+from hb_downloader.download_engine import DownloadEngine
+from hb_downloader.deduplicator import Deduplicator
+from hb_downloader.download_scheduler import DownloadScheduler
+from hb_downloader.humble_download import DownloadUrlRefresher
 from hb_downloader.humble_download import HumbleDownload
+from hb_downloader.library_verifier import LibraryVerifier
 from hb_downloader.progress_tracker import ProgressTracker
 from hb_downloader.config_data import ConfigData
+from hb_downloader.humble_api.file_info_prober import FileInfoProber
+from hb_downloader.humble_api.humble_api import HumbleApi
+from hb_downloader.humble_api.humble_hash import HumbleHash
+from hb_downloader.humble_api.retry_policy import CircuitBreaker
 from hb_downloader import logger
 
 
 class Action:
     @staticmethod
     def list_downloads(hapi, game_keys):
-        for key in game_keys:
+        orders = []
+        for key, current_order, error in Action.map_orders(
+                lambda hapi, key: hapi.get_order(key), hapi, game_keys):
+            if error is not None:
+                logger.display_message(
+                        False, "Error",
+                        "Failed to retrieve order details for order %s: %s" %
+                        (key, error))
+                continue
+            orders.append((key, current_order))
+
+        # The files of every order are probed at once, as a single HEAD
+        # request per file is slow.
+        if ConfigData.get_extra_file_info:
+            HumbleApi.file_info_prober.probe(FileInfoProber.download_structs(
+                    [current_order for _, current_order in orders]))
+
+        # The listing is printed directly, after the messages logged so far.
+        logger.flush()
+        for key, current_order in orders:
             selector_matched_key_once = False
-            current_order = hapi.get_order(key, ConfigData.get_extra_file_info)
 
             for current_subproduct in current_order.subproducts or []:
                 selector_matched_subproduct_once = False
@@ -47,6 +76,84 @@ class Action:
                                                  dl_struct.download_web)
                         print(string)
 
+    @staticmethod
+    def import_md5_files():
+        """
+            Records the MD5 files found in the download location in the state
+            database.
+        """
+        if HumbleHash.state_store is None:
+            logger.display_message(
+                    False, "Error",
+                    "No state database is configured (state_database).")
+            return
+
+        logger.display_message(
+                False, "Processing", "Importing MD5 files from %s." %
+                ConfigData.download_location)
+        imported = HumbleHash.state_store.import_md5_files(
+                ConfigData.download_location)
+        logger.display_message(
+                False, "Processing", "%d MD5 files imported into %s." %
+                (imported, HumbleHash.state_store.database_filename))
+
+    @staticmethod
+    def verify_library(hapi, game_keys):
+        """
+            Verifies every file of the library expected in the download
+            location and writes a report of the missing, truncated and
+            mismatched ones.
+        """
+        humble_downloads = []
+        for key, downloads, error in Action.map_orders(
+                HumbleDownload.downloads_from_key, hapi, game_keys):
+            if error is not None:
+                logger.display_message(
+                        False, "Error",
+                        "Failed to retrieve order details for order %s, its "
+                        "files won't be verified: %s" % (key, error))
+                continue
+            humble_downloads.extend(downloads)
+
+        verifier = LibraryVerifier(ConfigData.verify_report,
+                                   ConfigData.hash_workers)
+        problems = verifier.run(humble_downloads)
+
+        for problem in problems:
+            logger.display_message(
+                    False, "Verify", "%s: %s" %
+                    (problem["status"], problem["path"]))
+        logger.display_message(
+                False, "Verify",
+                "%d of %d files are missing, truncated or mismatched. "
+                "Report written to %s." %
+                (len(problems), len(humble_downloads),
+                 ConfigData.verify_report))
+
+    @staticmethod
+    def map_orders(function, hapi, game_keys):
+        """
+            Applies function(hapi, key) to every key on a pool of
+            ConfigData.order_workers threads sharing the same HumbleApi.
+
+            :param function:  The function retrieving and processing an order.
+            :param hapi:  The HumbleApi used to retrieve the orders.
+            :param game_keys:  The keys of the orders to process.
+            :return:  A generator of (key, result, error) tuples in the same
+            order as game_keys.  error is None unless function raised, in which
+            case result is None.
+        """
+        def safe_call(key):
+            try:
+                return key, function(hapi, key), None
+            except Exception as e:
+                return key, None, e
+
+        with ThreadPoolExecutor(
+                max_workers=max(1, ConfigData.order_workers)) as executor:
+            for result in executor.map(safe_call, game_keys):
+                yield result
+
     @staticmethod
     def batch_download(hapi, game_keys):
         ProgressTracker.reset()
@@ -54,50 +161,115 @@ class Action:
         download_size_total = 0
         item_count_total = 0
         key_downloads = dict()
+        failed_keys = []
         # Create initial list of Humble Downloads.
         # Platforms that are turned off are filtered here, and the download
         # size is computed. Checksums are also calculated for finished
-        # downloads. This initial query could be paralelized for speed gains
-        for key in game_keys[::-1]:
-            ProgressTracker.item_count_current += 1
+        # downloads. Orders are retrieved in parallel while the checksums of
+        # the orders already retrieved are calculated on a separate pool, but
+        # the results are processed in the original order.
+        # Shared by the downloads from every host.
+        circuit_breaker = CircuitBreaker(ConfigData.circuit_breaker_threshold,
+                                         ConfigData.circuit_breaker_cooldown)
+        async_engine = None
+        if ConfigData.engine == "async":
+            async_engine = AsyncEngine(ConfigData.auth_sess_cookie,
+                                       ConfigData.order_workers,
+                                       ConfigData.download_workers,
+                                       ConfigData.host_connections,
+                                       HumbleApi.retry_policy,
+                                       circuit_breaker)
+
+        with ThreadPoolExecutor(
+                max_workers=max(1, ConfigData.hash_workers)) as hash_executor:
+            def retrieve_order(hapi, key):
+                return HumbleDownload.submit_status_checks(
+                        hash_executor,
+                        HumbleDownload.downloads_from_key(hapi, key))
+
+            def process_order(order, key):
+                return HumbleDownload.submit_status_checks(
+                        hash_executor,
+                        HumbleDownload.downloads_from_order(order, key))
+
+            if async_engine is not None:
+                orders = async_engine.map_orders(process_order,
+                                                 game_keys[::-1])
+            else:
+                orders = Action.map_orders(retrieve_order, hapi,
+                                           game_keys[::-1])
+
+            for key, needed_downloads, error in orders:
+                ProgressTracker.item_count_current += 1
+                if error is None:
+                    try:
+                        humble_downloads = needed_downloads()
+                    except Exception as e:
+                        error = e
+
+                if error is not None:
+                    failed_keys.append(key)
+                    logger.display_message(
+                            False, "Error",
+                            "Failed to retrieve order details for order %s "
+                            "(%d/%d): %s" %
+                            (key, ProgressTracker.item_count_current,
+                             ProgressTracker.item_count_total, error))
+                    continue
+
+                logger.display_message(
+                        False, "Processing",
+                        "Retrieved order details for order %s (%d/%d)." %
+                        (key, ProgressTracker.item_count_current,
+                         ProgressTracker.item_count_total))
+
+                item_count_total += len(humble_downloads)
+                download_size_total += sum(
+                        dl.humble_file_size for dl in humble_downloads)
+                logger.display_message(False, "Processing",
+                                       "Added %d downloads for order %s"
+                                       % (len(humble_downloads), key))
+
+                if len(humble_downloads) > 0:
+                    key_downloads[key] = humble_downloads
+
+        if len(failed_keys) > 0:
             logger.display_message(
-                    False, "Processing",
-                    "Retrieving order details for order %s (%d/%d)." %
-                    (key, ProgressTracker.item_count_current,
-                     ProgressTracker.item_count_total))
-
-            humble_downloads = HumbleDownload.needed_downloads_from_key(hapi,
-                                                                        key)
-            item_count_total += len(humble_downloads)
-            download_size_total += sum(
-                    dl.humble_file_size for dl in humble_downloads)
-            logger.display_message(False, "Processing",
-                                   "Added %d downloads for order %s"
-                                   % (len(humble_downloads), key))
-
-            if len(humble_downloads) > 0:
-                key_downloads[key] = humble_downloads
+                    False, "Error",
+                    "%d orders could not be retrieved and will be skipped: %s"
+                    % (len(failed_keys), ", ".join(failed_keys)))
 
         ProgressTracker.reset()
         ProgressTracker.item_count_total = item_count_total
         ProgressTracker.download_size_total = download_size_total
 
         # Now, download the files after updating the url in case they expired
-        for key in key_downloads:
-            HumbleDownload.update_download_list_url(
-                    hapi, key_downloads.get(key))
-            for hd in key_downloads.get(key):
-                ProgressTracker.assign_download(hd)
-                ProgressTracker.display_summary()
-                logger.display_message(False, "Download", hd.status_message)
-                logger.display_message(
-                        False, "Download",
-                        "Downloading %s." % hd.humble_file_size_human)
-                hd.download_file()
+        humble_downloads = DownloadScheduler(
+                ConfigData.download_policy,
+                ConfigData.platform_priority).schedule(key_downloads)
+        # Identical files are only downloaded once.
+        deduplicator = Deduplicator(ConfigData.dedupe_mode,
+                                    HumbleHash.state_store,
+                                    ConfigData.download_location)
+        humble_downloads = deduplicator.plan(humble_downloads)
+        if async_engine is not None:
+            failed_downloads = async_engine.download(humble_downloads)
+        else:
+            refresher = DownloadUrlRefresher(hapi)
+            engine = DownloadEngine(ConfigData.download_workers,
+                                    ConfigData.host_connections,
+                                    refresher.refresh,
+                                    HumbleApi.retry_policy,
+                                    circuit_breaker)
+            failed_downloads = engine.run(humble_downloads)
+        failed_downloads = failed_downloads + deduplicator.complete(
+                failed_downloads)
 
-                if hd.humble_file_size is not None:
-                    ProgressTracker.download_size_current += (
-                            hd.humble_file_size)
-                ProgressTracker.item_count_current += 1
+        for hd in failed_downloads:
+            logger.display_message(False, "Error", hd.status_message)
+        if len(failed_downloads) > 0:
+            logger.display_message(
+                    False, "Error", "%d downloads failed." %
+                    len(failed_downloads))
 
         logger.display_message(False, "Processing", "Finished.")
@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import Future
+from urllib.parse import urlparse
+from hb_downloader.config_data import ConfigData
+from hb_downloader.download_engine import DownloadEngine
+from hb_downloader.humble_api.async_humble_api import AsyncHumbleApi
+from hb_downloader.humble_api.events import Events
+from hb_downloader.humble_api.hash_checkpoint import HashCheckpoint
+from hb_downloader.humble_api.progress_aggregator import ProgressAggregator
+from hb_downloader.humble_api.retry_policy import CircuitBreaker
+from hb_downloader.humble_api.retry_policy import RetryPolicy
+from hb_downloader.humble_download import DownloadUrlRefresher
+from hb_downloader.humble_download import HumbleDownload
+from hb_downloader.progress_tracker import ProgressTracker
+from hb_downloader import logger
+
+__author__ = "Brian Schkerke"
+__copyright__ = "Copyright 2020 Brian Schkerke"
+__license__ = "MIT"
+
+
+class AsyncEngine(object):
+    """
+        Retrieves orders and downloads files on a single asyncio event loop
+        instead of pools of threads.  It is the counterpart of
+        Action.map_orders and DownloadEngine used when the "async" engine is
+        configured.
+
+        Disk writes and hashing run on the default executor of the loop, so
+        they never hold up the transfers in flight.  Segmented downloads are
+        not supported, every file is downloaded over a single connection.
+    """
+
+    def __init__(self, auth_sess_cookie, order_workers=8, download_workers=1,
+                 host_connections=0, retry_policy=None, circuit_breaker=None):
+        """
+            Parameterized constructor for the AsyncEngine.
+
+            :param str auth_sess_cookie:  The _simpleauth_sess cookie value.
+            :param int order_workers:  The number of orders retrieved at the
+            same time.
+            :param int download_workers:  The number of files downloaded at
+            the same time.
+            :param int host_connections:  The maximum number of simultaneous
+            downloads from a single host.  0 means no limit.
+            :param retry_policy:  (optional) The RetryPolicy of the transfers,
+            like DownloadEngine's.  The errors of aiohttp are retried too.
+            :param circuit_breaker:  (optional) The CircuitBreaker pausing the
+            downloads from failing hosts.
+        """
+        self.auth_sess_cookie = auth_sess_cookie
+        self.order_workers = max(1, order_workers)
+        self.download_workers = max(1, download_workers)
+        self.host_connections = max(0, host_connections)
+        retry_policy = retry_policy or RetryPolicy(retries=0)
+        self.retry_policy = RetryPolicy(retry_policy.retries,
+                                        retry_policy.backoff,
+                                        AsyncHumbleApi.RETRY_ERRORS)
+        self.circuit_breaker = circuit_breaker or CircuitBreaker(threshold=0)
+        self.failed_downloads = []
+
+    def map_orders(self, function, game_keys):
+        """
+            Retrieves every order and applies function(order, key) to it.  The
+            event loop runs on a separate thread, so the results can be
+            consumed while the remaining orders are retrieved.
+
+            :param function:  The function processing an order.  It runs on
+            the executor of the loop and may block.
+            :param game_keys:  The keys of the orders to process.
+            :return:  A generator of (key, result, error) tuples in the same
+            order as game_keys.  error is None unless the order couldn't be
+            retrieved or function raised, in which case result is None.
+        """
+        futures = [Future() for _ in game_keys]
+        thread = threading.Thread(
+                target=asyncio.run,
+                args=(self.__map_orders(function, game_keys, futures),),
+                daemon=True)
+        thread.start()
+
+        for key, future in zip(game_keys, futures):
+            try:
+                yield key, future.result(), None
+            except Exception as e:
+                yield key, None, e
+
+        thread.join()
+
+    def download(self, humble_downloads):
+        """
+            Downloads every item of the list and waits for all of them to
+            finish.  The URL of each file is refreshed right before it is
+            downloaded if it is about to expire, like DownloadUrlRefresher
+            does.
+
+            :param list humble_downloads:  The Humble Downloads to download, in
+            the order they should be started.
+            :return:  The Humble Downloads which failed.
+            :rtype: list
+        """
+        asyncio.run(self.__download_all(humble_downloads))
+        return self.failed_downloads
+
+    async def __map_orders(self, function, game_keys, futures):
+        """ Retrieves the orders, resolving the future of each key. """
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.order_workers)
+
+        async def retrieve(key, future):
+            try:
+                async with semaphore:
+                    order = await api.get_order(key)
+                future.set_result(
+                        await loop.run_in_executor(None, function, order, key))
+            except Exception as e:
+                future.set_exception(e)
+
+        async with AsyncHumbleApi(self.auth_sess_cookie) as api:
+            await asyncio.gather(*[retrieve(key, future) for key, future
+                                   in zip(game_keys, futures)])
+
+    async def __download_all(self, humble_downloads):
+        """ Downloads the files, at most download_workers at a time. """
+        semaphore = asyncio.Semaphore(self.download_workers)
+        host_semaphores = {}
+        key_locks = {}
+        refresher = DownloadUrlRefresher(None)
+
+        async def refresh(api, hd, expired=False):
+            if not refresher.needs_refresh(hd, expired):
+                return
+            key = hd.order_number
+            async with key_locks.setdefault(key, asyncio.Lock()):
+                # Another task may have retrieved the order in the meantime.
+                if refresher.apply_known_url(hd, expired):
+                    return
+                fetched_at = time.time()
+                order = await api.get_order(key, force_refresh=True)
+                refresher.record(
+                        key, HumbleDownload.downloads_from_order(order, key),
+                        fetched_at)
+                refresher.apply_retrieved_url(hd)
+
+        async def download_file(api, hd, resume):
+            try:
+                await self.__download_file(api, hd, resume)
+            except Exception as e:
+                # aiohttp reports the HTTP status of a rejected request.
+                if getattr(e, "status", None) not in \
+                        DownloadEngine.EXPIRED_STATUSES:
+                    raise
+                logger.display_message(
+                        False, "Download",
+                        "The URL of %s expired, refreshing it." % hd.filename)
+                await refresh(api, hd, expired=True)
+                await self.__download_file(api, hd, True)
+
+        def host_semaphore(url):
+            if self.host_connections == 0:
+                return _NoLimit()
+            host = urlparse(url or "").hostname or ""
+            if host not in host_semaphores:
+                host_semaphores[host] = asyncio.BoundedSemaphore(
+                        self.host_connections)
+            return host_semaphores[host]
+
+        async def attempt_download(api, hd, attempt):
+            async with host_semaphore(hd.download_url):
+                ProgressTracker.assign_download(hd)
+                ProgressTracker.display_summary()
+                logger.display_message(False, "Download", hd.status_message)
+                logger.display_message(
+                        False, "Download", "Downloading %s (%s)." %
+                        (hd.filename, hd.humble_file_size_human))
+                # Retries resume from the last byte written.
+                await download_file(api, hd, attempt > 0)
+
+        async def download(api, hd):
+            async with semaphore:
+                try:
+                    await refresh(api, hd)
+                    attempt = 0
+                    while True:
+                        host = urlparse(hd.download_url or "").hostname or ""
+                        remaining = self.circuit_breaker.remaining(host)
+                        while remaining > 0:
+                            await asyncio.sleep(remaining)
+                            remaining = self.circuit_breaker.remaining(host)
+                        try:
+                            await attempt_download(api, hd, attempt)
+                            self.circuit_breaker.record_success(host)
+                            break
+                        except Exception as e:
+                            delay = DownloadEngine.retry_delay(
+                                    self.retry_policy, self.circuit_breaker,
+                                    hd, host, e, attempt)
+                            if delay is None:
+                                raise
+                            attempt += 1
+                            await asyncio.sleep(delay)
+                except Exception as e:
+                    hd.status_message = "Download of %s failed: %s" % (
+                            hd.filename, e)
+                    logger.display_message(False, "Error", hd.status_message)
+                    self.failed_downloads.append(hd)
+                    Events.trigger(Events.EVENT_DOWNLOAD_FAILED, hd.filename)
+                finally:
+                    ProgressTracker.complete_download(hd)
+
+        connection_limit = max(self.download_workers, self.order_workers) * 2
+        async with AsyncHumbleApi(self.auth_sess_cookie,
+                                  connection_limit) as api:
+            await asyncio.gather(*[download(api, hd)
+                                   for hd in humble_downloads])
+
+    @staticmethod
+    async def __download_file(api, hd, resume=False):
+        """
+            Downloads a single file, resuming it if possible, and verifies it
+            exactly like HumbleDownload.download_file.
+
+            :param api:  The AsyncHumbleApi streaming the file.
+            :param hd:  The Humble Download to download.
+            :param bool resume:  Resume the file even if resume_downloads is
+            off.
+            :raises IOError:  If the transfer is incomplete or the MD5 doesn't
+            match.
+        """
+        loop = asyncio.get_running_loop()
+        resume = resume or ConfigData.resume_downloads
+        await loop.run_in_executor(None, AsyncEngine.__prepare, hd, resume)
+
+        Events.trigger(Events.EVENT_DOWNLOAD_START, hd.filename)
+
+        checkpoint, md5_hash, read_bytes = await loop.run_in_executor(
+                None, AsyncEngine.__resume, hd, resume)
+
+        rate_limiter = HumbleDownload.rate_limiter
+        stream = api.stream(hd.download_url, read_bytes,
+                            rate_limiter.chunk_size(ConfigData.chunk_size))
+        try:
+            if await stream.__anext__() != read_bytes:
+                # Starting afresh, or the server ignored the range.
+                checkpoint = await loop.run_in_executor(
+                        None, AsyncEngine.__restart, hd.full_filename)
+                md5_hash = hashlib.md5()
+                read_bytes = 0
+
+            f = await loop.run_in_executor(
+                    None, open, hd.full_filename,
+                    "ab" if read_bytes > 0 else "wb")
+            try:
+                with ProgressAggregator.task(ProgressAggregator.DOWNLOAD,
+                                             hd.filename, hd.humble_file_size,
+                                             read_bytes) as task:
+                    async for chunk in stream:
+                        wait = rate_limiter.reserve(len(chunk))
+                        if wait > 0:
+                            await asyncio.sleep(wait)
+                        await loop.run_in_executor(
+                                None, AsyncEngine.__write_chunk, f, chunk,
+                                md5_hash, checkpoint)
+                        read_bytes += len(chunk)
+                        task.add(len(chunk))
+                        Events.trigger(Events.EVENT_DOWNLOAD_BYTES, len(chunk))
+                    if ConfigData.fsync_downloads:
+                        await loop.run_in_executor(None, AsyncEngine.__fsync,
+                                                   f)
+            finally:
+                # Whatever was received is on disk, remember it.
+                await loop.run_in_executor(None, AsyncEngine.__close, f,
+                                           checkpoint)
+        finally:
+            await stream.aclose()
+
+        await loop.run_in_executor(None, hd.verify_download, read_bytes,
+                                   md5_hash.hexdigest())
+        await loop.run_in_executor(None, HashCheckpoint.remove,
+                                   hd.full_filename)
+
+        Events.trigger(Events.EVENT_DOWNLOAD_END, hd.filename)
+
+    @staticmethod
+    def __prepare(hd, resume):
+        """ Creates the directory, and removes the file unless resumed. """
+        hd.create_directory()
+        if not resume:
+            hd.remove()
+
+    @staticmethod
+    def __resume(hd, resume):
+        """
+            Loads the checkpoint of a file and hashes the part of the file the
+            download can resume from.
+
+            :return:  The checkpoint, the running MD5 and the number of bytes
+            to resume from.
+            :rtype: tuple
+        """
+        md5_hash = hashlib.md5()
+        checkpoint = HashCheckpoint(hd.full_filename)
+        local_file_size = hd.local_file_size
+        if resume and 0 < local_file_size < (hd.humble_file_size or 0):
+            md5_hash, read_bytes = checkpoint.resume(md5_hash, local_file_size)
+            return checkpoint, md5_hash, read_bytes
+
+        return checkpoint, md5_hash, 0
+
+    @staticmethod
+    def __restart(full_filename):
+        """ Replaces the checkpoint of a file downloaded afresh. """
+        HashCheckpoint.remove(full_filename)
+        return HashCheckpoint(full_filename)
+
+    @staticmethod
+    def __write_chunk(f, chunk, md5_hash, checkpoint):
+        """ Writes a chunk and adds it to the running MD5 and checkpoint. """
+        f.write(chunk)
+        md5_hash.update(chunk)
+        if checkpoint.update(chunk):
+            f.flush()
+            checkpoint.save()
+
+    @staticmethod
+    def __fsync(f):
+        """ Flushes a file down to the disk. """
+        f.flush()
+        os.fsync(f.fileno())
+
+    @staticmethod
+    def __close(f, checkpoint):
+        """ Closes a file, saving its checkpoint once flushed. """
+        try:
+            f.flush()
+            checkpoint.save()
+        finally:
+            f.close()
+
+
+class _NoLimit(object):
+    """ Stands in for a host semaphore when connections are not capped. """
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
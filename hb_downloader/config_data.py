@@ -20,9 +20,48 @@ class ConfigData(object):
     force_md5 = False
     chunk_size = 8192000
     ignore_md5 = False
+    hash_drop_cache = False
     resume_downloads = True
     download_product = "-not specified-"
     get_extra_file_info = False
+    probe_workers = 16
+    file_info_cache = ""
+    engine = "sync"
+    order_workers = 8
+    hash_workers = 2
+    download_workers = 1
+    download_policy = "default"
+    dedupe_mode = "reflink"
+    url_freshness_window = 3600
+    platform_priority = []
+    host_connections = 0
+    write_queue_size = 8
+    fsync_downloads = False
+    bandwidth_limit = 0
+    bandwidth_schedule = []
+    retry_attempts = 3
+    retry_backoff = 1.0
+    circuit_breaker_threshold = 5
+    circuit_breaker_cooldown = 60
+    segment_threshold = 0
+    segment_count = 4
+    order_cache_directory = ""
+    order_cache_ttl = 86400
+    refresh_orders = []
+    state_database = ""
+    record_traffic = ""
+    replay_traffic = ""
+    replay_latency = False
+    profile = False
+    profiler = "cprofile"
+    profile_output = "hb-downloader-profile"
+    progress_interval = 10
+    progress_refresh = 0.25
+    metrics_textfile = ""
+    metrics_port = 0
+    metrics_address = "127.0.0.1"
+    metrics_interval = 15
+    verify_report = "hb-downloader-verify.json"
     config_filename = "hb-downloader-settings.yaml"
     
     download_platforms = {
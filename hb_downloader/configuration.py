@@ -2,12 +2,36 @@
 # -*- coding: utf-8 -*-
 import argparse
 import os
+import sys
 import yaml
 from urllib.parse import urlparse
 from urllib.parse import parse_qs
 from hb_downloader import logger
 from hb_downloader.config_data import ConfigData
+from hb_downloader.humble_api.humble_api import HumbleApi
+from hb_downloader.humble_api.file_info_prober import FileInfoProber
 from hb_downloader.humble_api.humble_hash import HumbleHash
+from hb_downloader.humble_api.model.base_model import BaseModel
+from hb_downloader.deduplicator import Deduplicator
+from hb_downloader.download_scheduler import DownloadScheduler
+from hb_downloader.humble_download import DownloadUrlRefresher
+from hb_downloader.humble_download import HumbleDownload
+from hb_downloader.rate_limiter import RateLimiter
+from hb_downloader.humble_api.order_cache import OrderCache
+from hb_downloader.humble_api.profiler import Profiler
+from hb_downloader.humble_api.retry_policy import RetryPolicy
+from hb_downloader.humble_api.state_store import StateStore
+from hb_downloader.humble_api.traffic_archive import TrafficArchive
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+try:
+    import pyinstrument
+except ImportError:
+    pyinstrument = None
 
 __author__ = "Brian Schkerke"
 __copyright__ = "Copyright 2020 Brian Schkerke"
@@ -16,6 +40,7 @@ __license__ = "MIT"
 
 class Configuration(object):
     cmdline_platform = {}  # Mapping between hb convention and ours
+    engines = ["sync", "async"]
 
     @staticmethod
     def init_platforms():
@@ -40,6 +65,45 @@ class Configuration(object):
             return False, (
                     "Download location (%s) is not writable by the current user." % ConfigData.download_location)
 
+        try:
+            RateLimiter(ConfigData.bandwidth_limit, ConfigData.bandwidth_schedule)
+        except ValueError as e:
+            return False, str(e)
+
+        if ConfigData.download_policy not in DownloadScheduler.POLICIES:
+            return False, "Unknown download policy (%s), expected one of %s" % (
+                    ConfigData.download_policy, ", ".join(DownloadScheduler.POLICIES))
+
+        if ConfigData.dedupe_mode not in Deduplicator.MODES:
+            return False, "Unknown dedupe mode (%s), expected one of %s" % (
+                    ConfigData.dedupe_mode, ", ".join(Deduplicator.MODES))
+
+        if ConfigData.engine not in Configuration.engines:
+            return False, "Unknown engine (%s), expected one of %s" % (
+                    ConfigData.engine, ", ".join(Configuration.engines))
+
+        if ConfigData.engine == "async" and aiohttp is None:
+            return False, "The async engine requires the aiohttp library (pip install aiohttp)."
+
+        if ConfigData.engine == "async" and sys.version_info < (3, 7):
+            return False, "The async engine requires Python 3.7 or later."
+
+        if ConfigData.profiler not in Profiler.MODES:
+            return False, "Unknown profiler (%s), expected one of %s" % (
+                    ConfigData.profiler, ", ".join(Profiler.MODES))
+
+        if ConfigData.profile and ConfigData.profiler == "sampling" and pyinstrument is None:
+            return False, "The sampling profiler requires the pyinstrument library (pip install pyinstrument)."
+
+        if ConfigData.record_traffic and ConfigData.replay_traffic:
+            return False, "Traffic can't be recorded and replayed at the same time."
+
+        if (ConfigData.record_traffic or ConfigData.replay_traffic) and ConfigData.engine != "sync":
+            return False, "Traffic can only be recorded and replayed by the sync engine."
+
+        if ConfigData.replay_traffic and not os.path.isfile(os.path.expanduser(ConfigData.replay_traffic)):
+            return False, "Traffic archive (%s) doesn't exist" % ConfigData.replay_traffic
+
         return True, ""
 
     @staticmethod
@@ -61,6 +125,8 @@ class Configuration(object):
                 "read_md5", ConfigData.read_md5)
         ConfigData.force_md5 = saved_config.get(
                 "force_md5", ConfigData.force_md5)
+        ConfigData.hash_drop_cache = saved_config.get(
+                "hash_drop_cache", ConfigData.hash_drop_cache)
         ConfigData.chunk_size = saved_config.get(
                 "chunksize", ConfigData.chunk_size)
         ConfigData.debug = saved_config.get(
@@ -77,6 +143,79 @@ class Configuration(object):
                 "ignore_md5", ConfigData.ignore_md5)
         ConfigData.get_extra_file_info = saved_config.get(
                 "get_extra_file_info", ConfigData.get_extra_file_info)
+        ConfigData.probe_workers = saved_config.get(
+                "probe_workers", ConfigData.probe_workers)
+        ConfigData.file_info_cache = saved_config.get(
+                "file_info_cache", ConfigData.file_info_cache)
+        ConfigData.engine = saved_config.get(
+                "engine", ConfigData.engine)
+        ConfigData.order_workers = saved_config.get(
+                "order_workers", ConfigData.order_workers)
+        ConfigData.hash_workers = saved_config.get(
+                "hash_workers", ConfigData.hash_workers)
+        ConfigData.download_workers = saved_config.get(
+                "download_workers", ConfigData.download_workers)
+        ConfigData.host_connections = saved_config.get(
+                "host_connections", ConfigData.host_connections)
+        ConfigData.download_policy = saved_config.get(
+                "download_policy", ConfigData.download_policy)
+        ConfigData.dedupe_mode = saved_config.get(
+                "dedupe_mode", ConfigData.dedupe_mode)
+        ConfigData.url_freshness_window = saved_config.get(
+                "url_freshness_window", ConfigData.url_freshness_window)
+        ConfigData.platform_priority = saved_config.get(
+                "platform_priority", ConfigData.platform_priority)
+        ConfigData.write_queue_size = saved_config.get(
+                "write_queue_size", ConfigData.write_queue_size)
+        ConfigData.fsync_downloads = saved_config.get(
+                "fsync_downloads", ConfigData.fsync_downloads)
+        ConfigData.bandwidth_limit = saved_config.get(
+                "bandwidth_limit", ConfigData.bandwidth_limit)
+        ConfigData.bandwidth_schedule = saved_config.get(
+                "bandwidth_schedule", ConfigData.bandwidth_schedule)
+        ConfigData.retry_attempts = saved_config.get(
+                "retry_attempts", ConfigData.retry_attempts)
+        ConfigData.retry_backoff = saved_config.get(
+                "retry_backoff", ConfigData.retry_backoff)
+        ConfigData.circuit_breaker_threshold = saved_config.get(
+                "circuit_breaker_threshold",
+                ConfigData.circuit_breaker_threshold)
+        ConfigData.circuit_breaker_cooldown = saved_config.get(
+                "circuit_breaker_cooldown", ConfigData.circuit_breaker_cooldown)
+        ConfigData.segment_threshold = saved_config.get(
+                "segment_threshold", ConfigData.segment_threshold)
+        ConfigData.segment_count = saved_config.get(
+                "segment_count", ConfigData.segment_count)
+        ConfigData.order_cache_directory = saved_config.get(
+                "order_cache_directory", ConfigData.order_cache_directory)
+        ConfigData.order_cache_ttl = saved_config.get(
+                "order_cache_ttl", ConfigData.order_cache_ttl)
+        ConfigData.state_database = saved_config.get(
+                "state_database", ConfigData.state_database)
+        ConfigData.record_traffic = saved_config.get(
+                "record_traffic", ConfigData.record_traffic)
+        ConfigData.replay_traffic = saved_config.get(
+                "replay_traffic", ConfigData.replay_traffic)
+        ConfigData.replay_latency = saved_config.get(
+                "replay_latency", ConfigData.replay_latency)
+        ConfigData.profile = saved_config.get(
+                "profile", ConfigData.profile)
+        ConfigData.profiler = saved_config.get(
+                "profiler", ConfigData.profiler)
+        ConfigData.profile_output = saved_config.get(
+                "profile_output", ConfigData.profile_output)
+        ConfigData.progress_interval = saved_config.get(
+                "progress_interval", ConfigData.progress_interval)
+        ConfigData.progress_refresh = saved_config.get(
+                "progress_refresh", ConfigData.progress_refresh)
+        ConfigData.metrics_textfile = saved_config.get(
+                "metrics_textfile", ConfigData.metrics_textfile)
+        ConfigData.metrics_port = saved_config.get(
+                "metrics_port", ConfigData.metrics_port)
+        ConfigData.metrics_address = saved_config.get(
+                "metrics_address", ConfigData.metrics_address)
+        ConfigData.metrics_interval = saved_config.get(
+                "metrics_interval", ConfigData.metrics_interval)
 
     @staticmethod
     def parse_command_line():
@@ -106,6 +245,200 @@ class Configuration(object):
                 "-c", "--auth_cookie",
                 default=ConfigData.auth_sess_cookie, type=str,
                 help="The _simple_auth cookie value from a web browser")
+        parser.add_argument(
+                "-e", "--engine", default=ConfigData.engine,
+                choices=Configuration.engines,
+                help=("The transport used to talk to humblebundle.com. async "
+                      "runs every request on a single event loop and "
+                      "requires aiohttp."))
+        parser.add_argument(
+                "-ow", "--order_workers",
+                default=ConfigData.order_workers, type=int,
+                help=("The number of orders to retrieve from humblebundle.com "
+                      "in parallel."))
+        parser.add_argument(
+                "-hw", "--hash_workers",
+                default=ConfigData.hash_workers, type=int,
+                help=("The number of existing files to verify in parallel "
+                      "while orders are retrieved."))
+        parser.add_argument(
+                "-dw", "--download_workers",
+                default=ConfigData.download_workers, type=int,
+                help="The number of files to download at the same time.")
+        parser.add_argument(
+                "-hc", "--host_connections",
+                default=ConfigData.host_connections, type=int,
+                help=("The maximum number of simultaneous downloads from a "
+                      "single host. 0 means no limit."))
+        parser.add_argument(
+                "-dp", "--download_policy",
+                default=ConfigData.download_policy,
+                choices=DownloadScheduler.POLICIES,
+                help=("The order files are downloaded in: as listed, smallest "
+                      "or largest first, newest orders first, by platform "
+                      "priority or one file of each order in turn."))
+        parser.add_argument(
+                "-dd", "--dedupe_mode", default=ConfigData.dedupe_mode,
+                choices=Deduplicator.MODES,
+                help=("How the other copies of identical files are created "
+                      "once one is downloaded: hardlink, reflink (falling "
+                      "back to a copy), copy, or off to download each copy."))
+        parser.add_argument(
+                "-ufw", "--url_freshness_window",
+                default=ConfigData.url_freshness_window, type=int,
+                help=("The number of seconds download URLs without an expiry "
+                      "date are used before their order is retrieved again."))
+        parser.add_argument(
+                "-pp", "--platform_priority", nargs="+",
+                default=ConfigData.platform_priority,
+                help=("The platforms downloaded first with the platform "
+                      "policy, in order."))
+        parser.add_argument(
+                "-wq", "--write_queue_size",
+                default=ConfigData.write_queue_size, type=int,
+                help=("The number of downloaded chunks which can wait for the "
+                      "disk before the download is held up."))
+        parser.add_argument(
+                "-fs", "--fsync_downloads", action="store_true",
+                default=ConfigData.fsync_downloads,
+                help=("Forces every completed download to the storage device "
+                      "before verifying it."))
+        parser.add_argument(
+                "-bl", "--bandwidth_limit",
+                default=ConfigData.bandwidth_limit, type=int,
+                help=("The maximum total download rate in bytes per second, "
+                      "outside of the windows of bandwidth_schedule. 0 means "
+                      "no limit."))
+        parser.add_argument(
+                "-at", "--retry_attempts",
+                default=ConfigData.retry_attempts, type=int,
+                help=("The number of times a request or download failing "
+                      "with a connection error, a timeout or a transient "
+                      "server error is retried. Downloads resume where they "
+                      "stopped."))
+        parser.add_argument(
+                "-bo", "--retry_backoff",
+                default=ConfigData.retry_backoff, type=float,
+                help=("The delay before the first retry in seconds, doubled "
+                      "with every retry and randomized."))
+        parser.add_argument(
+                "-cbt", "--circuit_breaker_threshold",
+                default=ConfigData.circuit_breaker_threshold, type=int,
+                help=("The number of consecutive failures after which the "
+                      "downloads from a host are paused. 0 never pauses "
+                      "them."))
+        parser.add_argument(
+                "-cbc", "--circuit_breaker_cooldown",
+                default=ConfigData.circuit_breaker_cooldown, type=int,
+                help="The number of seconds the downloads from a failing "
+                     "host are paused.")
+        parser.add_argument(
+                "-st", "--segment_threshold",
+                default=ConfigData.segment_threshold, type=int,
+                help=("Files of at least this many bytes are downloaded in "
+                      "segments over several connections. 0 disables "
+                      "segmented downloads."))
+        parser.add_argument(
+                "-sc", "--segment_count",
+                default=ConfigData.segment_count, type=int,
+                help="The number of segments used for segmented downloads.")
+        parser.add_argument(
+                "-ocd", "--order_cache_directory",
+                default=ConfigData.order_cache_directory, type=str,
+                help=("Directory to cache the orders retrieved from "
+                      "humblebundle.com in. Caching is disabled if empty."))
+        parser.add_argument(
+                "-oct", "--order_cache_ttl",
+                default=ConfigData.order_cache_ttl, type=int,
+                help=("Number of seconds a cached order is used before "
+                      "checking humblebundle.com for changes."))
+        parser.add_argument(
+                "-ro", "--refresh_order", action="append", default=[],
+                dest="refresh_orders", metavar="KEY",
+                help=("Drop the cached copy of the given order key. Can be "
+                      "specified several times."))
+        parser.add_argument(
+                "-pw", "--probe_workers",
+                default=ConfigData.probe_workers, type=int,
+                help=("The number of files probed in parallel for their last "
+                      "modified date when extra file info is requested."))
+        parser.add_argument(
+                "-fic", "--file_info_cache",
+                default=ConfigData.file_info_cache, type=str,
+                help=("A file remembering the last modified date of the files "
+                      "probed, so later runs don't probe them again."))
+        parser.add_argument(
+                "-sdb", "--state_database",
+                default=ConfigData.state_database, type=str,
+                help=("SQLite database recording the checksums of verified "
+                      "files, so unchanged files aren't hashed again. "
+                      "Disabled if empty."))
+        parser.add_argument(
+                "-tr", "--record_traffic",
+                default=ConfigData.record_traffic, type=str,
+                help=("Records the responses of humblebundle.com to this "
+                      "archive, without cookies or URL signatures, to replay "
+                      "them later."))
+        parser.add_argument(
+                "-tp", "--replay_traffic",
+                default=ConfigData.replay_traffic, type=str,
+                help=("Replays the responses recorded in this archive instead "
+                      "of contacting humblebundle.com. The files themselves "
+                      "are not replayed."))
+        parser.add_argument(
+                "-tl", "--replay_latency", action="store_true",
+                default=ConfigData.replay_latency,
+                help=("Replays every response after the time its request "
+                      "took when it was recorded."))
+        parser.add_argument(
+                "-pf", "--profile", action="store_true",
+                default=ConfigData.profile,
+                help=("Profiles the run and times its phases per order and "
+                      "file. The statistics and a summary are written next "
+                      "to profile_output when it exits."))
+        parser.add_argument(
+                "-pfm", "--profiler", default=ConfigData.profiler,
+                choices=Profiler.MODES,
+                help=("cprofile profiles every thread. sampling uses "
+                      "pyinstrument, which has less overhead but only "
+                      "samples the main thread."))
+        parser.add_argument(
+                "-pfo", "--profile_output",
+                default=ConfigData.profile_output, type=str,
+                help=("The path and name of the profile files, without "
+                      "extension."))
+        parser.add_argument(
+                "-pi", "--progress_interval",
+                default=ConfigData.progress_interval, type=int,
+                help=("When the output isn't a terminal, the progress of the "
+                      "files in progress is printed every this many "
+                      "seconds."))
+        parser.add_argument(
+                "-pr", "--progress_refresh",
+                default=ConfigData.progress_refresh, type=float,
+                help=("On a terminal, the progress of the files in progress "
+                      "is redrawn every this many seconds."))
+        parser.add_argument(
+                "-mt", "--metrics_textfile",
+                default=ConfigData.metrics_textfile, type=str,
+                help=("Writes the metrics of the run (throughput, files, "
+                      "retries, API latency) to this file in the Prometheus "
+                      "format, for the textfile collector of the node "
+                      "exporter."))
+        parser.add_argument(
+                "-mp", "--metrics_port",
+                default=ConfigData.metrics_port, type=int,
+                help=("Serves the metrics of the run at /metrics on this "
+                      "port. 0 disables the endpoint."))
+        parser.add_argument(
+                "-ma", "--metrics_address",
+                default=ConfigData.metrics_address, type=str,
+                help="The address the metrics endpoint listens on.")
+        parser.add_argument(
+                "-mi", "--metrics_interval",
+                default=ConfigData.metrics_interval, type=int,
+                help=("The number of seconds between two updates of the "
+                      "metrics textfile."))
 
         sub = parser.add_subparsers(
                 title="action", dest="action",
@@ -131,12 +464,23 @@ class Configuration(object):
                         "You can narrow downloading down to the product level. "
                         "This would be one single bundle. "))
 
+        a_verify = sub.add_parser(
+                "verify", help=(
+                        "Verify the size and checksum of every file of the "
+                        "library already downloaded, and write a report of "
+                        "the missing, truncated and mismatched files. An "
+                        "interrupted verification resumes where it stopped."))
+        sub.add_parser(
+                "import-md5", help=(
+                        "Record the .md5 files found in the download location "
+                        "in the state database, then exit."))
+
         a_product.add_argument(
             dest="download_product",
             help="Product Key (looks like a bunch of garbled letters)"
             )
 
-        for action in [a_list, a_download]:
+        for action in [a_list, a_download, a_verify]:
             item_type = action.add_subparsers(title="type", dest="item_type")
             games = item_type.add_parser("games")
             games.add_argument(
@@ -150,6 +494,11 @@ class Configuration(object):
                 "-u", "--print-url", action="store_true", dest="print_url",
                 help=("Print the download url with the output. Please note "
                       "that the url expires after a while"))
+        a_verify.add_argument(
+                "-r", "--report", dest="verify_report",
+                default=ConfigData.verify_report,
+                help=("The report to write. Written as CSV if it ends with "
+                      ".csv, as JSON otherwise."))
         args = parser.parse_args()
 
         Configuration.configure_action(args)
@@ -159,6 +508,44 @@ class Configuration(object):
         ConfigData.download_location = args.download_location
         ConfigData.chunk_size = args.chunksize
         ConfigData.auth_sess_cookie = args.auth_cookie
+        ConfigData.engine = args.engine
+        ConfigData.order_workers = max(1, args.order_workers)
+        ConfigData.hash_workers = max(1, args.hash_workers)
+        ConfigData.download_workers = max(1, args.download_workers)
+        ConfigData.host_connections = max(0, args.host_connections)
+        ConfigData.download_policy = args.download_policy
+        ConfigData.dedupe_mode = args.dedupe_mode
+        ConfigData.url_freshness_window = max(0, args.url_freshness_window)
+        ConfigData.platform_priority = args.platform_priority
+        ConfigData.write_queue_size = max(1, args.write_queue_size)
+        ConfigData.fsync_downloads = args.fsync_downloads
+        ConfigData.bandwidth_limit = max(0, args.bandwidth_limit)
+        ConfigData.retry_attempts = max(0, args.retry_attempts)
+        ConfigData.retry_backoff = max(0.0, args.retry_backoff)
+        ConfigData.circuit_breaker_threshold = max(
+                0, args.circuit_breaker_threshold)
+        ConfigData.circuit_breaker_cooldown = max(
+                0, args.circuit_breaker_cooldown)
+        ConfigData.segment_threshold = max(0, args.segment_threshold)
+        ConfigData.segment_count = max(1, args.segment_count)
+        ConfigData.order_cache_directory = args.order_cache_directory
+        ConfigData.order_cache_ttl = args.order_cache_ttl
+        ConfigData.refresh_orders = args.refresh_orders
+        ConfigData.probe_workers = max(1, args.probe_workers)
+        ConfigData.file_info_cache = args.file_info_cache
+        ConfigData.state_database = args.state_database
+        ConfigData.record_traffic = args.record_traffic
+        ConfigData.replay_traffic = args.replay_traffic
+        ConfigData.replay_latency = args.replay_latency
+        ConfigData.profile = args.profile
+        ConfigData.profiler = args.profiler
+        ConfigData.profile_output = args.profile_output
+        ConfigData.progress_interval = max(1, args.progress_interval)
+        ConfigData.progress_refresh = max(0.05, args.progress_refresh)
+        ConfigData.metrics_textfile = args.metrics_textfile
+        ConfigData.metrics_port = args.metrics_port
+        ConfigData.metrics_address = args.metrics_address
+        ConfigData.metrics_interval = max(1, args.metrics_interval)
 
     @staticmethod
     def configure_action(args):
@@ -166,8 +553,12 @@ class Configuration(object):
             args.platform = None
         if "print_url" not in dir(args):
             args.print_url = False
+        if "verify_report" not in dir(args):
+            args.verify_report = ConfigData.verify_report
 
-        if args.action is not None:
+        if args.action == "import-md5":
+            pass
+        elif args.action is not None:
             if args.action == "download-product":
                 args.platform = None
                 ConfigData.download_product = args.download_product
@@ -191,6 +582,7 @@ class Configuration(object):
             args.action = "download"
         ConfigData.action = args.action
         ConfigData.print_url = args.print_url
+        ConfigData.verify_report = args.verify_report
 
     @staticmethod
     def dump_configuration():
@@ -211,6 +603,9 @@ class Configuration(object):
                 True, "Config", "force_md5=%s" % ConfigData.force_md5)
         logger.display_message(
                 True, "Config", "ignore_md5=%s" % ConfigData.ignore_md5)
+        logger.display_message(
+                True, "Config", "hash_drop_cache=%s" %
+                ConfigData.hash_drop_cache)
         logger.display_message(
                 True, "Config", "debug=%s" % ConfigData.debug)
         logger.display_message(
@@ -227,6 +622,104 @@ class Configuration(object):
         logger.display_message(
                 True, "Config", "get_extra_file_info=%s" %
                 ConfigData.get_extra_file_info)
+        logger.display_message(
+                True, "Config", "probe_workers=%s" % ConfigData.probe_workers)
+        logger.display_message(
+                True, "Config", "file_info_cache=%s" %
+                ConfigData.file_info_cache)
+        logger.display_message(
+                True, "Config", "engine=%s" % ConfigData.engine)
+        logger.display_message(
+                True, "Config", "order_workers=%s" % ConfigData.order_workers)
+        logger.display_message(
+                True, "Config", "hash_workers=%s" % ConfigData.hash_workers)
+        logger.display_message(
+                True, "Config", "download_workers=%s" %
+                ConfigData.download_workers)
+        logger.display_message(
+                True, "Config", "host_connections=%s" %
+                ConfigData.host_connections)
+        logger.display_message(
+                True, "Config", "download_policy=%s" %
+                ConfigData.download_policy)
+        logger.display_message(
+                True, "Config", "dedupe_mode=%s" % ConfigData.dedupe_mode)
+        logger.display_message(
+                True, "Config", "url_freshness_window=%s" %
+                ConfigData.url_freshness_window)
+        logger.display_message(
+                True, "Config", "platform_priority=%s" %
+                ConfigData.platform_priority)
+        logger.display_message(
+                True, "Config", "write_queue_size=%s" %
+                ConfigData.write_queue_size)
+        logger.display_message(
+                True, "Config", "fsync_downloads=%s" %
+                ConfigData.fsync_downloads)
+        logger.display_message(
+                True, "Config", "bandwidth_limit=%s" %
+                ConfigData.bandwidth_limit)
+        logger.display_message(
+                True, "Config", "bandwidth_schedule=%s" %
+                ConfigData.bandwidth_schedule)
+        logger.display_message(
+                True, "Config", "retry_attempts=%s" %
+                ConfigData.retry_attempts)
+        logger.display_message(
+                True, "Config", "retry_backoff=%s" % ConfigData.retry_backoff)
+        logger.display_message(
+                True, "Config", "circuit_breaker_threshold=%s" %
+                ConfigData.circuit_breaker_threshold)
+        logger.display_message(
+                True, "Config", "circuit_breaker_cooldown=%s" %
+                ConfigData.circuit_breaker_cooldown)
+        logger.display_message(
+                True, "Config", "segment_threshold=%s" %
+                ConfigData.segment_threshold)
+        logger.display_message(
+                True, "Config", "segment_count=%s" % ConfigData.segment_count)
+        logger.display_message(
+                True, "Config", "order_cache_directory=%s" %
+                ConfigData.order_cache_directory)
+        logger.display_message(
+                True, "Config", "order_cache_ttl=%s" %
+                ConfigData.order_cache_ttl)
+        logger.display_message(
+                True, "Config", "state_database=%s" %
+                ConfigData.state_database)
+        logger.display_message(
+                True, "Config", "record_traffic=%s" %
+                ConfigData.record_traffic)
+        logger.display_message(
+                True, "Config", "replay_traffic=%s" %
+                ConfigData.replay_traffic)
+        logger.display_message(
+                True, "Config", "replay_latency=%s" %
+                ConfigData.replay_latency)
+        logger.display_message(
+                True, "Config", "profile=%s" % ConfigData.profile)
+        logger.display_message(
+                True, "Config", "profiler=%s" % ConfigData.profiler)
+        logger.display_message(
+                True, "Config", "profile_output=%s" %
+                ConfigData.profile_output)
+        logger.display_message(
+                True, "Config", "progress_interval=%s" %
+                ConfigData.progress_interval)
+        logger.display_message(
+                True, "Config", "progress_refresh=%s" %
+                ConfigData.progress_refresh)
+        logger.display_message(
+                True, "Config", "metrics_textfile=%s" %
+                ConfigData.metrics_textfile)
+        logger.display_message(
+                True, "Config", "metrics_port=%s" % ConfigData.metrics_port)
+        logger.display_message(
+                True, "Config", "metrics_address=%s" %
+                ConfigData.metrics_address)
+        logger.display_message(
+                True, "Config", "metrics_interval=%s" %
+                ConfigData.metrics_interval)
 
         for platform in list(ConfigData.download_platforms.keys()):
             logger.display_message(
@@ -245,5 +738,57 @@ class Configuration(object):
         HumbleHash.read_md5 = ConfigData.read_md5
         HumbleHash.force_md5 = ConfigData.force_md5
         HumbleHash.chunk_size = ConfigData.chunk_size
+        HumbleHash.drop_cache = ConfigData.hash_drop_cache
+        BaseModel.retain_data = ConfigData.debug
+        HumbleApi.connection_pool_size = max(
+                HumbleApi.connection_pool_size, ConfigData.order_workers)
+
+        if ConfigData.order_cache_directory:
+            HumbleApi.order_cache = OrderCache(
+                    os.path.expanduser(ConfigData.order_cache_directory),
+                    ConfigData.order_cache_ttl)
+            for key in ConfigData.refresh_orders:
+                HumbleApi.order_cache.invalidate(key)
+        else:
+            HumbleApi.order_cache = None
+
+        if ConfigData.record_traffic:
+            HumbleApi.traffic_archive = TrafficArchive(
+                    os.path.expanduser(ConfigData.record_traffic),
+                    TrafficArchive.RECORD)
+        elif ConfigData.replay_traffic:
+            HumbleApi.traffic_archive = TrafficArchive(
+                    os.path.expanduser(ConfigData.replay_traffic),
+                    TrafficArchive.REPLAY, ConfigData.replay_latency)
+        else:
+            HumbleApi.traffic_archive = None
+
+        # Every request must reach the archive, a cached order would be
+        # missing from it.
+        if HumbleApi.traffic_archive is not None:
+            HumbleApi.order_cache = None
+
+        DownloadUrlRefresher.freshness_window = ConfigData.url_freshness_window
+
+        try:
+            HumbleDownload.rate_limiter = RateLimiter(
+                    ConfigData.bandwidth_limit, ConfigData.bandwidth_schedule)
+        except ValueError:
+            # Reported by validate_configuration.
+            HumbleDownload.rate_limiter = RateLimiter(
+                    ConfigData.bandwidth_limit)
+
+        HumbleApi.retry_policy = RetryPolicy(ConfigData.retry_attempts,
+                                             ConfigData.retry_backoff)
+
+        HumbleApi.file_info_prober = FileInfoProber(
+                os.path.expanduser(ConfigData.file_info_cache),
+                ConfigData.probe_workers)
+
+        if ConfigData.state_database:
+            HumbleHash.state_store = StateStore(
+                    os.path.expanduser(ConfigData.state_database))
+        else:
+            HumbleHash.state_store = None
 
 Configuration.init_platforms()
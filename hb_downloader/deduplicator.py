@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import os
+import shutil
+from hb_downloader.humble_api.events import Events
+from hb_downloader.humble_api.humble_hash import HumbleHash
+from hb_downloader.progress_tracker import ProgressTracker
+from hb_downloader import logger
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+__author__ = "Brian Schkerke"
+__copyright__ = "Copyright 2020 Brian Schkerke"
+__license__ = "MIT"
+
+
+class Deduplicator(object):
+    """
+        Downloads each distinct file (same MD5 and size) only once, then
+        materializes its other paths from the downloaded copy.  A file which
+        already exists anywhere in the download location, as recorded in the
+        state store, isn't downloaded at all.
+
+        The modes try, in order:
+
+        hardlink:  A hard link, then a reflink, then a copy.
+        reflink:  A copy-on-write clone where the filesystem supports it,
+        then a copy.
+        copy:  A plain copy.
+        off:  Every path is downloaded.
+    """
+    MODES = ["off", "hardlink", "reflink", "copy"]
+
+    # The ioctl cloning a file on Linux filesystems such as Btrfs and XFS.
+    FICLONE = 0x40049409
+
+    def __init__(self, mode="reflink", state_store=None, download_location=""):
+        """
+            Parameterized constructor for the Deduplicator.
+
+            :param str mode:  One of MODES.
+            :param state_store:  (optional) The StateStore used to find the
+            files already on disk.
+            :param str download_location:  The root of the library.  Files
+            outside of it are never used.
+            :raises ValueError:  If the mode is unknown.
+        """
+        if mode not in Deduplicator.MODES:
+            raise ValueError("Unknown dedupe mode %s, expected one of %s" %
+                             (mode, ", ".join(Deduplicator.MODES)))
+
+        self.mode = mode
+        self.state_store = state_store
+        self.download_location = os.path.abspath(download_location or ".")
+        self.duplicates = {}
+        self.failed_downloads = []
+
+    def plan(self, humble_downloads):
+        """
+            Removes the duplicates from the planned downloads.  The downloads
+            whose content is already on disk are materialized right away.
+
+            :param list humble_downloads:  The planned Humble Downloads, in
+            the order they should be started.
+            :return:  The Humble Downloads which must actually be downloaded.
+            :rtype: list
+        """
+        if self.mode == "off":
+            return humble_downloads
+
+        unique_downloads = []
+        groups = {}
+        for hd in humble_downloads:
+            content = (hd.humble_md5, hd.humble_file_size)
+            if content in groups:
+                groups[content].append(hd)
+            else:
+                groups[content] = [hd]
+                unique_downloads.append(hd)
+
+        planned = []
+        for hd in unique_downloads:
+            group = groups[(hd.humble_md5, hd.humble_file_size)]
+            source = self.__existing_copy(hd, group)
+            if source is not None:
+                for duplicate in group:
+                    self.__materialize(source, duplicate)
+                continue
+
+            planned.append(hd)
+            if len(group) > 1:
+                self.duplicates[hd] = group[1:]
+
+        skipped = len(humble_downloads) - len(planned)
+        if skipped > 0:
+            logger.display_message(
+                    False, "Processing",
+                    "%d downloads are duplicates and will be linked or "
+                    "copied instead." % skipped)
+
+        return planned
+
+    def complete(self, failed_downloads):
+        """
+            Materializes the duplicates of the files downloaded successfully.
+
+            :param list failed_downloads:  The Humble Downloads which failed.
+            :return:  The duplicates which couldn't be materialized, either
+            because their source failed or because linking and copying
+            failed.
+            :rtype: list
+        """
+        for hd, group in self.duplicates.items():
+            for duplicate in group:
+                if hd in failed_downloads:
+                    duplicate.status_message = (
+                            "%s was not downloaded, it is a copy of %s which "
+                            "failed." % (duplicate.full_filename,
+                                         hd.full_filename))
+                    self.failed_downloads.append(duplicate)
+                    Events.trigger(Events.EVENT_DOWNLOAD_FAILED,
+                                   duplicate.filename)
+                    ProgressTracker.complete_download(duplicate)
+                else:
+                    self.__materialize(hd.full_filename, duplicate)
+
+        return self.failed_downloads
+
+    def __existing_copy(self, hd, group):
+        """
+            Finds a verified copy of the content of a group of downloads on
+            disk, which isn't one of the paths being replaced.
+
+            :return:  The full path and filename of the copy, or None.
+        """
+        if self.state_store is None:
+            return None
+
+        targets = set(os.path.abspath(d.full_filename) for d in group)
+        for path in self.state_store.find(hd.humble_md5, hd.humble_file_size):
+            if path in targets:
+                continue
+            if not path.startswith(self.download_location + os.sep):
+                continue
+            if self.state_store.lookup(path) == hd.humble_md5:
+                return path
+
+        return None
+
+    def __materialize(self, source, hd):
+        """
+            Creates the file of a download from an identical file.
+
+            :param str source:  The full path and filename of the identical
+            file.
+            :param hd:  The Humble Download to materialize.
+        """
+        target = hd.full_filename
+        temporary_filename = target + ".hbdedupe"
+        try:
+            hd.create_directory()
+            if os.path.exists(temporary_filename):
+                os.remove(temporary_filename)
+            method = self.__link(source, temporary_filename)
+            hd.remove()
+            os.replace(temporary_filename, target)
+            HumbleHash.record_checksum(target, hd.humble_md5)
+            hd.requires_download = False
+            logger.display_message(
+                    False, "Download", "%s: %s from %s." %
+                    (hd.filename, method, source))
+        except OSError as e:
+            hd.status_message = "Failed to materialize %s from %s: %s" % (
+                    target, source, e)
+            self.failed_downloads.append(hd)
+            Events.trigger(Events.EVENT_DOWNLOAD_FAILED, hd.filename)
+        finally:
+            ProgressTracker.complete_download(hd)
+
+    def __link(self, source, target):
+        """
+            Creates target from source with the first method of the mode which
+            works.
+
+            :return:  The name of the method used.
+            :rtype: str
+        """
+        if self.mode == "hardlink":
+            try:
+                os.link(source, target)
+                return "hard linked"
+            except OSError:
+                pass
+
+        if self.mode in ["hardlink", "reflink"] and fcntl is not None:
+            try:
+                with open(source, "rb") as s, open(target, "wb") as t:
+                    fcntl.ioctl(t.fileno(), Deduplicator.FICLONE, s.fileno())
+                return "cloned"
+            except OSError:
+                if os.path.exists(target):
+                    os.remove(target)
+
+        shutil.copyfile(source, target)
+        return "copied"
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import os
+import queue
+import threading
+
+__author__ = "Brian Schkerke"
+__copyright__ = "Copyright 2020 Brian Schkerke"
+__license__ = "MIT"
+
+
+class DiskWriter(object):
+    """
+        Writes the chunks of a download to disk on a separate thread, fed
+        through a bounded queue, so that a slow disk doesn't stall the network
+        reader and the other way round.  The running MD5 and the checkpoint of
+        the file are updated by the writer as the chunks reach the file.
+
+        It is used as a context manager.  Leaving it waits for the queued
+        chunks to be written, flushes the file and saves the checkpoint.
+
+            with DiskWriter(full_filename, "wb", md5_hash, checkpoint) as writer:
+                for chunk in response.iter_content():
+                    writer.write(chunk)
+    """
+
+    def __init__(self, full_filename, mode, md5_hash, checkpoint,
+                 queue_size=8, fsync=False):
+        """
+            Parameterized constructor for the DiskWriter.
+
+            :param str full_filename:  The file to write.
+            :param str mode:  "wb" to start afresh, "ab" to append.
+            :param md5_hash:  The running MD5 the chunks are added to.
+            :param checkpoint:  The HashCheckpoint the chunks are added to.
+            :param int queue_size:  The number of chunks which can wait for the
+            disk before the reader is held up.
+            :param bool fsync:  Force the file to the storage device once
+            completely written.
+        """
+        self.full_filename = full_filename
+        self.mode = mode
+        self.md5_hash = md5_hash
+        self.checkpoint = checkpoint
+        self.fsync = fsync
+        self.__queue = queue.Queue(maxsize=max(1, queue_size))
+        self.__error = None
+        self.__file = None
+        self.__thread = None
+
+    def __enter__(self):
+        self.__file = open(self.full_filename, self.mode)
+        self.__thread = threading.Thread(target=self.__run, daemon=True)
+        self.__thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.__queue.put(None)
+        self.__thread.join()
+
+        try:
+            # Whatever was received is on disk, remember it.
+            self.__file.flush()
+            self.checkpoint.save()
+            if self.fsync and exc_type is None and self.__error is None:
+                os.fsync(self.__file.fileno())
+        finally:
+            self.__file.close()
+
+        if exc_type is None and self.__error is not None:
+            raise self.__error
+
+        return False
+
+    def write(self, chunk):
+        """
+            Queues a chunk to be written, waiting if the queue is full.
+
+            :param bytes chunk:  The data to append to the file.
+            :raises OSError:  If writing an earlier chunk failed.
+        """
+        if self.__error is not None:
+            raise self.__error
+
+        self.__queue.put(chunk)
+
+    def __run(self):
+        """ Writes the queued chunks until the end marker is received. """
+        while True:
+            chunk = self.__queue.get()
+            if chunk is None:
+                return
+            if self.__error is not None:
+                # Keep draining so the reader is never blocked.
+                continue
+
+            try:
+                self.__file.write(chunk)
+                self.md5_hash.update(chunk)
+                if self.checkpoint.update(chunk):
+                    self.__file.flush()
+                    self.checkpoint.save()
+            except Exception as e:
+                self.__error = e
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+import requests
+from hb_downloader.humble_api.events import Events
+from hb_downloader.humble_api.retry_policy import CircuitBreaker
+from hb_downloader.humble_api.retry_policy import RetryPolicy
+from hb_downloader.progress_tracker import ProgressTracker
+from hb_downloader import logger
+
+__author__ = "Brian Schkerke"
+__copyright__ = "Copyright 2020 Brian Schkerke"
+__license__ = "MIT"
+
+
+class DownloadEngine(object):
+    """
+        Downloads a list of Humble Downloads on a bounded pool of threads.
+        The number of simultaneous downloads from a single host can
+        optionally be capped.  A download which fails is recorded and does
+        not interrupt the others.
+
+        A transfer failing transiently is retried according to the retry
+        policy, resuming from the last byte written.  Failures are reported
+        per host to the circuit breaker, which pauses the downloads from a
+        host that keeps failing.
+    """
+
+    # HTTP statuses meaning the signed URL of a download expired.
+    EXPIRED_STATUSES = [403, 410]
+
+    def __init__(self, workers=1, host_connections=0, prepare=None,
+                 retry_policy=None, circuit_breaker=None):
+        """
+            Parameterized constructor for the DownloadEngine.
+
+            :param int workers:  The number of files downloaded at the same time.
+            :param int host_connections:  The maximum number of simultaneous
+            downloads from a single host.  0 means no limit.
+            :param prepare:  (optional) A function called with each Humble
+            Download right before it starts, e.g. to refresh its URL.  If the
+            server rejects the URL as expired, it is called again with
+            expired=True and the download is retried once.
+            :param retry_policy:  (optional) The RetryPolicy of the transfers.
+            Without one, a failed transfer isn't retried.
+            :param circuit_breaker:  (optional) The CircuitBreaker pausing the
+            downloads from failing hosts.
+        """
+        self.workers = max(1, workers)
+        self.host_connections = max(0, host_connections)
+        self.prepare = prepare
+        self.retry_policy = retry_policy or RetryPolicy(retries=0)
+        self.circuit_breaker = circuit_breaker or CircuitBreaker(threshold=0)
+        self.failed_downloads = []
+        self.__host_semaphores = {}
+        self.__lock = threading.Lock()
+
+    def run(self, humble_downloads):
+        """
+            Downloads every item of the list and waits for all of them to
+            finish.
+
+            :param list humble_downloads:  The Humble Downloads to download, in
+            the order they should be started.
+            :return:  The Humble Downloads which failed.
+            :rtype: list
+        """
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for _ in executor.map(self.__download, humble_downloads):
+                pass
+
+        return self.failed_downloads
+
+    def __download(self, hd):
+        """
+            Downloads a single file, recording it as failed if anything goes
+            wrong.
+
+            :param hd:  The Humble Download to download.
+        """
+        try:
+            if self.prepare is not None:
+                self.prepare(hd)
+
+            attempt = 0
+            while True:
+                host = urlparse(hd.download_url or "").hostname or ""
+                self.circuit_breaker.wait(host)
+                try:
+                    self.__download_file(hd, attempt)
+                    self.circuit_breaker.record_success(host)
+                    break
+                except Exception as e:
+                    delay = DownloadEngine.retry_delay(
+                            self.retry_policy, self.circuit_breaker, hd, host,
+                            e, attempt)
+                    if delay is None:
+                        raise
+                    attempt += 1
+                    time.sleep(delay)
+        except Exception as e:
+            hd.status_message = "Download of %s failed: %s" % (hd.filename, e)
+            logger.display_message(False, "Error", hd.status_message)
+            with self.__lock:
+                self.failed_downloads.append(hd)
+            Events.trigger(Events.EVENT_DOWNLOAD_FAILED, hd.filename)
+        finally:
+            ProgressTracker.complete_download(hd)
+
+    @staticmethod
+    def retry_delay(retry_policy, circuit_breaker, hd, host, error, attempt):
+        """
+            Reports a failed transfer to the circuit breaker and decides
+            whether it is retried.
+
+            :param retry_policy:  The RetryPolicy of the transfers.
+            :param circuit_breaker:  The CircuitBreaker of the hosts.
+            :param hd:  The Humble Download which failed.
+            :param str host:  The host it was downloaded from.
+            :param Exception error:  The error raised by the transfer.
+            :param int attempt:  The number of retries already made.
+            :return:  The number of seconds to wait before retrying, or None
+            if the download must be given up.
+        """
+        if not retry_policy.is_retryable(error):
+            return None
+
+        if circuit_breaker.record_failure(host):
+            logger.display_message(
+                    False, "Download",
+                    "%s keeps failing, pausing its downloads for %d seconds." %
+                    (host, circuit_breaker.cooldown))
+        if not retry_policy.should_retry(error, attempt):
+            return None
+
+        delay = retry_policy.delay(attempt, RetryPolicy.retry_after(error))
+        logger.display_message(
+                False, "Download",
+                "Download of %s failed (%s), retry %d of %d in %.1f seconds." %
+                (hd.filename, error, attempt + 1, retry_policy.retries, delay))
+        Events.trigger(Events.EVENT_RETRY, hd.filename)
+        return delay
+
+    def __download_file(self, hd, attempt):
+        """
+            Makes one attempt at downloading a file.  If the server rejects
+            its URL as expired, the URL is refreshed and the download retried
+            once.
+
+            :param hd:  The Humble Download to download.
+            :param int attempt:  The number of retries already made.  Retries
+            resume the file from the last byte written.
+        """
+        with self.__host_semaphore(hd.download_url):
+            ProgressTracker.assign_download(hd)
+            ProgressTracker.display_summary()
+            logger.display_message(False, "Download", hd.status_message)
+            logger.display_message(
+                    False, "Download",
+                    "Downloading %s (%s)." %
+                    (hd.filename, hd.humble_file_size_human))
+            try:
+                if attempt > 0:
+                    hd.download_file(resume=True)
+                else:
+                    hd.download_file()
+            except requests.HTTPError as e:
+                if (self.prepare is None or e.response is None or
+                        e.response.status_code not in
+                        self.EXPIRED_STATUSES):
+                    raise
+                logger.display_message(
+                        False, "Download",
+                        "The URL of %s expired, refreshing it." %
+                        hd.filename)
+                self.prepare(hd, expired=True)
+                hd.download_file(resume=True)
+
+    def __host_semaphore(self, url):
+        """
+            Returns the semaphore limiting the connections to the host of the
+            given URL.
+
+            :param str url:  The URL about to be downloaded.
+            :return:  A context manager to hold while downloading.
+        """
+        if self.host_connections == 0:
+            return _NoLimit()
+
+        host = urlparse(url or "").hostname or ""
+        with self.__lock:
+            if host not in self.__host_semaphores:
+                self.__host_semaphores[host] = threading.BoundedSemaphore(
+                        self.host_connections)
+            return self.__host_semaphores[host]
+
+
+class _NoLimit(object):
+    """ Stands in for a host semaphore when connections are not capped. """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
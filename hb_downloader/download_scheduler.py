@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import itertools
+
+__author__ = "Brian Schkerke"
+__copyright__ = "Copyright 2020 Brian Schkerke"
+__license__ = "MIT"
+
+
+class DownloadScheduler(object):
+    """
+        Decides in which order the planned downloads are started, according
+        to a policy:
+
+        default:  Orders as they were processed, files as listed in the order.
+        smallest:  Smallest files first, to complete as many files as
+        possible early.
+        largest:  Largest files first, to keep the connection busy.
+        newest:  Files of the most recent orders first.
+        platform:  Files of the platforms listed in the platform priority
+        first, in that order.
+        round-robin:  One file of each order in turn.
+
+        Sorting is stable, so downloads which compare equal keep the default
+        order.
+    """
+    POLICIES = ["default", "smallest", "largest", "newest", "platform",
+                "round-robin"]
+
+    def __init__(self, policy="default", platform_priority=None):
+        """
+            Parameterized constructor for the DownloadScheduler.
+
+            :param str policy:  One of POLICIES.
+            :param list platform_priority:  (optional) The platforms to
+            download first, used by the platform policy.
+            :raises ValueError:  If the policy is unknown.
+        """
+        if policy not in DownloadScheduler.POLICIES:
+            raise ValueError("Unknown download policy %s, expected one of %s"
+                             % (policy, ", ".join(DownloadScheduler.POLICIES)))
+
+        self.policy = policy
+        self.platform_priority = list(platform_priority or [])
+
+    def schedule(self, key_downloads):
+        """
+            Orders the planned downloads.
+
+            :param dict key_downloads:  The Humble Downloads grouped by order
+            key, in the order the orders were processed.
+            :return:  The Humble Downloads in the order they should be started.
+            :rtype: list
+        """
+        humble_downloads = [hd for key in key_downloads
+                            for hd in key_downloads[key]]
+
+        if self.policy == "smallest":
+            return sorted(humble_downloads,
+                          key=lambda hd: hd.humble_file_size or 0)
+        if self.policy == "largest":
+            return sorted(humble_downloads,
+                          key=lambda hd: -(hd.humble_file_size or 0))
+        if self.policy == "newest":
+            # Orders without a date go last.
+            return sorted(humble_downloads,
+                          key=lambda hd: hd.order_created or "", reverse=True)
+        if self.policy == "platform":
+            return sorted(humble_downloads, key=self.__platform_rank)
+        if self.policy == "round-robin":
+            return [hd for group in itertools.zip_longest(
+                        *key_downloads.values())
+                    for hd in group if hd is not None]
+
+        return humble_downloads
+
+    def __platform_rank(self, hd):
+        """ Ranks a download by the priority of its platform. """
+        if hd.platform in self.platform_priority:
+            return self.platform_priority.index(hd.platform)
+
+        return len(self.platform_priority)
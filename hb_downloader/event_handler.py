@@ -1,8 +1,11 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
+import atexit
 import sys
 from hb_downloader import logger
+from hb_downloader.config_data import ConfigData
 from hb_downloader.humble_api.events import Events
+from hb_downloader.progress_renderer import ProgressRenderer
 
 __author__ = "Brian Schkerke"
 __copyright__ = "Copyright 2020 Brian Schkerke"
@@ -10,35 +13,36 @@ __license__ = "MIT"
 
 
 class EventHandler(object):
+    renderer = None
+
     @staticmethod
     def initialize():
-        Events.on(Events.EVENT_MD5_START, EventHandler.print_md5_start)
-        Events.on(Events.EVENT_MD5_END, EventHandler.print_md5_end)
+        """
+            Prints one line per started and finished file, and starts drawing
+            the progress of the files in progress.  On a terminal it is
+            redrawn in place, otherwise, e.g. under cron, it is printed every
+            progress_interval seconds so that log collectors don't get every
+            redraw.
+        """
+        Events.on(Events.EVENT_MD5_START,
+                  lambda filename: EventHandler.print_line(
+                          "Checksum", filename, "started"))
+        Events.on(Events.EVENT_MD5_END,
+                  lambda filename: EventHandler.print_line(
+                          "Checksum", filename, "finished"))
         Events.on(Events.EVENT_DOWNLOAD_START,
-                  EventHandler.print_download_start)
-        Events.on(Events.EVENT_DOWNLOAD_END, EventHandler.print_download_end)
-        Events.on(Events.EVENT_PROGRESS, EventHandler.print_progress)
-
-    @staticmethod
-    def print_md5_start(filename):
-        logger.display_message(False, "Checksum", "{0}: {1:7.2f}% ".format(filename, 0), False)
-        sys.stdout.flush()
-
-    @staticmethod
-    def print_md5_end(filename):
-        print("")
-
-    @staticmethod
-    def print_download_start(filename):
-        logger.display_message(False, "Download", "{0}: {1:7.2f}% ".format(filename, 0), False)
-        sys.stdout.flush()
-
-    @staticmethod
-    def print_download_end(filename):
-        sys.stdout.write(" \b\b\b\b\b\b\b\b\b\bfinished.\n")
-        sys.stdout.flush()
+                  lambda filename: EventHandler.print_line(
+                          "Download", filename, "started"))
+        Events.on(Events.EVENT_DOWNLOAD_END,
+                  lambda filename: EventHandler.print_line(
+                          "Download", filename, "finished"))
+
+        EventHandler.renderer = ProgressRenderer(
+                sys.stdout.isatty(), ConfigData.progress_refresh,
+                ConfigData.progress_interval)
+        EventHandler.renderer.start()
+        atexit.register(EventHandler.renderer.stop)
 
     @staticmethod
-    def print_progress(percentage):
-        sys.stdout.write(" \b\b\b\b\b\b\b\b\b\b{0:7.2f}% ".format(percentage))
-        sys.stdout.flush()
+    def print_line(category, filename, state):
+        logger.display_message(False, category, "%s: %s." % (filename, state))
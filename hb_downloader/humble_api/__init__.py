@@ -2,4 +2,5 @@ __author__ = "Joel Pedraza, Brian Schkerke"
 __copyright__ = "Copyright 2014 Joel Pedraza, 2016 Brian Schkerke"
 __license__ = "MIT"
 
-__all__ = ["Events", "HumbleApi", "HumbleHash"]
+__all__ = ["Events", "FileInfoProber", "HashCheckpoint", "HumbleApi", "HumbleHash", "OrderCache", "Profiler",
+           "ProgressAggregator", "RetryPolicy", "StateStore", "TrafficArchive"]
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import asyncio
+import time
+from .events import Events
+from .humble_api import HumbleApi
+from .exceptions.humble_exception import HumbleException
+from .exceptions.humble_response_exception import HumbleResponseException
+from .exceptions.humble_parse_exception import HumbleParseException
+from .retry_policy import RetryPolicy
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+__author__ = "Brian Schkerke"
+__copyright__ = "Copyright 2020 Brian Schkerke"
+__license__ = "MIT"
+
+__all__ = ["AsyncHumbleApi"]
+
+
+class AsyncHumbleApi(object):
+    """
+        The asyncio counterpart of HumbleApi, built on aiohttp.  A single event loop can have hundreds of requests in
+        flight over the connection pool of one AsyncHumbleApi.
+
+        It must be used as an asynchronous context manager, which opens and closes its session:
+
+            async with AsyncHumbleApi(auth_sess_cookie) as api:
+                gamekeys = await api.get_gamekeys()
+
+        URLs, default headers and parameters, the order cache and the retry policy are shared with HumbleApi.  Traffic
+        is neither recorded nor replayed.  The order cache is read and written on the executor of the loop.
+    """
+
+    # The aiohttp errors of a transfer which was interrupted or never started, retried by the retry policy.
+    RETRY_ERRORS = (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError,
+                    asyncio.TimeoutError) if aiohttp is not None else ()
+
+    def __init__(self, auth_sess_cookie, connection_limit=100):
+        """
+            Parameterized constructor for the AsyncHumbleApi.
+
+            :param str auth_sess_cookie: The _simpleauth_sess cookie value.
+            :param int connection_limit: The maximum number of connections opened at the same time.
+            :raises HumbleException: If aiohttp is not installed.
+        """
+        if aiohttp is None:
+            raise HumbleException("The asyncio engine requires the aiohttp library (pip install aiohttp).")
+
+        self.auth_sess_cookie = bytes(auth_sess_cookie, "utf-8").decode("unicode_escape")
+        self.connection_limit = connection_limit
+        self.session = None
+        self.retry_policy = RetryPolicy(HumbleApi.retry_policy.retries, HumbleApi.retry_policy.backoff,
+                                        AsyncHumbleApi.RETRY_ERRORS)
+
+        # The authentication cookie is only sent to humblebundle.com, never to the file servers.
+        self.api_headers = dict(HumbleApi.default_headers)
+        self.api_headers["Cookie"] = "_simpleauth_sess=%s" % self.auth_sess_cookie
+
+    async def __aenter__(self):
+        self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.connection_limit),
+                timeout=aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=30))
+        return self
+
+    async def __aexit__(self, *args):
+        await self.session.close()
+        self.session = None
+
+    async def get_gamekeys(self):
+        """
+            Fetch all the gamekeys owned by an account.
+
+            :return: A list of gamekeys
+            :rtype: list
+            :raises aiohttp.ClientError: if the connection failed
+            :raises HumbleAuthenticationException: if not logged in
+            :raises HumbleResponseException: if the response was invalid
+        """
+        response = await self.__request(HumbleApi.ORDER_LIST_URL, self.api_headers)
+        data = await self.__parse_data(response)
+
+        if isinstance(data, list):
+            return [v["gamekey"] for v in data]
+
+        HumbleApi._authenticated_response_helper(None, data)
+        raise HumbleResponseException("Unexpected response body")
+
+    async def get_order(self, order_id, get_extra_file_info=False, force_refresh=False):
+        """
+            Download an order by its ID, going through the order cache exactly like HumbleApi.get_order.
+
+            :param order_id: The identifier ("gamekey") that uniquely identifies the order
+            :param bool get_extra_file_info: (optional) Probe the last modified date of every file of the order
+            :param bool force_refresh: (optional) Bypass the order cache
+            :return: The :py:class:`Order` requested
+            :rtype: Order
+            :raises aiohttp.ClientError: if the connection failed
+            :raises HumbleAuthenticationException: if not logged in
+            :raises HumbleResponseException: if the response was invalid
+        """
+        loop = asyncio.get_running_loop()
+        url = HumbleApi.ORDER_URL.format(order_id=order_id)
+        order_cache = HumbleApi.order_cache
+
+        cached = None
+        if order_cache is not None and not force_refresh:
+            cached = await loop.run_in_executor(None, order_cache.get, order_id)
+
+        headers = dict(self.api_headers)
+        if cached is not None:
+            if order_cache.is_fresh(cached):
+                return await self.__build_order(cached["data"], get_extra_file_info)
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        response = await self.__request(url, headers)
+        if cached is not None and response.status == 304:
+            await loop.run_in_executor(None, order_cache.touch, order_id, cached)
+            return await self.__build_order(cached["data"], get_extra_file_info)
+
+        if response.status == 404:
+            raise HumbleResponseException("Order not found")
+
+        data = await self.__parse_data(response)
+        if HumbleApi._authenticated_response_helper(None, data):
+            if order_cache is not None:
+                await loop.run_in_executor(None, order_cache.put, order_id, data, response.headers.get("ETag"),
+                                           response.headers.get("Last-Modified"))
+            return await self.__build_order(data, get_extra_file_info)
+
+    async def stream(self, url, start=0, chunk_size=8192000):
+        """
+            Streams a file, optionally from a given offset.
+
+            :param str url: The URL of the file.
+            :param int start: (optional) The offset to start at.  Ignored by servers which don't support ranges.
+            :param int chunk_size: The maximum size of a chunk.
+            :return: An asynchronous generator, yielding the offset the server actually started at first, then the
+             chunks of the file.
+            :raises aiohttp.ClientResponseError: if the server returned an error
+        """
+        headers = {"Range": "bytes=%d-" % start} if start > 0 else {}
+        async with self.session.get(url, headers=headers) as response:
+            response.raise_for_status()
+            yield start if response.status == 206 else 0
+            async for chunk in response.content.iter_chunked(chunk_size):
+                yield chunk
+
+    async def __request(self, url, headers):
+        """
+            Sends a GET request to humblebundle.com and reads the whole response, retrying it according to the retry
+            policy exactly like HumbleApi._request.
+
+            :param str url: The URL requested.
+            :param dict headers: The headers of the request.
+            :return: The response, whose body was already read.
+            :rtype: aiohttp.ClientResponse
+        """
+        # Connection errors, timeouts and transient server errors are retried according to the retry policy.
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            try:
+                async with self.session.get(url, params=HumbleApi.default_params, headers=headers) as response:
+                    await response.read()
+                Events.trigger(Events.EVENT_API_REQUEST, (url, response.status, time.perf_counter() - started))
+            except AsyncHumbleApi.RETRY_ERRORS as e:
+                Events.trigger(Events.EVENT_API_REQUEST, (url, None, time.perf_counter() - started))
+                if not self.retry_policy.should_retry(e, attempt):
+                    raise
+                delay = self.retry_policy.delay(attempt)
+            else:
+                if not self.retry_policy.should_retry_status(response.status, attempt):
+                    return response
+                delay = self.retry_policy.delay(attempt, response.headers.get("Retry-After"))
+
+            Events.trigger(Events.EVENT_RETRY, url)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    @staticmethod
+    async def __build_order(data, get_extra_file_info):
+        """ Builds an Order, probing its files on the executor of the loop as it blocks. """
+        if not get_extra_file_info:
+            return HumbleApi._build_order(data)
+
+        return await asyncio.get_running_loop().run_in_executor(None, HumbleApi._build_order, data, True)
+
+    @staticmethod
+    async def __parse_data(response):
+        """
+            Try and parse the response data as JSON.
+
+            :raises HumbleParseException: When the response cannot be parsed as a JSON object.
+        """
+        try:
+            return await response.json(content_type=None)
+        except ValueError as e:
+            raise HumbleParseException("Invalid JSON: %s" % str(e))
@@ -19,7 +19,19 @@ class Events(object):
     EVENT_MD5_END = "MD5_End"
     EVENT_DOWNLOAD_START = "Download_Start"
     EVENT_DOWNLOAD_END = "Download_End"
-    EVENT_PROGRESS = "Progress"
+    EVENT_RETRY = "Retry"
+
+    # Fired with the number of bytes of each chunk hashed or received.
+    EVENT_MD5_BYTES = "MD5_Bytes"
+    EVENT_DOWNLOAD_BYTES = "Download_Bytes"
+
+    # Fired with the filename of a file already downloaded, or which couldn't be downloaded.
+    EVENT_DOWNLOAD_SKIPPED = "Download_Skipped"
+    EVENT_DOWNLOAD_FAILED = "Download_Failed"
+
+    # Fired with a (url, status, seconds) tuple for every response from humblebundle.com.  status is None if no
+    # response was received.
+    EVENT_API_REQUEST = "API_Request"
 
     @staticmethod
     def on(event_name, callback):
@@ -57,21 +69,3 @@ class Events(object):
         if Events._callbacks is not None and event_name in Events._callbacks:
             for callback in Events._callbacks[event_name]:
                 callback(callback_argument)
-
-    @staticmethod
-    def check_percent(current, total, current_percentage):
-        """
-            Checks whether the current progress exceeds the current percentage.  Used to determine whether
-            an event should be fired.
-            :param current:  The current progress in whatever proprietary format your heart desires.
-            :param total:  The total progress in whatever proprietary format your heart desires.
-            :param current_percentage:  The current progress percentage as last defined.
-            :return:  The new value for the current_percentage, if it is modified.
-        """
-        percentage = current / total * 100
-        percentage -= percentage % 0.01
-        if current_percentage < percentage:
-            current_percentage = percentage
-            Events.trigger(Events.EVENT_PROGRESS, current_percentage)
-
-        return current_percentage
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+
+__author__ = "Brian Schkerke"
+__copyright__ = "Copyright 2020 Brian Schkerke"
+__license__ = "MIT"
+
+__all__ = ["FileInfoProber"]
+
+
+class FileInfoProber(object):
+    """
+        Retrieves the Last-Modified header of download files with HEAD requests, many at a time over a shared pool of
+        connections.
+
+        Results are cached by the host and path of the URL, which stay the same while the signature in the query
+        string changes on every order retrieval.  The cache is optionally persisted so later runs don't probe the
+        same files again.
+    """
+
+    def __init__(self, cache_filename="", workers=16):
+        """
+            Parameterized constructor for the FileInfoProber.
+
+            :param str cache_filename: (optional) The JSON file the results are persisted in.  Empty to keep them in
+             memory only.
+            :param int workers: The number of HEAD requests sent at the same time.
+        """
+        self.cache_filename = cache_filename
+        self.workers = max(1, workers)
+        self.__lock = threading.Lock()
+        self.__cache = self.__load()
+        self.__modified = False
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.workers, pool_maxsize=self.workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    @staticmethod
+    def download_structs(orders):
+        """
+            Lists every DownloadStruct of the given orders.
+
+            :param list orders: The orders to list.
+            :rtype: list
+        """
+        return [download_struct for order in orders
+                for subproduct in order.subproducts or []
+                for download in subproduct.downloads or []
+                for download_struct in download.download_structs]
+
+    def probe(self, download_structs):
+        """
+            Sets the last_modified date of every DownloadStruct which has a web download URL, probing the files which
+            aren't cached yet in parallel.
+
+            :param list download_structs: The DownloadStructs to update.
+        """
+        download_structs = [ds for ds in download_structs if ds.download_web is not None]
+        pending = {}
+        for ds in download_structs:
+            key = FileInfoProber.cache_key(ds.download_web)
+            with self.__lock:
+                cached = key in self.__cache
+            if not cached:
+                pending.setdefault(key, ds.download_web)
+
+        if len(pending) > 0:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                for key, last_modified in zip(pending, executor.map(self.__head, pending.values())):
+                    # Failures aren't cached, they are probed again next time.
+                    if last_modified is None:
+                        continue
+                    with self.__lock:
+                        self.__cache[key] = last_modified
+                        self.__modified = True
+            self.save()
+
+        for ds in download_structs:
+            with self.__lock:
+                ds.set_last_modified(self.__cache.get(FileInfoProber.cache_key(ds.download_web)))
+
+    def save(self):
+        """ Atomically writes the cache, if it is persisted and changed. """
+        with self.__lock:
+            if not self.cache_filename or not self.__modified:
+                return
+            temporary_filename = self.cache_filename + ".tmp"
+            with open(temporary_filename, "w", encoding="utf-8") as f:
+                json.dump(self.__cache, f)
+            os.replace(temporary_filename, self.cache_filename)
+            self.__modified = False
+
+    @staticmethod
+    def cache_key(url):
+        """
+            Identifies a file regardless of the signature of its URL.
+
+            :param str url: The download URL of the file.
+            :rtype: str
+        """
+        parsed_url = urlparse(url)
+        return parsed_url.netloc + parsed_url.path
+
+    def __head(self, url):
+        """
+            Sends a HEAD request for a file.
+
+            :param str url: The download URL of the file.
+            :return: The Last-Modified header, or None if the request failed or the server didn't send one.
+        """
+        try:
+            response = self.session.head(url, timeout=30)
+        except requests.RequestException:
+            return None
+
+        if response.status_code != requests.codes.ok:
+            return None
+
+        return response.headers.get("Last-Modified", None)
+
+    def __load(self):
+        """ Loads the persisted cache, starting afresh if it is missing or unreadable. """
+        if not self.cache_filename:
+            return {}
+
+        try:
+            with open(self.cache_filename, "r", encoding="utf-8") as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+        return cache if isinstance(cache, dict) else {}
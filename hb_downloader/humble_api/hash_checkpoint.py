@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import hashlib
+import json
+import os
+from .humble_hash import HumbleHash
+
+__author__ = "Brian Schkerke"
+__copyright__ = "Copyright 2020 Brian Schkerke"
+__license__ = "MIT"
+
+__all__ = ["HashCheckpoint"]
+
+
+class HashCheckpoint(object):
+    """
+        Records the MD5 of every block written to a partial download in a file next to it, along with the size and
+        modification time of the partial file when the checkpoint was saved.
+
+        When the download is resumed, a partial file which didn't change since the checkpoint is trusted as is.
+        Otherwise its blocks are compared with the recorded digests and the file is truncated after the last block
+        which still matches, so only the damaged tail is downloaded again.
+    """
+    block_size = 64 * 1024 * 1024
+
+    def __init__(self, full_filename):
+        """
+            Parameterized constructor for the HashCheckpoint.  Loads the checkpoint of the file, if any.
+
+            :param str full_filename: The full path and filename of the partial download.
+        """
+        self.full_filename = full_filename
+        self.checkpoint_filename = HashCheckpoint.checkpoint_filename(full_filename)
+        self.digests = []
+        self.__saved_state = None
+        self.__block_hash = hashlib.md5()
+        self.__block_fill = 0
+        self.__load()
+
+    @staticmethod
+    def checkpoint_filename(full_filename):
+        """
+            Calculates the checkpoint filename for a given file.
+
+            :param str full_filename: The full path and filename of the partial download.
+            :rtype: str
+        """
+        return full_filename + ".hbpart"
+
+    @staticmethod
+    def remove(full_filename):
+        """
+            Removes the checkpoint of the given file, if any.
+
+            :param str full_filename: The full path and filename of the partial download.
+        """
+        checkpoint_filename = HashCheckpoint.checkpoint_filename(full_filename)
+        if os.path.exists(checkpoint_filename):
+            os.remove(checkpoint_filename)
+
+    @property
+    def verified_offset(self):
+        """ The number of bytes at the start of the file covered by a block digest. """
+        return len(self.digests) * self.block_size
+
+    def update(self, data):
+        """
+            Adds data appended to the file to the block digests.
+
+            :param bytes data: The data written.
+            :return: True if at least one block was completed, meaning the checkpoint should be saved.
+            :rtype: bool
+        """
+        completed_block = False
+        data = memoryview(data)
+
+        while len(data) > 0:
+            length = min(len(data), self.block_size - self.__block_fill)
+            self.__block_hash.update(data[:length])
+            self.__block_fill += length
+            data = data[length:]
+
+            if self.__block_fill == self.block_size:
+                self.digests.append(self.__block_hash.hexdigest())
+                self.__block_hash = hashlib.md5()
+                self.__block_fill = 0
+                completed_block = True
+
+        return completed_block
+
+    def save(self):
+        """ Atomically writes the checkpoint.  The data written to the file must have been flushed. """
+        stat = os.stat(self.full_filename)
+        temporary_filename = self.checkpoint_filename + ".tmp"
+        with open(temporary_filename, "w") as f:
+            json.dump({"block_size": self.block_size,
+                       "digests": self.digests,
+                       "verified_offset": self.verified_offset,
+                       "size": stat.st_size,
+                       "mtime_ns": stat.st_mtime_ns}, f)
+        os.replace(temporary_filename, self.checkpoint_filename)
+
+    def resume(self, md5_hash, length):
+        """
+            Reads the existing prefix of the file into a running hash and the block digests, keeping only the part of
+            the prefix which can be trusted.  The file is truncated to that length.
+
+            :param md5_hash: The hashlib object the prefix is fed into.
+            :param int length: The number of bytes of the file to resume from.
+            :return: A tuple of the updated hashlib object and the number of bytes which can be kept.
+            :rtype: tuple
+        """
+        # Without a checkpoint there is nothing to compare against, the whole prefix is trusted as before.
+        known_digests = self.digests
+        trusted = self.__saved_state is None or self.__unchanged()
+        self.digests = []
+        self.__block_hash = hashlib.md5()
+        self.__block_fill = 0
+        kept_length = 0
+
+        with open(self.full_filename, "rb") as f:
+            while kept_length < length:
+                block_length = min(self.block_size, length - kept_length)
+                block_hash = hashlib.md5()
+                candidate_hash = md5_hash.copy()
+                read_bytes = 0
+
+                for data in HumbleHash.read_chunks(f, block_length):
+                    block_hash.update(data)
+                    candidate_hash.update(data)
+                    read_bytes += len(data)
+
+                block_index = kept_length // self.block_size
+                if not trusted and (read_bytes < self.block_size or block_index >= len(known_digests) or
+                                    block_hash.hexdigest() != known_digests[block_index]):
+                    break
+
+                md5_hash = candidate_hash
+                kept_length += read_bytes
+                if read_bytes == self.block_size:
+                    self.digests.append(block_hash.hexdigest())
+                else:
+                    self.__block_hash = block_hash
+                    self.__block_fill = read_bytes
+
+                if read_bytes < block_length:
+                    break
+
+        if kept_length < os.path.getsize(self.full_filename):
+            with open(self.full_filename, "r+b") as f:
+                f.truncate(kept_length)
+
+        return md5_hash, kept_length
+
+    def __load(self):
+        """ Loads the saved checkpoint, ignoring it if it is unreadable or used another block size. """
+        try:
+            with open(self.checkpoint_filename, "r") as f:
+                state = json.load(f)
+            if state.get("block_size") != self.block_size:
+                return
+            self.digests = list(state["digests"])
+            self.__saved_state = (state["size"], state["mtime_ns"])
+        except (OSError, ValueError, KeyError, TypeError):
+            self.digests = []
+            self.__saved_state = None
+
+    def __unchanged(self):
+        """ Determines whether the file is still exactly as it was when the checkpoint was saved. """
+        try:
+            stat = os.stat(self.full_filename)
+        except OSError:
+            return False
+
+        return (stat.st_size, stat.st_mtime_ns) == self.__saved_state
@@ -2,8 +2,14 @@
 # -*- coding: utf-8 -*-
 import http.cookiejar
 import itertools
+import time
 from .model.order import Order
+from .events import Events
+from .file_info_prober import FileInfoProber
+from .profiler import Profiler
+from .retry_policy import RetryPolicy
 import requests
+from requests.adapters import HTTPAdapter
 from .exceptions.humble_response_exception import HumbleResponseException
 from .exceptions.humble_parse_exception import HumbleParseException
 from .exceptions.humble_authentication_exception import HumbleAuthenticationException
@@ -43,6 +49,24 @@ class HumbleApi(object):
     # request sent to humblebundle.com.
     default_params = {"ajax": "true"}
 
+    # connection_pool_size specifies how many connections to humblebundle.com are kept open.  It should be at least
+    # the number of threads sharing a single HumbleApi object.
+    connection_pool_size = 10
+
+    # order_cache is an optional OrderCache used by get_order to avoid retrieving unchanged orders on every run.
+    order_cache = None
+
+    # file_info_prober is the FileInfoProber used when the extra file info of an order is requested.  One with an
+    # in-memory cache is created when first needed if none was configured.
+    file_info_prober = None
+
+    # retry_policy decides which failed requests to humblebundle.com are retried and when.
+    retry_policy = RetryPolicy()
+
+    # traffic_archive is an optional TrafficArchive recording the responses received, or replaying them instead of
+    # contacting humblebundle.com.
+    traffic_archive = None
+
     def __init__(self, auth_sess_cookie):
         """
             Base constructor.  Responsible for setting up the requests object
@@ -51,6 +75,10 @@ class HumbleApi(object):
             not take effect on variables which already exist.
         """
         self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.connection_pool_size,
+                              pool_maxsize=self.connection_pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
 
         auth_sess_cookie = bytes(
                 auth_sess_cookie, "utf-8").decode("unicode_escape")
@@ -97,25 +125,33 @@ class HumbleApi(object):
             :raises HumbleAuthenticationException: if not logged in
             :raises HumbleResponseException: if the response was invalid
         """
-        response = self._request("GET", HumbleApi.ORDER_LIST_URL, *args, **kwargs)
+        with Profiler.phase("get_gamekeys"):
+            response = self._request("GET", HumbleApi.ORDER_LIST_URL, *args, **kwargs)
 
-        """ get_gamekeys response always returns JSON """
-        data = self.__parse_data(response)
+            """ get_gamekeys response always returns JSON """
+            data = self.__parse_data(response)
 
         if isinstance(data, list):
             return [v["gamekey"] for v in data]
 
         # Let the helper function raise any common exceptions
-        self.__authenticated_response_helper(response, data)
+        self._authenticated_response_helper(response, data)
 
         # We didn't get a list, or an error message
         raise HumbleResponseException("Unexpected response body", request=response.request, response=response)
 
-    def get_order(self, order_id, get_extra_file_info=False, *args, **kwargs):
+    def get_order(self, order_id, get_extra_file_info=False, force_refresh=False, *args, **kwargs):
         """
             Download an order by its ID.
 
+            When an order cache is configured, a fresh cached order is returned without contacting humblebundle.com
+            and a stale one is revalidated.
+
             :param order_id: The identifier ("gamekey") that uniquely identifies the order
+            :param bool get_extra_file_info: (optional) Probe the last modified date of every file of the order.  When
+             listing many orders, probing them all at once with a FileInfoProber is faster.
+            :param bool force_refresh: (optional) Bypass the order cache, e.g. because the download URLs it contains
+             have expired
             :param list args: (optional) Extra positional args to pass to the request
             :param dict kwargs: (optional) Extra keyword args to pass to the request
             :return: The :py:class:`Order` requested
@@ -126,18 +162,59 @@ class HumbleApi(object):
         """
         url = HumbleApi.ORDER_URL.format(order_id=order_id)
 
-        response = self._request("GET", url, *args, **kwargs)
-
-        """ order response might be 404 with no body if not found """
-
-        if response.status_code == requests.codes.not_found:
-            raise HumbleResponseException("Order not found", request=response.request, response=response)
+        cached = None
+        if self.order_cache is not None and not force_refresh:
+            cached = self.order_cache.get(order_id)
+
+        if cached is not None:
+            if self.order_cache.is_fresh(cached):
+                return HumbleApi._build_order(cached["data"], get_extra_file_info)
+
+            headers = dict(kwargs.pop("headers", None) or {})
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+            kwargs["headers"] = headers
+
+        with Profiler.phase("get_order", order_id):
+            response = self._request("GET", url, *args, **kwargs)
+
+            not_modified = cached is not None and response.status_code == requests.codes.not_modified
+            if not_modified:
+                self.order_cache.touch(order_id, cached)
+            elif response.status_code == requests.codes.not_found:
+                """ order response might be 404 with no body if not found """
+                raise HumbleResponseException("Order not found", request=response.request, response=response)
+            else:
+                data = self.__parse_data(response)
 
-        data = self.__parse_data(response)
+        if not_modified:
+            return HumbleApi._build_order(cached["data"], get_extra_file_info)
 
         # The helper function should be sufficient to catch any other errors
-        if self.__authenticated_response_helper(response, data):
-            return Order(data, get_extra_file_info)
+        if self._authenticated_response_helper(response, data):
+            if self.order_cache is not None:
+                self.order_cache.put(order_id, data, response.headers.get("ETag"),
+                                     response.headers.get("Last-Modified"))
+            return HumbleApi._build_order(data, get_extra_file_info)
+
+    @staticmethod
+    def _build_order(data, get_extra_file_info=False):
+        """
+            Builds an Order from its JSON data, probing the last modified date of its files if requested.
+
+            :param dict data: The JSON data of the order.
+            :param bool get_extra_file_info: (optional) Probe the last modified date of every file.
+            :rtype: Order
+        """
+        with Profiler.phase("build_order", data.get("gamekey")):
+            order = Order(data)
+        if get_extra_file_info:
+            if HumbleApi.file_info_prober is None:
+                HumbleApi.file_info_prober = FileInfoProber()
+            HumbleApi.file_info_prober.probe(FileInfoProber.download_structs([order]))
+        return order
 
     def _request(self, *args, **kwargs):
         """
@@ -147,9 +224,43 @@ class HumbleApi(object):
             :param dict kwargs: (optional) Extra keyword args to pass to the request.
         """
         kwargs.setdefault("timeout", 30)
-        return self.session.request(*args, **kwargs)
-
-    def __authenticated_response_helper(self, response, data):
+        method = args[0] if len(args) > 0 else kwargs.get("method")
+        url = args[1] if len(args) > 1 else kwargs.get("url")
+
+        if self.traffic_archive is not None and self.traffic_archive.replaying:
+            started = time.perf_counter()
+            response = self.traffic_archive.replay(method, url)
+            Events.trigger(Events.EVENT_API_REQUEST, (url, response.status_code, time.perf_counter() - started))
+            return response
+
+        # Connection errors, timeouts and transient server errors are retried according to the retry policy.
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            try:
+                response = self.session.request(*args, **kwargs)
+                elapsed = time.perf_counter() - started
+                Events.trigger(Events.EVENT_API_REQUEST, (url, response.status_code, elapsed))
+            except requests.RequestException as e:
+                Events.trigger(Events.EVENT_API_REQUEST, (url, None, time.perf_counter() - started))
+                if not self.retry_policy.should_retry(e, attempt):
+                    raise
+                delay = self.retry_policy.delay(attempt)
+            else:
+                if not self.retry_policy.should_retry_status(response.status_code, attempt):
+                    # Only the response returned is recorded, so that the retried ones aren't replayed.
+                    if self.traffic_archive is not None:
+                        self.traffic_archive.record(method, url, response, elapsed)
+                    return response
+                delay = self.retry_policy.delay(attempt, response.headers.get("Retry-After"))
+                response.close()
+
+            Events.trigger(Events.EVENT_RETRY, url)
+            time.sleep(delay)
+            attempt += 1
+
+    @staticmethod
+    def _authenticated_response_helper(response, data):
         """
             Checks a response for the common authentication errors.  Sometimes a successful API call won't have a
              success property.  We do a check for this property and return true if found, otherwise we parse for
@@ -167,15 +278,16 @@ s             errors.
             return True
 
         error_id = data.get("error_id", None)
-        errors, error_msg = self.__get_errors(data)
+        errors, error_msg = HumbleApi._get_errors(data)
+        request = getattr(response, "request", None)
 
         # API calls that require login and have a missing or invalid token.
         if error_id == "login_required":
-            raise HumbleAuthenticationException(error_msg, request=response.request, response=response)
+            raise HumbleAuthenticationException(error_msg, request=request, response=response)
 
         # Something happened, we're not sure what but we hope the error_msg is useful.
         if success is False or errors is not None or error_id is not None:
-            raise HumbleResponseException(error_msg, request=response.request, response=response)
+            raise HumbleResponseException(error_msg, request=request, response=response)
 
         # Response had no success or errors fields, it's probably data
         return True
@@ -194,7 +306,8 @@ s             errors.
         except ValueError as e:
             raise HumbleParseException("Invalid JSON: %s", str(e), request=response.request, response=response)
 
-    def __get_errors(self, data):
+    @staticmethod
+    def _get_errors(data):
         """
             Retrieves any errors defined within the JSON and returns them as a string.
 
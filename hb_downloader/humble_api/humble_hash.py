@@ -3,6 +3,7 @@
 import hashlib
 import os
 from .events import Events
+from .progress_aggregator import ProgressAggregator
 
 __author__ = "Brian Schkerke"
 __copyright__ = "Copyright 2016 Brian Schkerke"
@@ -20,49 +21,110 @@ class HumbleHash(object):
     force_md5 = False
     write_md5 = True
     read_md5 = True
+    # state_store is an optional StateStore consulted before MD5 files and updated after each calculation.
+    state_store = None
+    # drop_cache asks the operating system to evict a file from the page cache once it has been hashed, so that
+    # verifying a large library doesn't push everything else out of memory.
+    drop_cache = False
 
     @staticmethod
-    def calculate_checksum(full_filename):
+    def calculate_checksum(full_filename, record=True):
         """
             Calculates the MD5 checksum for the given file and returns the hex representation.
 
             :param full_filename: The full path and filename of the file to calculate the MD5 for.
+            :param bool record: (optional) Store the checksum in the MD5 file and the state store.  Only pass False
+             if the checksum may not match the file expected, e.g. when auditing the library.
             :return: The hex representation of the MD5 hash.
             :rtype: str
         """
         if full_filename is None or not os.path.exists(full_filename):
             return ""
 
-        current_percentage = 0
-
         with open(full_filename, "rb") as f:
-            total_length = os.path.getsize(full_filename)
-            read_bytes = 0
+            total_length = os.fstat(f.fileno()).st_size
 
             Events.trigger(Events.EVENT_MD5_START, full_filename)
 
             md5_hash = hashlib.md5()
-            while True:
-                data = f.read(HumbleHash.chunk_size)
-                read_bytes += HumbleHash.chunk_size
-                read_bytes = min(total_length, read_bytes)
-
-                if not data:
-                    break
+            HumbleHash.advise(f, "POSIX_FADV_SEQUENTIAL")
+            with ProgressAggregator.task(ProgressAggregator.CHECKSUM, os.path.basename(full_filename),
+                                         total_length) as task:
+                for data in HumbleHash.read_chunks(f):
+                    md5_hash.update(data)
+                    task.add(len(data))
+                    Events.trigger(Events.EVENT_MD5_BYTES, len(data))
 
-                md5_hash.update(data)
-                current_percentage = Events.check_percent(read_bytes, total_length, current_percentage)
+            if HumbleHash.drop_cache:
+                HumbleHash.advise(f, "POSIX_FADV_DONTNEED")
 
             Events.trigger(Events.EVENT_MD5_END, full_filename)
-            HumbleHash.write_md5file(full_filename, md5_hash.hexdigest())
-            return md5_hash.hexdigest()
+
+        if record:
+            HumbleHash.record_checksum(full_filename, md5_hash.hexdigest())
+        return md5_hash.hexdigest()
+
+    @staticmethod
+    def read_chunks(f, length=None):
+        """
+            Reads a binary file into a buffer allocated once per call and reused for every chunk.
+
+            Each chunk is a view of that buffer, it is overwritten by the next one and must be consumed before the
+            iteration continues.  Generators don't share their buffers, so several files can be read at once.
+
+            :param f: The file object to read, from its current position.
+            :param int length: (optional) The maximum number of bytes to read.  Reads until the end of the file if
+             omitted.
+            :return: A generator of memoryview objects.
+        """
+        buffer_size = HumbleHash.chunk_size if length is None else max(1, min(length, HumbleHash.chunk_size))
+        buffer = memoryview(bytearray(buffer_size))
+        remaining = length
+        while remaining is None or remaining > 0:
+            view = buffer if remaining is None or remaining >= len(buffer) else buffer[:remaining]
+            read_bytes = f.readinto(view)
+            if not read_bytes:
+                break
+
+            yield view[:read_bytes]
+            if remaining is not None:
+                remaining -= read_bytes
+
+    @staticmethod
+    def advise(f, advice):
+        """
+            Gives the operating system a hint about how a whole file is going to be accessed, where supported.
+
+            :param f: The file object the hint applies to.
+            :param str advice: The name of one of the os.POSIX_FADV_* constants.
+        """
+        if not hasattr(os, "posix_fadvise") or not hasattr(os, advice):
+            return
+
+        try:
+            os.posix_fadvise(f.fileno(), 0, 0, getattr(os, advice))
+        except OSError:
+            pass
+
+    @staticmethod
+    def record_checksum(full_filename, checksum):
+        """
+            Stores a verified checksum in the MD5 file and the state store, if any.
+
+            :param full_filename: The full path and filename of the file the checksum was calculated for.
+            :param checksum: The MD5 hash of the file.
+        """
+        HumbleHash.write_md5file(full_filename, checksum)
+        if HumbleHash.state_store is not None:
+            HumbleHash.state_store.record(full_filename, checksum)
 
     @staticmethod
     def checksum(full_filename):
         """
-            Retrieves or calculates the checksum for the given filename.  First checks for the
-            existence of an MD5 file and reads the MD5 value from it, if possible.  Otherwise it
-            calculates the checksum of the given file and returns the value.
+            Retrieves or calculates the checksum for the given filename.  First checks the state store
+            for a record matching the file as it is on disk, then for the existence of an MD5 file and
+            reads the MD5 value from it, if possible.  Otherwise it calculates the checksum of the given
+            file and returns the value.
 
             :param full_filename: The full path and filename of the file to calculate and compare the MD5 hash for.
             :return: The MD5 checksum of the provided path and filename as a string.
@@ -71,7 +133,11 @@ class HumbleHash(object):
         if full_filename is None or not os.path.exists(full_filename):
             return ""
 
-        stored_checksum = HumbleHash.read_md5file(full_filename)
+        stored_checksum = ""
+        if HumbleHash.state_store is not None:
+            stored_checksum = HumbleHash.state_store.lookup(full_filename)
+        if len(stored_checksum) == 0:
+            stored_checksum = HumbleHash.read_md5file(full_filename)
         if len(stored_checksum) == 0:
             stored_checksum = HumbleHash.calculate_checksum(full_filename)
 
@@ -95,13 +161,16 @@ class HumbleHash(object):
     @staticmethod
     def remove_md5file(full_filename):
         """
-            Removes an MD5 file from storage.
+            Removes an MD5 file from storage, along with the state store record of the file.
 
             :param full_filename: The full path and filename of the file to remove the MD5 checksum for.
         """
         if full_filename is None or not os.path.exists(full_filename):
             return
 
+        if HumbleHash.state_store is not None:
+            HumbleHash.state_store.forget(full_filename)
+
         md5full_filename = HumbleHash.md5filename(full_filename)
 
         if os.path.exists(md5full_filename):
@@ -9,7 +9,14 @@ __license__ = "MIT"
 class BaseModel(object):
     """
         Represents the base object used by all of the Humble Bundle objects.
+
+        Models declare their fields in __slots__ to keep large libraries compact.  Fields starting with an underscore
+        are internal: raw data kept until a child collection or derived field is built on first use.
     """
+    __slots__ = ["_data"]
+
+    # retain_data keeps the JSON data every object was built from in _data, which is only useful when debugging.
+    retain_data = False
 
     def __init__(self, data):
         """
@@ -17,7 +24,19 @@ class BaseModel(object):
 
             :param data: The JSON data to define the object with.
         """
-        self._data = data
+        self._data = data if BaseModel.retain_data else None
+
+    def _fields(self):
+        """
+            Lists the public fields of the object, building any lazy ones.
+
+            :return: The fields and their values.
+            :rtype: dict
+        """
+        names = [name for cls in reversed(type(self).__mro__) for name in getattr(cls, "__slots__", [])]
+        names += [name for cls in reversed(type(self).__mro__) for name, value in vars(cls).items()
+                  if isinstance(value, property)]
+        return {name: getattr(self, name) for name in names if not name.startswith("_")}
 
     def __unicode__(self):
         """
@@ -31,7 +50,7 @@ class BaseModel(object):
             Called by the str() built-in function and by the print statement to compute the
             "informal" string representation of an object encoded as ASCII.
         """
-        return str({key: self.__dict__[key] for key in self.__dict__ if key != "_client"})
+        return str(self._fields())
 
     def __repr__(self):
         """
@@ -40,7 +59,7 @@ class BaseModel(object):
             should look like a valid Python expression that could be used to recreate an object
             with the same value (given an appropriate environment).
         """
-        return repr(self.__dict__)
+        return repr(self._fields())
 
     def __iter__(self):
         """
@@ -48,4 +67,4 @@ class BaseModel(object):
            automatically return an iterator object (technically, a generator object) supplying
            the  __iter__() and next() methods.
         """
-        return self.__dict__.__iter__()
+        return self._fields().__iter__()
@@ -18,10 +18,12 @@ class Download(BaseModel):
         download_identifier:  Appears to be the Android package name for the download.
         download_version_number:  A numeric representation of the version of the application the download represents.
         android_app_only:
-        download_structs:  The definitions of the actual download locations.
+        download_structs:  The definitions of the actual download locations.  Built when first used.
     """
+    __slots__ = ["machine_name", "platform", "options_dict", "download_identifier", "download_version_number",
+                 "android_app_only", "_download_structs"]
 
-    def __init__(self, data, get_extra_file_info=False):
+    def __init__(self, data):
         """
             Parameterized constructor for the Download object.
 
@@ -31,11 +33,19 @@ class Download(BaseModel):
 
         self.machine_name = data.get("machine_name", None)
         self.platform = data.get("platform", None)
-        self.download_structs = [DownloadStruct(struct, get_extra_file_info) for struct in data["download_struct"]]
+        # The JSON data of the download structs is kept until they are built.
+        self._download_structs = data["download_struct"]
         self.options_dict = data["options_dict"]
         self.download_identifier = data.get("download_identifier", None)
         self.download_version_number = data.get("download_version_number", None)
         self.android_app_only = data.get("android_app_only", False)
 
+    @property
+    def download_structs(self):
+        """ The definitions of the actual download locations. """
+        if len(self._download_structs) > 0 and not isinstance(self._download_structs[0], DownloadStruct):
+            self._download_structs = [DownloadStruct(struct) for struct in self._download_structs]
+        return self._download_structs
+
     def __repr__(self):
         return "Download: <%s>" % self.machine_name
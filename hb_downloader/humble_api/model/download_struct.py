@@ -4,7 +4,6 @@ from .base_model import BaseModel
 from urllib.parse import urlparse
 from email.utils import parsedate
 from datetime import datetime
-import requests
 
 __author__ = "Joel Pedraza"
 __copyright__ = "Copyright 2014, Joel Pedraza"
@@ -24,9 +23,13 @@ class DownloadStruct(BaseModel):
         small:  0 or 1.  Unknown purpose.
         timestamp: a date & time. Used for displaying 'Updated' info on web page
         last_modified: value taken from file URL, useful for files that have no timestamp
+
+        timestamp, last_modified and filename are derived when first used.
     """
+    __slots__ = ["sha1", "name", "human_size", "file_size", "md5", "small", "uses_kindle_sender", "kindle_friendly",
+                 "download_web", "download_bittorrent", "_timestamp", "_last_modified", "_filename"]
 
-    def __init__(self, data, get_extra_file_info=False):
+    def __init__(self, data):
         """
             Parameterized constructor for the DownloadStruct object.
 
@@ -44,46 +47,61 @@ class DownloadStruct(BaseModel):
         self.kindle_friendly = data.get("kindle_friendly", None)
         self.download_web = None
         self.download_bittorrent = None
-        self.last_modified = None
-        
+
         url_dictionary = data.get("url", None)
         if url_dictionary is not None:
             self.download_web = url_dictionary.get("web", None)
             self.download_bittorrent = url_dictionary.get("bittorrent", None)
 
-        # if a download url is available get the file timestamp from the server, this cannot
-        #  be used when the API timestamp (see below) is not set.
-        # NOTE: this *drastically* increases time required to get all data, so is only done if
-        #       specficially requested
+        # The last modified date is taken from the file server by FileInfoProber, only if specifically requested,
+        #  as it requires a HEAD request per file.  It cannot be used when the API timestamp (see below) is not set.
         # NOTE: in some cases last_modified is different to timestamp by a day or so (probably
         #       due to uploading later than expected)
-        if get_extra_file_info and (self.download_web is not None):
-            file_info_response = requests.Session().request("HEAD", self.download_web)
-            if file_info_response.status_code == requests.codes.ok:
-                self.last_modified = file_info_response.headers.get('Last-Modified', None)
+        self._last_modified = None
+
+        # timestamp is relatively new addition to the API, not all files have it set
+        self._timestamp = data.get("timestamp", None)
+        self._filename = None
+
+    @property
+    def timestamp(self):
+        """ The date the file was updated, in ISO 8601 format. """
+        if self._timestamp is not None:
+            # convert date to ISO 8601 format, ignore time portion
+            return datetime.fromtimestamp(self._timestamp).strftime('%Y-%m-%d')
+
+        # to make other code simpler return the 'epoch' date for
+        # anything that doesn't have a date
+        return '1970-01-01'
 
-        if self.last_modified is not None:
+    @property
+    def last_modified(self):
+        """ The date the file server reports the file was modified, in ISO 8601 format. """
+        if self._last_modified is not None:
             # convert date to ISO 8601 format, ignore time portion
             # NOTE: this could be made simpler by not use email.utils and parsing it directly, using
             #       email.utils allows for parsing values more robustly and will catch edge cases
             #       that direct parsing may not
-            self.last_modified = datetime(*parsedate(self.last_modified)[:6]).strftime('%Y-%m-%d')
-        else:
-            # to make other code simpler store the 'epoch' date for
-            # anything that doesn't have a date
-            self.last_modified = '1970-01-01'
+            return datetime(*parsedate(self._last_modified)[:6]).strftime('%Y-%m-%d')
 
-        # timestamp is relatively new addition to the API, not all files have it set
-        self.timestamp = data.get("timestamp", None)
-        if self.timestamp is not None:
-            # convert date to ISO 8601 format, ignore time portion
-            self.timestamp = datetime.fromtimestamp(self.timestamp).strftime('%Y-%m-%d')
-        else:
-            # to make other code simpler store the 'epoch' date for
-            # anything that doesn't have a date
-            self.timestamp = '1970-01-01'
+        # to make other code simpler return the 'epoch' date for
+        # anything that doesn't have a date
+        return '1970-01-01'
+
+    @property
+    def filename(self):
+        """ The filename to use when saving this download to the local filesystem. """
+        if self._filename is None:
+            self._filename = self.__determine_filename()
+        return self._filename
 
-        self.filename = self.__determine_filename()
+    def set_last_modified(self, last_modified):
+        """
+            Sets the last modified date of the file.
+
+            :param str last_modified: The Last-Modified header sent by the file server, or None if unknown.
+        """
+        self._last_modified = last_modified
 
     def __determine_filename(self):
         """
@@ -14,9 +14,12 @@ class Order(BaseModel):
     """
         Represents a single order (Weekly Bundle, Monthly Bundle, etc.) which itself contains a list of
         products which were a part of the order.
+
+        subscriptions and subproducts are built when first used.
     """
+    __slots__ = ["product", "created", "amount_to_charge", "gamekey", "_subscriptions", "_subproducts"]
 
-    def __init__(self, data, get_extra_file_info=False):
+    def __init__(self, data):
         """
             Parameterized constructor for the Order object.
 
@@ -25,19 +28,31 @@ class Order(BaseModel):
         super(Order, self).__init__(data)
 
         self.product = Product(data["product"])
-        subscriptions_json = data.get("subscriptions", [])
-        self.subscriptions = \
-            [Subscription(sub) for sub in subscriptions_json] \
-            if len(subscriptions_json) > 0 else None
-
         self.created = data.get("created", None)
         self.amount_to_charge = data.get("amount_to_charge", None)
         self.gamekey = data.get("gamekey", None)
-        self.subproducts = ([Subproduct(prod, get_extra_file_info) for prod in data.get("subproducts", [])]) or None
+
+        # The JSON data of the children is kept until they are built.
+        self._subscriptions = data.get("subscriptions", None) or None
+        self._subproducts = data.get("subproducts", None) or None
 
         # Former fields that I couldn't locate in my output:
         #   thankname, claimed, country, giftee, leaderboard, owner_username
 
+    @property
+    def subscriptions(self):
+        """ The subscriptions of the order, or None if there are none. """
+        if self._subscriptions is not None and not isinstance(self._subscriptions[0], Subscription):
+            self._subscriptions = [Subscription(sub) for sub in self._subscriptions]
+        return self._subscriptions
+
+    @property
+    def subproducts(self):
+        """ The subproducts of the order, or None if there are none. """
+        if self._subproducts is not None and not isinstance(self._subproducts[0], Subproduct):
+            self._subproducts = [Subproduct(prod) for prod in self._subproducts]
+        return self._subproducts
+
     def __repr__(self):
         """ Representation of an Order object. """
         return "Order: <%s>" % self.product.machine_name
@@ -14,6 +14,7 @@ class Payee(BaseModel):
         human_name:  The human readable name of the payee.
         machine_name:  The name of the payee usable on a PC.
     """
+    __slots__ = ["human_name", "machine_name"]
 
     def __init__(self, data):
         """
@@ -18,6 +18,8 @@ class Product(BaseModel):
         human_name:
         partial_gift_enabled:
     """
+    __slots__ = ["category", "machine_name", "post_purchase_text", "supports_canonical", "human_name",
+                 "partial_gift_enabled"]
 
     def __init__(self, data):
         """
@@ -22,9 +22,13 @@ class Subproduct(BaseModel):
         custom_download_page_box_html:  This is used to popup messages about the subproduct
          related to the download.  For instance, 'This requires UPlay." or "This requires Steam."
         icon:  The icon to be displayed for the subproduct.
+
+        payee, downloads and product_name are built when first used.
     """
+    __slots__ = ["machine_name", "url", "human_name", "custom_download_page_box_html", "icon", "platform",
+                 "_payee", "_downloads", "_product_name"]
 
-    def __init__(self, data, get_extra_file_info=False):
+    def __init__(self, data):
         """
             Parameterized constructor for the Subproduct object.
 
@@ -35,13 +39,36 @@ class Subproduct(BaseModel):
 
         self.machine_name = data.get("machine_name", None)
         self.url = data.get("url", None)
-        self.payee = Payee(data["payee"])
-        self.downloads = [Download(download, get_extra_file_info) for download in data["downloads"]]
         self.human_name = data.get("human_name", None)
         self.custom_download_page_box_html = data.get("custom_download_page_box_html", None)
         self.icon = data.get("icon", None)
         self.platform = data.get("platform", None)
-        self.product_name = self.__determine_product_name()
+
+        # The JSON data of the children is kept until they are built.
+        self._payee = data["payee"]
+        self._downloads = data["downloads"]
+        self._product_name = None
+
+    @property
+    def payee(self):
+        """ The recipient(s) of the funds for this subproduct. """
+        if not isinstance(self._payee, Payee):
+            self._payee = Payee(self._payee)
+        return self._payee
+
+    @property
+    def downloads(self):
+        """ The downloads associated with this subproduct. """
+        if len(self._downloads) > 0 and not isinstance(self._downloads[0], Download):
+            self._downloads = [Download(download) for download in self._downloads]
+        return self._downloads
+
+    @property
+    def product_name(self):
+        """ The name of the product used when saving files to the local file system. """
+        if self._product_name is None:
+            self._product_name = self.__determine_product_name()
+        return self._product_name
 
     def __determine_product_name(self):
         """
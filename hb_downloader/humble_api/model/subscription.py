@@ -17,6 +17,7 @@ class Subscription(BaseModel):
         list_name:
         subscribed:
     """
+    __slots__ = ["human_name", "list_name", "subscribed"]
 
     def __init__(self, data):
         """
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+__author__ = "Brian Schkerke"
+__copyright__ = "Copyright 2020 Brian Schkerke"
+__license__ = "MIT"
+
+__all__ = ["OrderCache"]
+
+
+class OrderCache(object):
+    """
+        Persists the order responses received from humblebundle.com, one JSON file per gamekey.
+
+        An entry younger than the time to live is used without contacting humblebundle.com.  An older entry is
+        revalidated with the ETag and Last-Modified headers the server provided, if any.
+    """
+
+    def __init__(self, cache_directory, ttl=86400):
+        """
+            Parameterized constructor for the OrderCache.
+
+            :param str cache_directory: The directory the order responses are stored in.  Created if missing.
+            :param int ttl: The number of seconds an entry is used without being revalidated.
+        """
+        self.cache_directory = cache_directory
+        self.ttl = ttl
+        os.makedirs(cache_directory, exist_ok=True)
+
+    def get(self, order_id):
+        """
+            Retrieves the cached response for an order.
+
+            :param str order_id: The gamekey of the order.
+            :return: A dictionary with the data, etag, last_modified and fetched_at keys, or None if the order isn't
+             cached.
+            :rtype: dict
+        """
+        try:
+            with open(self.__filename(order_id), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if not isinstance(entry, dict) or "data" not in entry:
+            return None
+
+        return entry
+
+    def is_fresh(self, entry):
+        """
+            Determines whether a cached entry can be used without revalidating it.
+
+            :param dict entry: The entry returned by get.
+            :rtype: bool
+        """
+        return time.time() - entry.get("fetched_at", 0) < self.ttl
+
+    def put(self, order_id, data, etag=None, last_modified=None):
+        """
+            Stores the response for an order, replacing any previous entry.
+
+            :param str order_id: The gamekey of the order.
+            :param dict data: The JSON data of the order.
+            :param str etag: (optional) The ETag header of the response.
+            :param str last_modified: (optional) The Last-Modified header of the response.
+        """
+        self.__write(order_id, {"data": data, "etag": etag, "last_modified": last_modified,
+                                "fetched_at": time.time()})
+
+    def touch(self, order_id, entry):
+        """
+            Marks an entry as fresh again after humblebundle.com confirmed it didn't change.
+
+            :param str order_id: The gamekey of the order.
+            :param dict entry: The entry returned by get.
+        """
+        entry["fetched_at"] = time.time()
+        self.__write(order_id, entry)
+
+    def invalidate(self, order_id):
+        """
+            Removes an order from the cache, forcing it to be retrieved again.
+
+            :param str order_id: The gamekey of the order.
+        """
+        filename = self.__filename(order_id)
+        if os.path.exists(filename):
+            os.remove(filename)
+
+    def __write(self, order_id, entry):
+        """
+            Atomically writes an entry so that an interrupted run never leaves a truncated file behind.
+
+            :param str order_id: The gamekey of the order.
+            :param dict entry: The entry to store.
+        """
+        filename = self.__filename(order_id)
+        temporary_filename = "%s.%d.%d.tmp" % (filename, os.getpid(), threading.get_ident())
+        with open(temporary_filename, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(temporary_filename, filename)
+
+    def __filename(self, order_id):
+        """
+            Calculates the cache filename for an order.
+
+            :param str order_id: The gamekey of the order.
+            :return: The full path and filename of the cache entry.
+            :rtype: str
+        """
+        if re.match(r"^[A-Za-z0-9_-]+$", order_id) is None:
+            order_id = hashlib.md5(order_id.encode("utf-8")).hexdigest()
+
+        return os.path.join(self.cache_directory, "%s.json" % order_id)
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import cProfile
+import io
+import pstats
+import sys
+import threading
+import time
+
+try:
+    import pyinstrument
+except ImportError:
+    pyinstrument = None
+
+__author__ = "Brian Schkerke"
+__copyright__ = "Copyright 2020 Brian Schkerke"
+__license__ = "MIT"
+
+__all__ = ["Profiler"]
+
+
+class Profiler(object):
+    """
+        Profiles a whole run, and times its phases (retrieving the orders, building the models, hashing, creating the
+        directories, transferring the files) in total and per order or file.
+
+        The phases are marked in the code with:
+
+            with Profiler.phase("get_order", order_id):
+                ...
+
+        While the profiler isn't started, phase() returns a shared context manager doing nothing, so the marks cost
+        next to nothing.  CPU time is measured per thread, so concurrent phases don't count each other's CPU time,
+        except before Python 3.7 where only the CPU time of the whole process is available.
+
+        Functions are profiled with cProfile, every thread having a profile of its own merged at the end, or with the
+        pyinstrument sampling profiler, which only samples the main thread.
+    """
+    MODES = ["cprofile", "sampling"]
+
+    # The slowest orders or files listed per phase in the summary.
+    slowest_items = 10
+
+    # The functions listed in the summary.
+    top_functions = 40
+
+    enabled = False
+
+    _mode = None
+    _profiles = []
+    _sampler = None
+    _phases = {}
+    _items = {}
+    _started = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def start(mode="cprofile"):
+        """
+            Starts profiling the run.
+
+            :param str mode: One of MODES.
+            :raises ValueError: If the mode is unknown, or pyinstrument isn't installed for sampling.
+        """
+        if mode not in Profiler.MODES:
+            raise ValueError("Unknown profiler %s, expected one of %s" % (mode, ", ".join(Profiler.MODES)))
+        if mode == "sampling" and pyinstrument is None:
+            raise ValueError("The sampling profiler requires the pyinstrument library (pip install pyinstrument).")
+
+        Profiler.reset()
+        Profiler._mode = mode
+        Profiler._started = (time.perf_counter(), time.process_time())
+        Profiler.enabled = True
+
+        if mode == "sampling":
+            Profiler._sampler = pyinstrument.Profiler()
+            Profiler._sampler.start()
+            return
+
+        profile = cProfile.Profile()
+        Profiler._profiles.append(profile)
+        profile.enable()
+        if sys.version_info < (3, 12):
+            # Before 3.12, a profile only sees the thread which enabled it.
+            threading.setprofile(Profiler.__profile_thread)
+
+    @staticmethod
+    def stop(output_prefix):
+        """
+            Stops profiling and writes the report: the function statistics to output_prefix.pstats (or .html when
+            sampling) and the summary to output_prefix.txt.
+
+            :param str output_prefix: The path and name of the report files, without extension.
+            :return: The filename of the summary, or None if the profiler wasn't started.
+        """
+        if not Profiler.enabled:
+            return None
+
+        Profiler.enabled = False
+        wall = time.perf_counter() - Profiler._started[0]
+        cpu = time.process_time() - Profiler._started[1]
+
+        functions = io.StringIO()
+        if Profiler._mode == "sampling":
+            Profiler._sampler.stop()
+            with open(output_prefix + ".html", "w", encoding="utf-8") as f:
+                f.write(Profiler._sampler.output_html())
+            functions.write(Profiler._sampler.output_text(unicode=True))
+        else:
+            threading.setprofile(None)
+            Profiler._profiles[0].disable()
+            stats = pstats.Stats(Profiler._profiles[0], stream=functions)
+            for profile in Profiler._profiles[1:]:
+                stats.add(profile)
+            stats.dump_stats(output_prefix + ".pstats")
+            stats.sort_stats("cumulative").print_stats(Profiler.top_functions)
+
+        summary_filename = output_prefix + ".txt"
+        with open(summary_filename, "w", encoding="utf-8") as f:
+            f.write(Profiler.summary(wall, cpu))
+            f.write("\n")
+            f.write(functions.getvalue())
+
+        return summary_filename
+
+    @staticmethod
+    def reset():
+        """ Forgets the phases timed so far. """
+        with Profiler._lock:
+            Profiler._profiles = []
+            Profiler._sampler = None
+            Profiler._phases = {}
+            Profiler._items = {}
+
+    @staticmethod
+    def phase(name, item=None):
+        """
+            Times a phase of the run.
+
+            :param str name: The name of the phase.
+            :param str item: (optional) The order or file the phase is about.
+            :return: A context manager timing its body.
+        """
+        if not Profiler.enabled:
+            return _NO_PHASE
+
+        return _Phase(name, item)
+
+    @staticmethod
+    def record(name, item, wall, cpu):
+        """
+            Adds the timing of a phase to the totals.
+
+            :param str name: The name of the phase.
+            :param str item: The order or file the phase was about, or None.
+            :param float wall: The wall time of the phase, in seconds.
+            :param float cpu: The CPU time of the phase, in seconds.
+        """
+        with Profiler._lock:
+            totals = Profiler._phases.setdefault(name, [0, 0.0, 0.0])
+            totals[0] += 1
+            totals[1] += wall
+            totals[2] += cpu
+            if item is not None:
+                item_totals = Profiler._items.setdefault(name, {}).setdefault(item, [0.0, 0.0])
+                item_totals[0] += wall
+                item_totals[1] += cpu
+
+    @staticmethod
+    def summary(wall, cpu):
+        """
+            Formats the timings of the phases, slowest first, and the slowest orders or files of each phase.
+
+            :param float wall: The wall time of the run, in seconds.
+            :param float cpu: The CPU time of the run, in seconds.
+            :rtype: str
+        """
+        with Profiler._lock:
+            phases = sorted(Profiler._phases.items(), key=lambda phase: -phase[1][1])
+            items = {name: sorted(phase_items.items(), key=lambda item: -item[1][0])[:Profiler.slowest_items]
+                     for name, phase_items in Profiler._items.items()}
+
+        lines = ["Run: %.3f s wall, %.3f s CPU" % (wall, cpu),
+                 "Phases overlap when they run concurrently, their wall times can add up to more than the run.",
+                 "",
+                 "%-20s %8s %12s %12s %10s" % ("phase", "count", "wall (s)", "CPU (s)", "% of run")]
+        for name, (count, phase_wall, phase_cpu) in phases:
+            lines.append("%-20s %8d %12.3f %12.3f %9.1f%%" %
+                         (name, count, phase_wall, phase_cpu, phase_wall / wall * 100 if wall > 0 else 0))
+
+        for name, _ in phases:
+            if name not in items:
+                continue
+            lines.append("")
+            lines.append("Slowest %s:" % name)
+            for item, (item_wall, item_cpu) in items[name]:
+                lines.append("  %10.3f s wall %10.3f s CPU  %s" % (item_wall, item_cpu, item))
+
+        lines.append("")
+        return "\n".join(lines)
+
+    @staticmethod
+    def __profile_thread(frame, event, arg):
+        """ Replaces itself with a profile of its own in every thread started while profiling. """
+        profile = cProfile.Profile()
+        with Profiler._lock:
+            Profiler._profiles.append(profile)
+        profile.enable()
+
+
+class _Phase(object):
+    """ Times a phase of the run, see Profiler.phase. """
+    __slots__ = ["name", "item", "wall", "cpu"]
+
+    def __init__(self, name, item):
+        self.name = name
+        self.item = item
+
+    def __enter__(self):
+        self.wall = time.perf_counter()
+        self.cpu = _thread_time()
+        return self
+
+    def __exit__(self, *args):
+        Profiler.record(self.name, self.item, time.perf_counter() - self.wall, _thread_time() - self.cpu)
+        return False
+
+
+class _NoPhase(object):
+    """ Stands in for a phase while the profiler isn't started. """
+    __slots__ = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+_NO_PHASE = _NoPhase()
+
+# The CPU time of the current thread, or of the process before Python 3.7.
+_thread_time = getattr(time, "thread_time", time.process_time)
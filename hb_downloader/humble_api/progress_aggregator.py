@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import itertools
+import threading
+import time
+
+__author__ = "Brian Schkerke"
+__copyright__ = "Copyright 2020 Brian Schkerke"
+__license__ = "MIT"
+
+__all__ = ["ProgressAggregator"]
+
+
+class ProgressAggregator(object):
+    """
+        Aggregates the progress of the files hashed and downloaded concurrently.  Every file in progress is a task:
+
+            with ProgressAggregator.task(ProgressAggregator.DOWNLOAD, filename, total_length) as task:
+                for chunk in ...:
+                    task.add(len(chunk))
+
+        task.add only increments the counter of the task, without locking, so a task must be updated by a single thread
+        at a time.  Only starting and finishing a task take the lock.  The progress is read, e.g. by a renderer thread,
+        with snapshot().
+    """
+    # The categories of the tasks.
+    CHECKSUM = "Checksum"
+    DOWNLOAD = "Download"
+
+    _tasks = {}
+    _finished_bytes = {}
+    _ids = itertools.count()
+    _lock = threading.Lock()
+
+    @staticmethod
+    def task(category, name, total, done=0):
+        """
+            Creates a task, tracked from the moment its context is entered until it is exited.
+
+            :param str category: What is done to the file, CHECKSUM or DOWNLOAD.
+            :param str name: The name of the file.
+            :param int total: The size of the file in bytes, or None if unknown.
+            :param int done: The number of bytes already processed, e.g. by an earlier run.
+            :return: The task, a context manager.
+        """
+        return _Task(category, name, total, done)
+
+    @staticmethod
+    def snapshot():
+        """
+            Reads the progress.
+
+            :return: The (category, name, done, total, started) tuples of the tasks in progress, in the order they
+             started, and the number of bytes processed since the last reset per category.
+            :rtype: tuple
+        """
+        with ProgressAggregator._lock:
+            tasks = sorted(ProgressAggregator._tasks.items())
+            processed = dict(ProgressAggregator._finished_bytes)
+
+        progress = []
+        for _, task in tasks:
+            done = task.done
+            processed[task.category] = processed.get(task.category, 0) + done - task.initial
+            progress.append((task.category, task.name, done, task.total, task.started))
+
+        return progress, processed
+
+    @staticmethod
+    def reset():
+        """ Forgets the bytes processed so far.  The tasks in progress are kept. """
+        with ProgressAggregator._lock:
+            ProgressAggregator._finished_bytes = {}
+
+    @staticmethod
+    def _start(task):
+        with ProgressAggregator._lock:
+            task.key = next(ProgressAggregator._ids)
+            ProgressAggregator._tasks[task.key] = task
+
+    @staticmethod
+    def _finish(task):
+        with ProgressAggregator._lock:
+            if ProgressAggregator._tasks.pop(task.key, None) is not None:
+                finished_bytes = ProgressAggregator._finished_bytes
+                finished_bytes[task.category] = finished_bytes.get(task.category, 0) + task.done - task.initial
+
+
+class _Task(object):
+    """ A file in progress, see ProgressAggregator.task. """
+    __slots__ = ["category", "name", "total", "done", "initial", "started", "key"]
+
+    def __init__(self, category, name, total, done):
+        self.category = category
+        self.name = name
+        self.total = total
+        self.done = done
+        self.initial = done
+        self.started = None
+        self.key = None
+
+    def add(self, byte_count):
+        self.done += byte_count
+
+    def __enter__(self):
+        self.started = time.monotonic()
+        ProgressAggregator._start(self)
+        return self
+
+    def __exit__(self, *args):
+        ProgressAggregator._finish(self)
+        return False
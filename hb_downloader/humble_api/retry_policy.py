@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import email.utils
+import random
+import threading
+import time
+import requests
+
+__author__ = "Brian Schkerke"
+__copyright__ = "Copyright 2020 Brian Schkerke"
+__license__ = "MIT"
+
+__all__ = ["CircuitBreaker", "RetryPolicy"]
+
+
+class RetryPolicy(object):
+    """
+        Decides whether a failed request is retried and how long to wait before retrying it.
+
+        Connection errors, timeouts and the HTTP statuses in RETRY_STATUSES are retried up to retries times.  The
+        delays grow exponentially from backoff seconds and are fully jittered, i.e. drawn uniformly between 0 and the
+        exponential delay, so that many clients failing together don't retry together.  A Retry-After header sent by
+        the server is honored, up to max_delay.
+    """
+
+    # HTTP statuses of transient failures.
+    RETRY_STATUSES = [429, 500, 502, 503, 504]
+
+    # The errors of a transfer which was interrupted or never started.
+    RETRY_ERRORS = (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError,
+                    ConnectionError, TimeoutError)
+
+    # The longest delay between two attempts, in seconds.
+    max_delay = 60
+
+    def __init__(self, retries=3, backoff=1.0, retry_errors=()):
+        """
+            Parameterized constructor for the RetryPolicy.
+
+            :param int retries: The number of times a failed request is retried.  0 disables retries.
+            :param float backoff: The delay before the first retry, in seconds.  It doubles with every retry.
+            :param tuple retry_errors: (optional) Additional exception classes to retry, e.g. those of aiohttp.
+        """
+        self.retries = max(0, retries)
+        self.backoff = max(0.0, backoff)
+        self.retry_errors = RetryPolicy.RETRY_ERRORS + tuple(retry_errors)
+
+    def should_retry(self, error, attempt):
+        """
+            Determines whether a request which raised an error is retried.
+
+            :param Exception error: The error raised by the request.
+            :param int attempt: The number of retries already made.
+            :rtype: bool
+        """
+        return attempt < self.retries and self.is_retryable(error)
+
+    def should_retry_status(self, status_code, attempt):
+        """
+            Determines whether a request which received a response is retried.
+
+            :param int status_code: The HTTP status of the response.
+            :param int attempt: The number of retries already made.
+            :rtype: bool
+        """
+        return attempt < self.retries and status_code in RetryPolicy.RETRY_STATUSES
+
+    def is_retryable(self, error):
+        """
+            Determines whether an error is transient.
+
+            :param Exception error: The error raised by a request.
+            :rtype: bool
+        """
+        status_code = RetryPolicy.status_code(error)
+        if status_code is not None:
+            return status_code in RetryPolicy.RETRY_STATUSES
+
+        return isinstance(error, self.retry_errors)
+
+    def delay(self, attempt, retry_after=None):
+        """
+            Calculates the delay before a retry.
+
+            :param int attempt: The number of retries already made.
+            :param retry_after: (optional) The Retry-After header of the response, if any.
+            :return: The number of seconds to wait.
+            :rtype: float
+        """
+        delay = random.uniform(0, min(self.max_delay, self.backoff * 2 ** attempt))
+
+        requested = RetryPolicy.parse_retry_after(retry_after)
+        if requested is not None:
+            delay = max(delay, min(self.max_delay, requested))
+
+        return delay
+
+    @staticmethod
+    def status_code(error):
+        """
+            Reads the HTTP status of the response an error was raised for, from requests or aiohttp.
+
+            :param Exception error: The error raised by a request.
+            :return: The HTTP status, or None if no response was received.
+        """
+        response = getattr(error, "response", None)
+        if response is not None and getattr(response, "status_code", None) is not None:
+            return response.status_code
+
+        return getattr(error, "status", None)
+
+    @staticmethod
+    def retry_after(error):
+        """
+            Reads the Retry-After header of the response an error was raised for.
+
+            :param Exception error: The error raised by a request.
+            :return: The raw header, or None.
+        """
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None) or getattr(error, "headers", None) or {}
+        return headers.get("Retry-After")
+
+    @staticmethod
+    def parse_retry_after(retry_after):
+        """
+            Parses a Retry-After header, given either in seconds or as an HTTP date.
+
+            :param str retry_after: The raw header.
+            :return: The number of seconds to wait, or None if it can't be parsed.
+        """
+        if not retry_after:
+            return None
+
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            pass
+
+        try:
+            return max(0.0, email.utils.parsedate_to_datetime(retry_after).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+class CircuitBreaker(object):
+    """
+        Pauses the requests to a host which keeps failing.
+
+        After threshold consecutive failures the circuit of the host opens: no request should be started to it for
+        cooldown seconds.  Afterwards requests are let through again, but a single further failure opens the circuit
+        again until a request succeeds.
+    """
+
+    def __init__(self, threshold=5, cooldown=60):
+        """
+            Parameterized constructor for the CircuitBreaker.
+
+            :param int threshold: The number of consecutive failures opening the circuit.  0 disables the breaker.
+            :param float cooldown: The number of seconds the circuit stays open.
+        """
+        self.threshold = max(0, threshold)
+        self.cooldown = max(0, cooldown)
+        self.__failures = {}
+        self.__open_until = {}
+        self.__lock = threading.Lock()
+
+    def remaining(self, host):
+        """
+            Returns how long requests to a host are paused.
+
+            :param str host: The host name.
+            :return: The number of seconds before the circuit closes, 0 if it is closed.
+            :rtype: float
+        """
+        with self.__lock:
+            return max(0.0, self.__open_until.get(host, 0) - time.time())
+
+    def wait(self, host):
+        """
+            Blocks until the circuit of a host is closed.
+
+            :param str host: The host name.
+        """
+        remaining = self.remaining(host)
+        while remaining > 0:
+            time.sleep(remaining)
+            remaining = self.remaining(host)
+
+    def record_success(self, host):
+        """
+            Records a request to a host which succeeded, closing its circuit.
+
+            :param str host: The host name.
+        """
+        with self.__lock:
+            self.__failures.pop(host, None)
+
+    def record_failure(self, host):
+        """
+            Records a request to a host which failed, opening its circuit once the threshold is reached.
+
+            :param str host: The host name.
+            :return: True if the circuit was opened.
+            :rtype: bool
+        """
+        if self.threshold == 0:
+            return False
+
+        with self.__lock:
+            failures = self.__failures.get(host, 0) + 1
+            if failures < self.threshold:
+                self.__failures[host] = failures
+                return False
+
+            # Half open: the next failure opens the circuit again.
+            self.__failures[host] = self.threshold - 1
+            self.__open_until[host] = time.time() + self.cooldown
+            return True
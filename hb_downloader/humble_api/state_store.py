@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import os
+import sqlite3
+import threading
+import time
+
+__author__ = "Brian Schkerke"
+__copyright__ = "Copyright 2020 Brian Schkerke"
+__license__ = "MIT"
+
+__all__ = ["StateStore"]
+
+
+class StateStore(object):
+    """
+        StateStore is an SQLite database recording the verified MD5 of every file written or hashed, along with the
+        file's size, modification time and inode.  As long as those still match the file on disk its MD5 can be
+        trusted without reading the file again.
+    """
+
+    def __init__(self, database_filename):
+        """
+            Parameterized constructor for the StateStore.
+
+            :param str database_filename: The full path and filename of the SQLite database.  Created if missing.
+        """
+        self.database_filename = database_filename
+        self.__lock = threading.Lock()
+        self.__connection = sqlite3.connect(database_filename, check_same_thread=False)
+        with self.__lock, self.__connection:
+            self.__connection.execute("PRAGMA journal_mode=WAL")
+            self.__connection.execute(
+                    "CREATE TABLE IF NOT EXISTS files ("
+                    "path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, "
+                    "inode INTEGER NOT NULL, md5 TEXT NOT NULL, verified_at REAL NOT NULL)")
+            self.__connection.execute("CREATE INDEX IF NOT EXISTS files_md5 ON files (md5, size)")
+
+    def lookup(self, full_filename):
+        """
+            Retrieves the recorded MD5 of a file, provided the file didn't change since it was recorded.
+
+            :param str full_filename: The full path and filename of the file.
+            :return: The MD5 of the file, or an empty string if it isn't recorded or changed since.
+            :rtype: str
+        """
+        fingerprint = StateStore.fingerprint(full_filename)
+        if fingerprint is None:
+            return ""
+
+        with self.__lock:
+            row = self.__connection.execute("SELECT size, mtime_ns, inode, md5 FROM files WHERE path = ?",
+                                            (StateStore.__key(full_filename),)).fetchone()
+
+        if row is None or tuple(row[0:3]) != fingerprint:
+            return ""
+
+        return row[3]
+
+    def record(self, full_filename, checksum):
+        """
+            Records the verified MD5 of a file along with its current fingerprint.
+
+            :param str full_filename: The full path and filename of the file.
+            :param str checksum: The MD5 of the file.
+        """
+        fingerprint = StateStore.fingerprint(full_filename)
+        if fingerprint is None or not checksum:
+            return
+
+        with self.__lock, self.__connection:
+            self.__connection.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)",
+                                      (StateStore.__key(full_filename),) + fingerprint + (checksum, time.time()))
+
+    def forget(self, full_filename):
+        """
+            Removes the record of a file.
+
+            :param str full_filename: The full path and filename of the file.
+        """
+        with self.__lock, self.__connection:
+            self.__connection.execute("DELETE FROM files WHERE path = ?", (StateStore.__key(full_filename),))
+
+    def find(self, checksum, size):
+        """
+            Lists the recorded files with the given MD5 and size which didn't change since they were recorded.
+
+            :param str checksum: The MD5 of the content.
+            :param int size: The size of the content.
+            :return: The full paths and filenames of the files.
+            :rtype: list
+        """
+        with self.__lock:
+            rows = self.__connection.execute("SELECT path, size, mtime_ns, inode FROM files WHERE md5 = ? AND size = ?",
+                                             (checksum, size)).fetchall()
+
+        return [row[0] for row in rows if StateStore.fingerprint(row[0]) == tuple(row[1:4])]
+
+    def import_md5_files(self, root_directory, md5_extension=".md5"):
+        """
+            Records every MD5 file found below the given directory, trusting the MD5 it contains for the current
+            state of the file it describes.
+
+            :param str root_directory: The directory to search for MD5 files.
+            :param str md5_extension: The extension of the MD5 files.
+            :return: The number of files recorded.
+            :rtype: int
+        """
+        rows = []
+        for directory, _, filenames in os.walk(root_directory):
+            for filename in filenames:
+                if not filename.endswith(md5_extension):
+                    continue
+
+                full_filename = os.path.join(directory, filename[:-len(md5_extension)])
+                fingerprint = StateStore.fingerprint(full_filename)
+                checksum = StateStore.__read_md5file(os.path.join(directory, filename),
+                                                     os.path.basename(full_filename))
+                if fingerprint is None or not checksum:
+                    continue
+
+                rows.append((StateStore.__key(full_filename),) + fingerprint + (checksum, time.time()))
+
+        with self.__lock, self.__connection:
+            self.__connection.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+        return len(rows)
+
+    def close(self):
+        """ Closes the database. """
+        with self.__lock:
+            self.__connection.close()
+
+    @staticmethod
+    def fingerprint(full_filename):
+        """
+            Calculates the fingerprint used to detect changes to a file.
+
+            :param str full_filename: The full path and filename of the file.
+            :return: A tuple of the size, modification time in nanoseconds and inode of the file, or None if it
+             doesn't exist.
+            :rtype: tuple
+        """
+        try:
+            stat = os.stat(full_filename)
+        except OSError:
+            return None
+
+        return stat.st_size, stat.st_mtime_ns, stat.st_ino
+
+    @staticmethod
+    def __key(full_filename):
+        """ Normalizes a filename so that the same file is always recorded under the same key. """
+        return os.path.abspath(full_filename)
+
+    @staticmethod
+    def __read_md5file(md5full_filename, local_filename):
+        """
+            Reads the MD5 from an MD5 file written by HumbleHash.write_md5file.
+
+            :return: The MD5 value read, or an empty string if the format was invalid.
+        """
+        try:
+            with open(md5full_filename, "r") as f:
+                for line in f:
+                    line = line.strip()
+                    if line.endswith(local_filename) and len(line) >= 32:
+                        return line[0:32].lower()
+        except (OSError, UnicodeDecodeError):
+            pass
+
+        return ""
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import gzip
+import json
+import os
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+import requests
+from requests.structures import CaseInsensitiveDict
+from .exceptions.humble_exception import HumbleException
+
+__author__ = "Brian Schkerke"
+__copyright__ = "Copyright 2020 Brian Schkerke"
+__license__ = "MIT"
+
+__all__ = ["TrafficArchive"]
+
+
+class TrafficArchive(object):
+    """
+        Records the responses HumbleApi receives from humblebundle.com, and replays them instead of contacting it, so
+        that a run can be reproduced and profiled offline.
+
+        The archive is a gzip file holding one JSON entry per response: the method, URL, status, headers, body and
+        the time the request took.  Every entry is appended as soon as it is received.  Nothing identifying the
+        account is recorded: the cookies aren't, and the query strings of the URLs in the archive, including the
+        signed download URLs of the orders, only keep the parameters in KEPT_PARAMETERS.
+
+        Responses are replayed by method and URL, in the order they were recorded.  Once the responses recorded for a
+        URL are exhausted, the last one is replayed again.
+    """
+    RECORD = "record"
+    REPLAY = "replay"
+
+    # The query parameters kept when URLs are scrubbed.  The expiry date of a download URL isn't a secret.
+    KEPT_PARAMETERS = ["ttl", "Expires"]
+
+    # The headers which are never recorded.  The body is stored decoded, so its encoding isn't recorded either.
+    DROPPED_HEADERS = ["set-cookie", "cookie", "authorization", "content-encoding", "transfer-encoding",
+                       "content-length"]
+
+    def __init__(self, archive_filename, mode=RECORD, replay_latency=False):
+        """
+            Parameterized constructor for the TrafficArchive.  The archive is only read or created once the first
+            request is made.
+
+            :param str archive_filename: The archive file.
+            :param str mode: RECORD to create the archive, REPLAY to serve the responses it holds.
+            :param bool replay_latency: Replay each response after the time its request took when it was recorded,
+             instead of immediately.
+        """
+        self.archive_filename = archive_filename
+        self.mode = mode
+        self.replay_latency = replay_latency
+        self.__entries = None
+        self.__positions = {}
+        self.__recording = False
+        self.__lock = threading.Lock()
+
+    @property
+    def replaying(self):
+        return self.mode == TrafficArchive.REPLAY
+
+    def record(self, method, url, response, elapsed):
+        """
+            Appends a response to the archive, scrubbed.
+
+            :param str method: The HTTP method of the request.
+            :param str url: The URL requested, without the default parameters of the session.
+            :param response: The requests.Response received.
+            :param float elapsed: The number of seconds the request took.
+        """
+        entry = {
+            "method": method.upper(),
+            "url": TrafficArchive.scrub_url(url),
+            "status": response.status_code,
+            "headers": {name: value for name, value in response.headers.items()
+                        if name.lower() not in TrafficArchive.DROPPED_HEADERS},
+            "body": TrafficArchive.scrub_body(response.content.decode(response.encoding or "utf-8", "replace")),
+            "elapsed": round(elapsed, 4)
+        }
+        line = (json.dumps(entry, separators=(",", ":")) + "\n").encode("utf-8")
+
+        with self.__lock:
+            if not self.__recording:
+                # A new recording replaces the previous one.
+                directory = os.path.dirname(os.path.abspath(self.archive_filename))
+                os.makedirs(directory, exist_ok=True)
+                open(self.archive_filename, "wb").close()
+                self.__recording = True
+            # Every entry is a gzip member of its own, so an interrupted recording stays readable.
+            with gzip.open(self.archive_filename, "ab") as f:
+                f.write(line)
+
+    def replay(self, method, url):
+        """
+            Builds the response recorded for a request.
+
+            :param str method: The HTTP method of the request.
+            :param str url: The URL requested, without the default parameters of the session.
+            :return: The recorded response.
+            :rtype: requests.Response
+            :raises HumbleException: If the archive can't be read or holds no response for the request.
+        """
+        key = (method.upper(), TrafficArchive.scrub_url(url))
+        with self.__lock:
+            if self.__entries is None:
+                self.__entries = TrafficArchive.load(self.archive_filename)
+            entries = self.__entries.get(key)
+            if not entries:
+                raise HumbleException("%s holds no response for %s %s" % (self.archive_filename, key[0], key[1]))
+            position = self.__positions.get(key, 0)
+            self.__positions[key] = position + 1
+            entry = entries[min(position, len(entries) - 1)]
+
+        if self.replay_latency and entry["elapsed"] > 0:
+            time.sleep(entry["elapsed"])
+
+        response = requests.Response()
+        response.status_code = entry["status"]
+        response.headers = CaseInsensitiveDict(entry["headers"])
+        response.encoding = "utf-8"
+        response._content = entry["body"].encode("utf-8")
+        response.url = entry["url"]
+        response.request = requests.Request(entry["method"], entry["url"]).prepare()
+        return response
+
+    @staticmethod
+    def load(archive_filename):
+        """
+            Reads an archive.
+
+            :param str archive_filename: The archive file.
+            :return: The entries, grouped by method and URL in the order they were recorded.
+            :rtype: dict
+            :raises HumbleException: If the archive can't be read.
+        """
+        entries = {}
+        try:
+            with gzip.open(archive_filename, "rt", encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    entry = json.loads(line)
+                    entries.setdefault((entry["method"], entry["url"]), []).append(entry)
+        except (OSError, EOFError, ValueError, KeyError) as e:
+            raise HumbleException("Failed to read the traffic archive %s: %s" % (archive_filename, e))
+
+        return entries
+
+    @staticmethod
+    def scrub_url(url):
+        """
+            Removes the query parameters of a URL which aren't in KEPT_PARAMETERS.
+
+            :param str url: The URL to scrub.
+            :rtype: str
+        """
+        parsed_url = urlparse(url)
+        if not parsed_url.query:
+            return url
+
+        query = [(name, value) for name, value in parse_qsl(parsed_url.query, keep_blank_values=True)
+                 if name in TrafficArchive.KEPT_PARAMETERS]
+        return urlunparse(parsed_url._replace(query=urlencode(query)))
+
+    @staticmethod
+    def scrub_body(body):
+        """
+            Scrubs the URLs found in a JSON body.  Other bodies are kept as they are.
+
+            :param str body: The body of a response.
+            :rtype: str
+        """
+        try:
+            data = json.loads(body)
+        except ValueError:
+            return body
+
+        return json.dumps(TrafficArchive.__scrub_data(data), separators=(",", ":"))
+
+    @staticmethod
+    def __scrub_data(data):
+        """ Scrubs the URLs found in parsed JSON data, recursively. """
+        if isinstance(data, dict):
+            return {key: TrafficArchive.__scrub_data(value) for key, value in data.items()}
+        if isinstance(data, list):
+            return [TrafficArchive.__scrub_data(value) for value in data]
+        if isinstance(data, str) and data.startswith(("http://", "https://")):
+            return TrafficArchive.scrub_url(data)
+
+        return data
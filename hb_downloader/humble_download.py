@@ -1,10 +1,20 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
+import hashlib
 import os
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
 import requests
 from hb_downloader.config_data import ConfigData
+from hb_downloader.disk_writer import DiskWriter
 from hb_downloader.humble_api.events import Events
+from hb_downloader.humble_api.hash_checkpoint import HashCheckpoint
 from hb_downloader.humble_api.humble_hash import HumbleHash
+from hb_downloader.humble_api.profiler import Profiler
+from hb_downloader.humble_api.progress_aggregator import ProgressAggregator
+from hb_downloader.rate_limiter import RateLimiter
+from hb_downloader.segmented_download import SegmentedDownload
 from hb_downloader import logger
 
 __author__ = "Brian Schkerke"
@@ -31,6 +41,7 @@ def format_filesize(filesize):
 
 class HumbleDownload(object):
     order_number = ""
+    order_created = None
     humble_md5 = ""
     filename = ""
     platform = ""
@@ -38,6 +49,7 @@ class HumbleDownload(object):
     product_name_machine = ""
     subproduct_name = ""
     download_url = ""
+    url_fetched_at = None
     humble_file_size = 0
     humble_file_size_human = ""
     machine_name = ""
@@ -45,8 +57,12 @@ class HumbleDownload(object):
     requires_download = False
     partial_download = False
 
+    # rate_limiter is the RateLimiter shared by every transfer.
+    rate_limiter = RateLimiter()
+
     def __init__(self, cd, cds, co, csp, cv):
         self.order_number = cv
+        self.order_created = co.created
         self.download_url = cds.download_web
         self.filename = cds.filename
         self.humble_file_size = cds.file_size
@@ -129,8 +145,10 @@ class HumbleDownload(object):
             :return:  None
         """
         if os.path.exists(self.full_filename):
-            os.remove(self.full_filename)
             HumbleHash.remove_md5file(self.full_filename)
+            os.remove(self.full_filename)
+        SegmentedDownload.remove_state(self.full_filename)
+        HashCheckpoint.remove(self.full_filename)
 
     def check_status(self):
         """
@@ -140,9 +158,23 @@ class HumbleDownload(object):
             :return:  True if the existing file matches size and checksum
             verification.
         """
+        with Profiler.phase("check_status", self.filename):
+            downloaded = self.__check_status()
+        if downloaded:
+            Events.trigger(Events.EVENT_DOWNLOAD_SKIPPED, self.filename)
+        return downloaded
+
+    def __check_status(self):
+        """ Checks the existing file, see check_status. """
         if not os.path.exists(self.full_filename):
             self.status_message = "Target %s doesn't exist." % self.filename
             self.requires_download = True
+        elif SegmentedDownload.has_state(self.full_filename):
+            # The file is preallocated, so its size always matches.
+            self.status_message = (
+                    "%s segmented download was interrupted." % self.filename)
+            self.partial_download = True
+            self.requires_download = True
         elif not self.humble_file_size == self.local_file_size:
             self.status_message = (
                     "%s file sizes don't match (expected %d actual %d)." %
@@ -152,72 +184,176 @@ class HumbleDownload(object):
             self.partial_download = True
             self.requires_download = True
         elif not ConfigData.ignore_md5:
-            if not self.md5_matches:
+            # Retrieved once, it may require hashing the whole file.
+            local_md5 = self.local_md5
+            if len(local_md5) == 0 or local_md5 != self.humble_md5:
                 self.status_message = (
                         "MD5 of %s doesn't match (expected %s actual %s)." %
                         (self.filename,
                          self.humble_md5,
-                         self.local_md5))
+                         local_md5))
                 self.requires_download = True
         else:
             self.requires_download = False
 
         return not self.requires_download
 
-    def download_file(self):
+    def download_file(self, resume=False):
         """ Downloads a file from the location specified in the provided
             DownloadStruct.
+
+            :param bool resume:  Resume the file from the last byte written,
+            even if resume_downloads is off, e.g. when retrying a transfer
+            which was interrupted.
         """
-        self.__create_directory()
+        with Profiler.phase("transfer", self.filename):
+            self.__download_file_to_disk(resume or ConfigData.resume_downloads)
+
+    def __download_file_to_disk(self, resume):
+        """ Transfers the file, see download_file. """
+        self.create_directory()
 
-        if not ConfigData.resume_downloads:
+        if not resume:
             self.remove()
 
         Events.trigger(Events.EVENT_DOWNLOAD_START, self.filename)
 
-        if ConfigData.resume_downloads and self.local_file_size > 0:
+        if self.__segmented_download():
+            pass
+        elif resume and 0 < self.local_file_size < (self.humble_file_size or 0):
             self.__resume_download()
         else:
             self.__start_download()
 
         Events.trigger(Events.EVENT_DOWNLOAD_END, self.filename)
 
+    def __segmented_download(self):
+        """
+            Downloads the file over several connections if it is large enough.
+
+            :return:  False if the file must be downloaded over a single
+            connection instead.
+        """
+        if (ConfigData.segment_threshold <= 0 or
+                ConfigData.segment_count <= 1 or
+                (self.humble_file_size or 0) < ConfigData.segment_threshold):
+            return False
+
+        return SegmentedDownload(self, ConfigData.segment_count,
+                                 HumbleDownload.rate_limiter).download()
+
     def __resume_download(self):
         """ Resumes a download if the server supports it. """
-        resume_header = {'Range': 'bytes=%d-' % self.local_file_size}
+        # The prefix is read once to seed the running MD5 and is checked
+        # against the checkpoint of the partial file, if any.
+        checkpoint = HashCheckpoint(self.full_filename)
+        md5_hash, read_bytes = checkpoint.resume(
+                hashlib.md5(), self.local_file_size)
+        if read_bytes == 0:
+            self.__start_download()
+            return
+
+        resume_header = {'Range': 'bytes=%d-' % read_bytes}
         web_request = requests.get(
                 self.download_url, headers=resume_header, stream=True)
-        mode = "ab"
-        self.__download_file(web_request, mode, self.local_file_size)
+
+        if web_request.status_code != requests.codes.partial_content:
+            # The server ignored the range and sent the whole file.
+            web_request.raise_for_status()
+            self.__download_file(web_request, "wb", 0, hashlib.md5(),
+                                 HashCheckpoint(self.full_filename))
+        else:
+            self.__download_file(web_request, "ab", read_bytes, md5_hash,
+                                 checkpoint)
 
     def __start_download(self):
         """ Starts a download afresh. """
+        HashCheckpoint.remove(self.full_filename)
         web_request = requests.get(self.download_url, stream=True)
+        web_request.raise_for_status()
         mode = "wb"
-        self.__download_file(web_request, mode, 0)
+        self.__download_file(web_request, mode, 0, hashlib.md5(),
+                             HashCheckpoint(self.full_filename))
+
+    def __download_file(self, web_request, mode, read_bytes, md5_hash,
+                        checkpoint):
+        """
+            Writes the response to the target file, calculating its MD5 on
+            the fly as the chunks are written.  The file is verified against
+            the Humble Bundle specified MD5 as soon as the transfer ends.
+            Completed blocks are recorded in the checkpoint of the file so
+            that an interrupted transfer can be resumed safely.
+
+            :param web_request:  The streamed response to write.
+            :param str mode:  "wb" to start afresh, "ab" to append to the
+            first read_bytes bytes already on disk.
+            :param int read_bytes:  The number of bytes already on disk.
+            :param md5_hash:  The running MD5, seeded with the bytes on disk.
+            :param checkpoint:  The HashCheckpoint of the file, seeded with
+            the bytes on disk.
+            :raises IOError:  If the transfer is incomplete or the MD5 doesn't
+            match.
+        """
+        # For a download that's resumed the content-length will be the
+        # remaining bytes, not the total.
+        # total_length = int(web_request.headers.get("content-length"))
+        total_length = self.humble_file_size
+        rate_limiter = HumbleDownload.rate_limiter
+        chunk_size = rate_limiter.chunk_size(ConfigData.chunk_size)
+
+        # The disk is written on a separate thread, so a slow disk doesn't
+        # hold up the socket.
+        with DiskWriter(self.full_filename, mode, md5_hash, checkpoint,
+                        ConfigData.write_queue_size,
+                        ConfigData.fsync_downloads) as writer, \
+                ProgressAggregator.task(ProgressAggregator.DOWNLOAD,
+                                        self.filename, total_length,
+                                        read_bytes) as task:
+            for chunk in web_request.iter_content(chunk_size=chunk_size):
+                if chunk:
+                    rate_limiter.consume(len(chunk))
+                    writer.write(chunk)
+                    read_bytes += len(chunk)
+                    task.add(len(chunk))
+                    Events.trigger(Events.EVENT_DOWNLOAD_BYTES, len(chunk))
 
-    def __download_file(self, web_request, mode, read_bytes=0):
-        current_percentage = 0
+        self.verify_download(read_bytes, md5_hash.hexdigest())
+        HashCheckpoint.remove(self.full_filename)
 
-        with open(self.full_filename, mode) as f:
-            # For a download that's resumed the content-length will be the
-            # remaining bytes, not the total.
-            # total_length = int(web_request.headers.get("content-length"))
-            total_length = self.humble_file_size
-            chunk_size = ConfigData.chunk_size
+    def verify_download(self, read_bytes, local_md5):
+        """
+            Compares a finished transfer with the Humble Bundle specified size
+            and MD5, and records the MD5 if they match.
 
-            for chunk in web_request.iter_content(chunk_size=chunk_size):
-                read_bytes += chunk_size
-                read_bytes = min(total_length, read_bytes)
+            :param int read_bytes:  The size of the file on disk.
+            :param str local_md5:  The MD5 calculated during the transfer.
+            :raises IOError:  If the transfer is incomplete or the MD5 doesn't
+            match.
+        """
+        if read_bytes != self.humble_file_size:
+            # Keep the file, the next attempt can resume it.
+            self.status_message = (
+                    "%s is incomplete (expected %d bytes, received %d)." %
+                    (self.filename, self.humble_file_size or 0, read_bytes))
+            self.requires_download = True
+            raise IOError(self.status_message)
 
-                current_percentage = Events.check_percent(
-                        read_bytes, total_length, current_percentage)
+        if ConfigData.ignore_md5:
+            self.requires_download = False
+            return
 
-                if chunk:
-                    f.write(chunk)
-                    f.flush()
+        if local_md5 != self.humble_md5:
+            self.status_message = (
+                    "MD5 of %s doesn't match (expected %s actual %s)." %
+                    (self.filename, self.humble_md5, local_md5))
+            self.requires_download = True
+            self.remove()
+            raise IOError(self.status_message)
 
-    def __create_directory(self):
+        HumbleHash.record_checksum(self.full_filename, local_md5)
+        self.requires_download = False
+
+    def create_directory(self):
         """ Creates the directory for storing the current file if it doesn't
             exist.
         """
@@ -231,8 +367,9 @@ class HumbleDownload(object):
                                       self.product_name_machine, self.subproduct_name, self.platform)
 
 
-        if not os.path.exists(full_directory):
-            os.makedirs(full_directory)
+        # Several downloads may create the same directory at the same time.
+        with Profiler.phase("create_directory"):
+            os.makedirs(full_directory, exist_ok=True)
 
     def is_valid(self):
         if self.humble_file_size is None or self.humble_file_size == 0:
@@ -283,22 +420,40 @@ class HumbleDownload(object):
         return object_dump.encode("utf-8")
 
     @staticmethod
-    def update_download_list_url(hapi, hd_list):
-        """Updates the download urls from a list"""
-        keys = set(hd.order_number for hd in hd_list)
-        for key in keys:  # Group by key to limit the number of requests
-            updated_hd_list = HumbleDownload.downloads_from_key(hapi, key)
-            # Iterate over HumbleDownload objects that have the same key
-            for hd in [hd_k for hd_k in hd_list if hd_k.order_number == key]:
-                # Update the urls of products based on their md5
-                hd.download_url = [nhd.download_url for nhd in updated_hd_list
-                                   if nhd.humble_md5 == hd.humble_md5][0]
+    def url_expiry(url):
+        """
+            Reads the expiry date of a signed download URL.
+
+            :param str url:  The signed download URL.
+            :return:  The expiry date as a UNIX timestamp, or None if the URL
+            doesn't carry one.
+        """
+        query = parse_qs(urlparse(url or "").query)
+        for name in ["ttl", "Expires"]:
+            try:
+                return int(query[name][0])
+            except (KeyError, IndexError, ValueError):
+                continue
+
+        return None
+
+    @staticmethod
+    def downloads_from_key(hapi, key, force_refresh=False):
+        """Returns a list of HumbleDownload objetcts from a key string.
+        force_refresh bypasses the order cache, for up to date urls"""
+        return HumbleDownload.downloads_from_order(
+                hapi.get_order(key, force_refresh=force_refresh), key)
+
+    @staticmethod
+    def downloads_from_order(current_order, key):
+        """Returns a list of HumbleDownload objetcts from an order"""
+        with Profiler.phase("build_downloads", key):
+            return HumbleDownload.__downloads_from_order(current_order, key)
 
     @staticmethod
-    def downloads_from_key(hapi, key):
-        """Returns a list of HumbleDownload objetcts from a key string"""
+    def __downloads_from_order(current_order, key):
+        """ Walks the files of an order, see downloads_from_order. """
         humble_downloads = []
-        current_order = hapi.get_order(key)
         logger.display_message(False, "Processing",
             "{0} is product: {1}".format(key, current_order.product.human_name))
         for current_subproduct in current_order.subproducts or []:
@@ -320,11 +475,163 @@ class HumbleDownload(object):
         return humble_downloads
 
     @staticmethod
-    def needed_downloads_from_key(hapi, key):
-        """Returns a list of HumbleDownload objetcts corresponding to items
-        that have not been already downloaded, from a key string"""
-        humble_downloads = []
-        for download in HumbleDownload.downloads_from_key(hapi, key):
-            if not download.check_status():  # If not already downloaded
-                humble_downloads.append(download)
-        return humble_downloads
+    def submit_status_checks(executor, hd_list):
+        """Submits the status checks of a list of HumbleDownload objects to
+        an executor. Downloads sharing a directory are checked one after
+        another by the same job, so that directories are read sequentially.
+        Returns a function waiting for the checks and returning the downloads
+        which are still needed, in their original order"""
+        directories = {}
+        for hd in hd_list:
+            directories.setdefault(
+                    os.path.dirname(hd.full_filename), []).append(hd)
+
+        futures = [executor.submit(
+                           lambda group: [hd.check_status() for hd in group],
+                           group)
+                   for group in directories.values()]
+
+        def needed_downloads():
+            for future in futures:
+                future.result()
+            return [hd for hd in hd_list if hd.requires_download]
+
+        return needed_downloads
+
+
+class DownloadUrlRefresher(object):
+    """
+        Refreshes the signed download URLs right before each transfer, only
+        when they are about to expire, or when the server rejected them.
+
+        A URL carrying its expiry date (the ttl or Expires parameter) is
+        trusted until shortly before it.  Any other URL is trusted for
+        freshness_window seconds after its order was retrieved by the
+        refresher.  The URLs of a retrieved order are indexed by MD5, so an
+        order is retrieved again only once its URLs are no longer fresh.
+    """
+
+    # Seconds the URLs of an order are trusted when they don't carry their
+    # expiry date.
+    freshness_window = 3600
+
+    # Seconds before its expiry date a URL is no longer used.
+    expiry_margin = 300
+
+    def __init__(self, hapi):
+        """
+            Parameterized constructor for the DownloadUrlRefresher.
+
+            :param hapi:  The HumbleApi used to retrieve the orders.
+        """
+        self.hapi = hapi
+        self.__orders = {}
+        self.__key_locks = {}
+        self.__lock = threading.Lock()
+
+    def refresh(self, hd, expired=False):
+        """
+            Makes sure the URL of the given download is fresh, retrieving its
+            order again if needed.
+
+            :param hd:  The Humble Download about to be downloaded.
+            :param bool expired:  The server rejected the current URL.
+            :raises IOError:  If the file is no longer part of its order.
+        """
+        if not self.needs_refresh(hd, expired):
+            return
+
+        key = hd.order_number
+        with self.__lock:
+            key_lock = self.__key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            # Another thread may have retrieved the order in the meantime.
+            if self.apply_known_url(hd, expired):
+                return
+            fetched_at = time.time()
+            self.record(key, HumbleDownload.downloads_from_key(
+                    self.hapi, key, force_refresh=True), fetched_at)
+            self.apply_retrieved_url(hd)
+
+    def needs_refresh(self, hd, expired=False):
+        """
+            Determines whether the URL of a download must be refreshed.
+
+            :param hd:  The Humble Download about to be downloaded.
+            :param bool expired:  The server rejected the current URL.
+            :rtype: bool
+        """
+        return expired or not self.is_fresh(hd.download_url,
+                                            hd.url_fetched_at)
+
+    def is_fresh(self, url, fetched_at):
+        """
+            Determines whether a URL can still be used.
+
+            :param str url:  The signed download URL.
+            :param fetched_at:  The time its order was retrieved by the
+            refresher, or None if it wasn't.
+            :rtype: bool
+        """
+        now = time.time()
+        expiry = HumbleDownload.url_expiry(url)
+        if expiry is not None:
+            return now < expiry - self.expiry_margin
+
+        return fetched_at is not None and now < fetched_at + \
+            self.freshness_window
+
+    def record(self, key, humble_downloads, fetched_at):
+        """
+            Records the URLs of a freshly retrieved order.
+
+            :param str key:  The key of the order.
+            :param list humble_downloads:  The Humble Downloads of the order.
+            :param float fetched_at:  The time the order was requested.
+        """
+        with self.__lock:
+            self.__orders[key] = (fetched_at, {
+                    hd.humble_md5: hd.download_url
+                    for hd in humble_downloads})
+
+    def apply_known_url(self, hd, expired=False):
+        """
+            Gives a download the URL of the last retrieval of its order, if it
+            is still fresh.
+
+            :param hd:  The Humble Download to update.
+            :param bool expired:  The server rejected the current URL, which
+            must not be given again.
+            :return:  True if the download got a fresh URL.
+            :rtype: bool
+        """
+        with self.__lock:
+            fetched_at, urls = self.__orders.get(hd.order_number, (None, {}))
+        url = urls.get(hd.humble_md5)
+
+        if url is None or not self.is_fresh(url, fetched_at):
+            return False
+        if expired and url == hd.download_url:
+            return False
+
+        hd.download_url = url
+        hd.url_fetched_at = fetched_at
+        return True
+
+    def apply_retrieved_url(self, hd):
+        """
+            Gives a download the URL of the order just retrieved.
+
+            :param hd:  The Humble Download to update.
+            :raises IOError:  If the file is no longer part of its order.
+        """
+        with self.__lock:
+            fetched_at, urls = self.__orders[hd.order_number]
+
+        if hd.humble_md5 not in urls:
+            raise IOError("%s is no longer part of order %s." %
+                          (hd.filename, hd.order_number))
+
+        hd.download_url = urls[hd.humble_md5]
+        hd.url_fetched_at = fetched_at
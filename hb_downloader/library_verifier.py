@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import csv
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from hb_downloader.humble_api.humble_hash import HumbleHash
+from hb_downloader import logger
+
+__author__ = "Brian Schkerke"
+__copyright__ = "Copyright 2020 Brian Schkerke"
+__license__ = "MIT"
+
+
+class LibraryVerifier(object):
+    """
+        Verifies every expected file of the library against the size and MD5
+        specified by Humble Bundle, and writes a report of the missing,
+        truncated and mismatched files.
+
+        Results are checkpointed regularly, so that an interrupted
+        verification picks up where it stopped when run again.
+    """
+    STATUS_OK = "ok"
+    STATUS_MISSING = "missing"
+    STATUS_TRUNCATED = "truncated"
+    STATUS_MISMATCHED = "mismatched"
+    STATUS_UNREADABLE = "unreadable"
+
+    FIELDS = ["status", "path", "order_number", "product_name",
+              "subproduct_name", "expected_size", "actual_size",
+              "expected_md5", "actual_md5"]
+
+    # Seconds between two checkpoints.
+    checkpoint_interval = 30
+
+    def __init__(self, report_filename, workers=1):
+        """
+            Parameterized constructor for the LibraryVerifier.
+
+            :param str report_filename:  The report to write.  A report ending
+            in .csv is written as CSV, anything else as JSON.
+            :param int workers:  The number of files hashed at the same time.
+        """
+        self.report_filename = report_filename
+        self.checkpoint_filename = report_filename + ".checkpoint"
+        self.workers = max(1, workers)
+        self.results = {}
+
+    def run(self, humble_downloads):
+        """
+            Verifies the given files and writes the report.
+
+            :param list humble_downloads:  The expected files.
+            :return:  The results of the files which aren't ok.
+            :rtype: list
+            :raises KeyboardInterrupt:  If interrupted, after checkpointing the
+            files verified so far.
+        """
+        self.__load_checkpoint()
+        pending = [hd for hd in humble_downloads
+                   if self.__result_key(hd.full_filename, hd.humble_md5)
+                   not in self.results]
+        logger.display_message(
+                False, "Verify",
+                "%d files to verify, %d already verified." %
+                (len(pending), len(humble_downloads) - len(pending)))
+
+        last_checkpoint = time.time()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            running = set()
+            try:
+                for hd in pending:
+                    # Only a few files are queued, so that an interruption
+                    # doesn't have to wait for the whole library.
+                    if len(running) >= self.workers * 2:
+                        done, running = wait(running,
+                                             return_when=FIRST_COMPLETED)
+                        self.__collect(done)
+
+                    running.add(executor.submit(self.verify, hd))
+
+                    if time.time() - last_checkpoint > \
+                            self.checkpoint_interval:
+                        self.__save_checkpoint()
+                        last_checkpoint = time.time()
+
+                self.__collect(wait(running)[0])
+            except KeyboardInterrupt:
+                for future in running:
+                    future.cancel()
+                self.__collect(f for f in running
+                               if f.done() and not f.cancelled())
+                self.__save_checkpoint()
+                logger.display_message(
+                        False, "Verify",
+                        "Interrupted, %d files verified so far are "
+                        "checkpointed in %s." %
+                        (len(self.results), self.checkpoint_filename))
+                raise
+
+        results = [self.results[self.__result_key(hd.full_filename,
+                                                  hd.humble_md5)]
+                   for hd in humble_downloads]
+        problems = [r for r in results if r["status"] != self.STATUS_OK]
+        self.__write_report(results, problems)
+
+        if os.path.exists(self.checkpoint_filename):
+            os.remove(self.checkpoint_filename)
+
+        return problems
+
+    def verify(self, hd):
+        """
+            Verifies a single file.
+
+            :param hd:  The Humble Download describing the expected file.
+            :return:  The result of the verification.
+            :rtype: dict
+        """
+        result = {"status": self.STATUS_OK,
+                  "path": hd.full_filename,
+                  "order_number": hd.order_number,
+                  "product_name": hd.product_name,
+                  "subproduct_name": hd.subproduct_name,
+                  "expected_size": hd.humble_file_size,
+                  "actual_size": None,
+                  "expected_md5": hd.humble_md5,
+                  "actual_md5": None}
+
+        if not os.path.exists(hd.full_filename):
+            result["status"] = self.STATUS_MISSING
+            return result
+
+        result["actual_size"] = os.path.getsize(hd.full_filename)
+        if result["actual_size"] < (hd.humble_file_size or 0):
+            result["status"] = self.STATUS_TRUNCATED
+            return result
+
+        try:
+            # Nothing is written to the library, which may be read only, and
+            # the checksum of a mismatched file mustn't be recorded.
+            result["actual_md5"] = HumbleHash.calculate_checksum(
+                    hd.full_filename, record=False)
+        except OSError:
+            result["status"] = self.STATUS_UNREADABLE
+            return result
+
+        if (result["actual_size"] != hd.humble_file_size or
+                result["actual_md5"] != hd.humble_md5):
+            result["status"] = self.STATUS_MISMATCHED
+
+        return result
+
+    def __collect(self, futures):
+        """ Stores the results of finished verifications. """
+        for future in futures:
+            result = future.result()
+            self.results[self.__result_key(
+                    result["path"], result["expected_md5"])] = result
+
+    @staticmethod
+    def __result_key(full_filename, md5):
+        """ Identifies a file, and the content it is expected to have. """
+        return "%s|%s" % (full_filename, md5)
+
+    def __load_checkpoint(self):
+        """ Loads the results of an interrupted verification, if any. """
+        try:
+            with open(self.checkpoint_filename, "r", encoding="utf-8") as f:
+                self.results = json.load(f)
+        except (OSError, ValueError):
+            self.results = {}
+
+    def __save_checkpoint(self):
+        """ Atomically writes the results gathered so far. """
+        temporary_filename = self.checkpoint_filename + ".tmp"
+        with open(temporary_filename, "w", encoding="utf-8") as f:
+            json.dump(self.results, f)
+        os.replace(temporary_filename, self.checkpoint_filename)
+
+    def __write_report(self, results, problems):
+        """
+            Writes the report, as CSV or JSON depending on its extension.
+
+            :param list results:  The results of every file.
+            :param list problems:  The results of the files which aren't ok.
+        """
+        if self.report_filename.lower().endswith(".csv"):
+            with open(self.report_filename, "w", newline="",
+                      encoding="utf-8") as f:
+                writer = csv.DictWriter(f, fieldnames=self.FIELDS)
+                writer.writeheader()
+                writer.writerows(problems)
+            return
+
+        summary = {status: 0 for status in [
+                self.STATUS_OK, self.STATUS_MISSING, self.STATUS_TRUNCATED,
+                self.STATUS_MISMATCHED, self.STATUS_UNREADABLE]}
+        for result in results:
+            summary[result["status"]] += 1
+
+        with open(self.report_filename, "w", encoding="utf-8") as f:
+            json.dump({"generated": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                       "summary": summary,
+                       "files": problems}, f, indent=2)
@@ -1,6 +1,9 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 from hb_downloader.config_data import ConfigData
+import atexit
+import queue
+import threading
 import time
 import sys
 
@@ -8,6 +11,17 @@ __author__ = "Brian Schkerke"
 __copyright__ = "Copyright 2020 Brian Schkerke"
 __license__ = "MIT"
 
+# Messages are written to the console and the log file by a background
+# thread, so that logging never blocks the download and hash loops.  The
+# queue holds (timestamp, category, message, add_crlf) tuples for messages,
+# lists of lines replacing the status drawn below the messages, and events set
+# once everything queued before them is written.
+_queue = queue.Queue()
+_writer = None
+_writer_lock = threading.Lock()
+_STOP = object()
+
+
 def display_message(is_debug, category, user_message, add_crlf=True):
     """
         Centralized function for dumping data to the console.
@@ -23,19 +37,187 @@ def display_message(is_debug, category, user_message, add_crlf=True):
     assert isinstance(category, str)
     assert isinstance(user_message, str)
 
+    if (is_debug and ConfigData.debug) or not is_debug:
+        _put((time.time(), category, user_message, add_crlf))
+
+
+def display_status(lines):
+    """
+        Draws lines below the messages on the console, replacing the lines
+        drawn previously, e.g. the progress of the files in progress.  They
+        are redrawn after every message and not written to the log file.
+        Only use it if the console is a terminal.
+
+        :param list lines:  The lines to draw, without end of line.  An empty
+        list erases the status.
+        :return:  None
+    """
+    _put(list(lines))
+
+
+def flush():
+    """
+        Waits until every message queued so far is written, e.g. before
+        printing to the console directly.
+
+        :return:  None
+    """
+    writer = _writer
+    if writer is None:
+        return
+
+    written = threading.Event()
+    _put(written)
+    # Don't wait forever for a writer which died without setting the event.
+    while not written.wait(0.1):
+        if not writer.is_alive():
+            return
+
+
+def shutdown():
+    """
+        Writes the messages still queued and closes the log file.  Messages
+        displayed afterwards are written immediately.
+
+        :return:  None
+    """
+    global _writer
+    with _writer_lock:
+        writer = _writer
+        _writer = None
+    if writer is not None and writer.is_alive():
+        _queue.put(_STOP)
+        writer.join()
+
+
+def _put(item):
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                if not threading.main_thread().is_alive():
+                    # The interpreter is exiting, so a new thread wouldn't
+                    # get to write anything.
+                    _LogWriter().write_now(item)
+                    return
+                _writer = _LogWriter()
+                _writer.start()
+    _queue.put(item)
+
+
+class _LogWriter(threading.Thread):
+    """
+        Writes the queued messages to the console and to the log file of the
+        day, which is kept open and replaced when the day changes.  The status
+        is erased before the messages and drawn again below them.
+    """
+
     category_width = 10
 
-    if (is_debug and ConfigData.debug) or not is_debug:
+    def __init__(self):
+        super().__init__(name="logger", daemon=True)
+        self.logfile = None
+        self.logfile_date = None
+        self.status = []
+        self.status_drawn = 0
+
+    def run(self):
+        while True:
+            items = [_queue.get()]
+            # Everything queued meanwhile is written at once, and flushed
+            # once.
+            while True:
+                try:
+                    items.append(_queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            for item in items:
+                if item is _STOP:
+                    self.close()
+                    return
+                if isinstance(item, threading.Event):
+                    self.flush()
+                    item.set()
+                else:
+                    self.write(item)
+            self.flush()
+
+    def write(self, item):
+        self.erase_status()
+        if isinstance(item, list):
+            self.status = item
+            return
+
+        timestamp, category, user_message, add_crlf = item
+        local_time = time.localtime(timestamp)
         formatted_message = ("[%s] [%s] %s" %
-                             (time.strftime("%Y/%m/%d %I:%M:%S"),
-                              category.rjust(category_width), user_message))
-        
+                             (time.strftime("%Y/%m/%d %I:%M:%S", local_time),
+                              category.rjust(self.category_width),
+                              user_message))
+
         # Print the output also to a logfile
-        logfile = open("hb-downloader_" + time.strftime("%Y-%m-%d") + ".log", 'a')
-        print(formatted_message, file = logfile)
-        logfile.close()
-        
+        date = time.strftime("%Y-%m-%d", local_time)
+        if date != self.logfile_date:
+            self.close()
+            self.logfile_date = date
+            try:
+                self.logfile = open("hb-downloader_%s.log" % date, "a")
+            except OSError as e:
+                self.disable_logfile(e)
+        if self.logfile is not None:
+            try:
+                print(formatted_message, file=self.logfile)
+            except OSError as e:
+                self.disable_logfile(e)
+
         if add_crlf:
             print(formatted_message)
         else:
             sys.stdout.write(formatted_message)
+
+    def write_now(self, item):
+        self.write(item)
+        self.close()
+        sys.stdout.flush()
+
+    def flush(self):
+        if self.logfile is not None:
+            try:
+                self.logfile.flush()
+            except OSError as e:
+                self.disable_logfile(e)
+        if self.status and not self.status_drawn:
+            sys.stdout.write("\n".join(self.status) + "\n")
+            self.status_drawn = len(self.status)
+        sys.stdout.flush()
+
+    def erase_status(self):
+        if self.status_drawn:
+            # Moves to the first line of the status and clears the screen
+            # below it.
+            sys.stdout.write("\x1b[%dF\x1b[J" % self.status_drawn)
+            self.status_drawn = 0
+
+    def close(self):
+        if self.logfile is not None:
+            try:
+                self.logfile.close()
+            except OSError:
+                pass
+            self.logfile = None
+            self.logfile_date = None
+
+    def disable_logfile(self, error):
+        """
+            Stops writing to the log file until the day changes, e.g. because
+            the disk is full.  The messages are still written to the console.
+        """
+        logfile_date = self.logfile_date
+        self.close()
+        self.logfile_date = logfile_date
+        print("The log file can't be written, messages are only displayed: "
+              "%s" % error, file=sys.stderr)
+
+
+atexit.register(shutdown)
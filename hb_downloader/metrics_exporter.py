@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import os
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from hb_downloader.humble_api.events import Events
+from hb_downloader.progress_tracker import ProgressTracker
+
+__author__ = "Brian Schkerke"
+__copyright__ = "Copyright 2020 Brian Schkerke"
+__license__ = "MIT"
+
+
+class MetricsExporter(object):
+    """
+        Exposes the progress of a run as Prometheus metrics, so that
+        scheduled runs can be monitored and alerted on.  The metrics are fed
+        by the Events fired while hashing, downloading and talking to
+        humblebundle.com, and by the ProgressTracker.
+
+        They are written to a textfile for the textfile collector of the
+        node exporter, atomically rewritten every interval seconds and when
+        the run ends, and/or served over HTTP at /metrics.
+    """
+
+    # The upper bounds of the buckets of the API latency histogram, in
+    # seconds.
+    LATENCY_BUCKETS = [0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30]
+
+    # The shortest period the current throughput is measured over, in
+    # seconds.
+    minimum_window = 1.0
+
+    def __init__(self, textfile="", port=0, address="127.0.0.1", interval=15):
+        """
+            Parameterized constructor for the MetricsExporter.
+
+            :param str textfile:  (optional) The file the metrics are written
+            to.  Its name should end with .prom.
+            :param int port:  (optional) The port the metrics are served on.
+            0 disables the endpoint.
+            :param str address:  The address the endpoint listens on.
+            :param int interval:  The number of seconds between two updates
+            of the throughput and the textfile.
+        """
+        self.textfile = textfile
+        self.port = port
+        self.address = address
+        self.interval = max(1, interval)
+        self.running = False
+        self.started_at = time.time()
+        self.last_progress_at = self.started_at
+        self.downloaded_bytes = 0
+        self.hashed_bytes = 0
+        self.files = {"completed": 0, "failed": 0, "skipped": 0}
+        self.retries = 0
+        self.api_requests = {}
+        self.api_latency_buckets = [0] * len(MetricsExporter.LATENCY_BUCKETS)
+        self.api_latency_sum = 0.0
+        self.api_latency_count = 0
+        self.throughput = 0.0
+        self.peak_throughput = 0.0
+        self.__sample = (time.perf_counter(), 0)
+        self.__lock = threading.Lock()
+        self.__stopped = threading.Event()
+        self.__thread = None
+        self.__server = None
+
+    def start(self):
+        """ Subscribes to the events and starts exporting. """
+        Events.on(Events.EVENT_DOWNLOAD_BYTES, self.__on_download_bytes)
+        Events.on(Events.EVENT_MD5_BYTES, self.__on_md5_bytes)
+        Events.on(Events.EVENT_DOWNLOAD_END,
+                  lambda filename: self.__count_file("completed"))
+        Events.on(Events.EVENT_DOWNLOAD_FAILED,
+                  lambda filename: self.__count_file("failed"))
+        Events.on(Events.EVENT_DOWNLOAD_SKIPPED,
+                  lambda filename: self.__count_file("skipped"))
+        Events.on(Events.EVENT_RETRY, self.__on_retry)
+        Events.on(Events.EVENT_API_REQUEST, self.__on_api_request)
+
+        self.running = True
+        self.__stopped.clear()
+        self.__thread = threading.Thread(target=self.__run, daemon=True)
+        self.__thread.start()
+
+        if self.port:
+            self.__server = _MetricsServer((self.address, self.port),
+                                           _MetricsHandler)
+            self.__server.exporter = self
+            threading.Thread(target=self.__server.serve_forever,
+                             daemon=True).start()
+
+    def stop(self):
+        """ Writes the final metrics and stops exporting. """
+        self.running = False
+        self.__stopped.set()
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+        self.update(force=True)
+        self.write()
+
+        if self.__server is not None:
+            self.__server.shutdown()
+            self.__server.server_close()
+            self.__server = None
+
+    def update(self, force=False):
+        """
+            Measures the current throughput since the last update, if long
+            enough ago, and the peak throughput.
+
+            :param bool force:  Measure it however short the period is.
+        """
+        now = time.perf_counter()
+        with self.__lock:
+            sampled_at, sampled_bytes = self.__sample
+            window = now - sampled_at
+            if window <= 0 or (window < self.minimum_window and not force):
+                return
+            self.throughput = (self.downloaded_bytes - sampled_bytes) / window
+            self.peak_throughput = max(self.peak_throughput, self.throughput)
+            self.__sample = (now, self.downloaded_bytes)
+
+    def write(self):
+        """ Atomically rewrites the textfile, if any. """
+        if not self.textfile:
+            return
+
+        temporary_filename = self.textfile + ".tmp"
+        with open(temporary_filename, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(temporary_filename, self.textfile)
+
+    def render(self):
+        """
+            Formats the metrics in the Prometheus text exposition format.
+
+            :rtype: str
+        """
+        lines = []
+
+        def metric(name, metric_type, help_text, samples):
+            lines.append("# HELP hb_downloader_%s %s" % (name, help_text))
+            lines.append("# TYPE hb_downloader_%s %s" % (name, metric_type))
+            for suffix, labels, value in samples:
+                label_text = ",".join('%s="%s"' % label for label in labels)
+                lines.append("hb_downloader_%s%s%s %s" % (
+                        name, suffix, "{%s}" % label_text if labels else "",
+                        MetricsExporter.format_value(value)))
+
+        with self.__lock, ProgressTracker.lock:
+            metric("running", "gauge", "1 while the run is in progress.",
+                   [("", [], int(self.running))])
+            metric("start_time_seconds", "gauge",
+                   "When the run started, as a UNIX timestamp.",
+                   [("", [], self.started_at)])
+            metric("last_progress_time_seconds", "gauge",
+                   "When a byte was last hashed or downloaded, or a file "
+                   "completed, as a UNIX timestamp.",
+                   [("", [], self.last_progress_at)])
+            metric("downloaded_bytes_total", "counter",
+                   "Bytes downloaded.", [("", [], self.downloaded_bytes)])
+            metric("download_throughput_bytes", "gauge",
+                   "Bytes downloaded per second over the last interval.",
+                   [("", [], self.throughput)])
+            metric("download_peak_throughput_bytes", "gauge",
+                   "The highest throughput of the run, in bytes per second.",
+                   [("", [], self.peak_throughput)])
+            metric("hashed_bytes_total", "counter",
+                   "Bytes read to calculate checksums.",
+                   [("", [], self.hashed_bytes)])
+            metric("files_total", "counter",
+                   "Files downloaded (completed), not downloaded (failed), "
+                   "or found already downloaded (skipped).",
+                   [("", [("state", state)], count)
+                    for state, count in sorted(self.files.items())])
+            metric("retries_total", "counter",
+                   "Requests and downloads retried.",
+                   [("", [], self.retries)])
+            metric("api_requests_total", "counter",
+                   "Requests to humblebundle.com by HTTP status, error if no "
+                   "response was received.",
+                   [("", [("status", status)], count)
+                    for status, count in sorted(self.api_requests.items())])
+            buckets = [("_bucket", [("le", MetricsExporter.format_value(
+                            bound))], count)
+                       for bound, count in zip(MetricsExporter.LATENCY_BUCKETS,
+                                               self.api_latency_buckets)]
+            buckets.append(("_bucket", [("le", "+Inf")],
+                            self.api_latency_count))
+            buckets.append(("_sum", [], self.api_latency_sum))
+            buckets.append(("_count", [], self.api_latency_count))
+            metric("api_request_duration_seconds", "histogram",
+                   "Duration of the requests to humblebundle.com.", buckets)
+            metric("progress_items", "gauge",
+                   "Orders of the order retrieval phase, then files of the "
+                   "download phase, processed (current) and planned "
+                   "(total).",
+                   [("", [("kind", "current")],
+                     ProgressTracker.item_count_current),
+                    ("", [("kind", "total")],
+                     ProgressTracker.item_count_total)])
+            metric("progress_bytes", "gauge",
+                   "Bytes of the files of the download phase processed "
+                   "(current) and planned (total).",
+                   [("", [("kind", "current")],
+                     ProgressTracker.download_size_current),
+                    ("", [("kind", "total")],
+                     ProgressTracker.download_size_total)])
+
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def format_value(value):
+        """ Formats a sample value, integers without a decimal point. """
+        if isinstance(value, int) or float(value).is_integer():
+            return "%d" % value
+
+        return repr(float(value))
+
+    def __run(self):
+        """ Updates the throughput and the textfile until stopped. """
+        while not self.__stopped.wait(self.interval):
+            self.update()
+            self.write()
+
+    def __on_download_bytes(self, byte_count):
+        with self.__lock:
+            self.downloaded_bytes += byte_count
+            self.last_progress_at = time.time()
+
+    def __on_md5_bytes(self, byte_count):
+        with self.__lock:
+            self.hashed_bytes += byte_count
+            self.last_progress_at = time.time()
+
+    def __count_file(self, state):
+        with self.__lock:
+            self.files[state] += 1
+            self.last_progress_at = time.time()
+
+    def __on_retry(self, name):
+        with self.__lock:
+            self.retries += 1
+
+    def __on_api_request(self, request):
+        url, status, seconds = request
+        with self.__lock:
+            label = "error" if status is None else str(status)
+            self.api_requests[label] = self.api_requests.get(label, 0) + 1
+            for index, bound in enumerate(MetricsExporter.LATENCY_BUCKETS):
+                if seconds <= bound:
+                    self.api_latency_buckets[index] += 1
+            self.api_latency_sum += seconds
+            self.api_latency_count += 1
+
+
+class _MetricsServer(socketserver.ThreadingMixIn, HTTPServer):
+    """ Serves every request on a thread of its own. """
+    daemon_threads = True
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """ Serves the metrics of the exporter of the server at /metrics. """
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        exporter = self.server.exporter
+        exporter.update()
+        body = exporter.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import collections
+import shutil
+import threading
+import time
+from hb_downloader import logger
+from hb_downloader.humble_api.progress_aggregator import ProgressAggregator
+from hb_downloader.progress_tracker import ProgressTracker
+
+__author__ = "Brian Schkerke"
+__copyright__ = "Copyright 2020 Brian Schkerke"
+__license__ = "MIT"
+
+
+class ProgressRenderer(object):
+    """
+        Draws the progress of the files being hashed and downloaded, one line
+        per file, a line with the hashing rate while files are hashed, and a
+        summary line with the bytes downloaded, the download rate and the
+        time left, from a thread of its own.  The progress is read from
+        the ProgressAggregator and the ProgressTracker, so the threads doing
+        the work never wait for it.
+
+        On a terminal, the lines are redrawn in place below the messages
+        every refresh seconds.  Otherwise they are printed as messages every
+        interval seconds while files are in progress.
+    """
+
+    # The period the rate is averaged over, in seconds.
+    rate_window = 10.0
+
+    # The files drawn at most, the others are counted on a line of their own.
+    max_tasks = 10
+
+    category_width = 10
+
+    def __init__(self, interactive, refresh=0.25, interval=10):
+        """
+            Parameterized constructor for the ProgressRenderer.
+
+            :param bool interactive:  Whether the console is a terminal.
+            :param float refresh:  The number of seconds between two redraws
+            on a terminal.
+            :param float interval:  The number of seconds between two
+            progress messages otherwise.
+        """
+        self.interactive = interactive
+        self.refresh = refresh
+        self.interval = interval
+        self.__samples = {}
+        self.__stopped = threading.Event()
+        self.__thread = None
+
+    def start(self):
+        """ Starts drawing the progress. """
+        self.__stopped.clear()
+        self.__thread = threading.Thread(target=self.__run, name="progress",
+                                         daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        """ Stops drawing the progress, and erases it on a terminal. """
+        self.__stopped.set()
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+        if self.interactive:
+            logger.display_status([])
+
+    def render(self, now=None):
+        """
+            Formats the progress.
+
+            :param float now:  (optional) The time.monotonic() to render at.
+            :return:  The (category, message) lines of the files in progress,
+            then the summary line.
+            :rtype: list
+        """
+        now = time.monotonic() if now is None else now
+        tasks, processed = ProgressAggregator.snapshot()
+        rate = self.__rate(ProgressAggregator.DOWNLOAD, now, processed.get(
+                ProgressAggregator.DOWNLOAD, 0))
+        hash_rate = self.__rate(ProgressAggregator.CHECKSUM, now,
+                                processed.get(ProgressAggregator.CHECKSUM, 0))
+
+        lines = []
+        for category, name, done, total, _ in tasks[:self.max_tasks]:
+            lines.append((category, "%s: %s/%s (%s)" % (
+                    name,
+                    ProgressTracker.format_filesize(done),
+                    ProgressTracker.format_filesize(total)
+                    if total else "unknown",
+                    ProgressTracker.format_percentage(done, total or 0))))
+        if len(tasks) > self.max_tasks:
+            lines.append(("", "and %d more." % (len(tasks) - self.max_tasks)))
+
+        with ProgressTracker.lock:
+            item_count_current = ProgressTracker.item_count_current
+            item_count_total = ProgressTracker.item_count_total
+            # The files in progress are only counted once they are done,
+            # the bytes being downloaded are added.  Hashed bytes aren't.
+            size_current = ProgressTracker.download_size_current + sum(
+                    min(done, total) if total else done
+                    for category, _, done, total, _ in tasks
+                    if category == ProgressAggregator.DOWNLOAD)
+            size_total = ProgressTracker.download_size_total
+
+        if rate <= 0:
+            time_left = "waiting for data"
+        elif size_total > size_current:
+            time_left = ProgressTracker.format_seconds(
+                    max(1, (size_total - size_current) / rate), size_total,
+                    rate)
+        else:
+            time_left = "%s/s" % ProgressTracker.format_filesize(rate)
+
+        if size_total:
+            size = "%s/%s (%s)" % (
+                    ProgressTracker.format_filesize(size_current),
+                    ProgressTracker.format_filesize(size_total),
+                    ProgressTracker.format_percentage(size_current,
+                                                      size_total))
+        else:
+            size = ProgressTracker.format_filesize(size_current)
+
+        hashing = sum(1 for task in tasks
+                      if task[0] == ProgressAggregator.CHECKSUM)
+        if hashing:
+            lines.append((ProgressAggregator.CHECKSUM, "%d file%s, %s/s" % (
+                    hashing, "s" if hashing > 1 else "",
+                    ProgressTracker.format_filesize(hash_rate))))
+        lines.append(("Progress", "%d/%d, %s, %s" % (
+                item_count_current, item_count_total, size, time_left)))
+        return lines
+
+    def __rate(self, category, now, processed):
+        """ The bytes processed per second over the last rate_window. """
+        samples = self.__samples.setdefault(category, collections.deque())
+        samples.append((now, processed))
+        while len(samples) > 2 and now - samples[1][0] >= self.rate_window:
+            samples.popleft()
+        first_time, first_processed = samples[0]
+        if now <= first_time:
+            return 0
+
+        return (processed - first_processed) / (now - first_time)
+
+    def __run(self):
+        if self.interactive:
+            while not self.__stopped.wait(self.refresh):
+                width = shutil.get_terminal_size().columns - 1
+                # Longer lines would wrap, and the status couldn't be erased.
+                logger.display_status(
+                        [("[%s] %s" % (category.rjust(self.category_width),
+                                       message))[:width]
+                         for category, message in self.render()])
+            return
+
+        while not self.__stopped.wait(self.interval):
+            lines = self.render()
+            if len(lines) == 1:
+                # Nothing is in progress.
+                continue
+            for category, message in lines:
+                logger.display_message(False, category, message)
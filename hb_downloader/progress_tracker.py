@@ -6,6 +6,7 @@ __author__ = "Brian Schkerke"
 __copyright__ = "Copyright 2020 Brian Schkerke"
 __license__ = "MIT"
 
+import threading
 import time
 start_time = None
 
@@ -25,6 +26,21 @@ class ProgressTracker(object):
     current_subproduct = ""
     current_download = ""
 
+    # Guards the counters when downloads complete on several threads.
+    lock = threading.RLock()
+
+    @staticmethod
+    def complete_download(hd):
+        """
+            Adds a finished (or failed) Humble Download to the totals.
+
+            :param hd: The Humble Download which is no longer in progress.
+        """
+        with ProgressTracker.lock:
+            if hd.humble_file_size is not None:
+                ProgressTracker.download_size_current += hd.humble_file_size
+            ProgressTracker.item_count_current += 1
+
     @staticmethod
     def assign_download(hd):
         """
@@ -32,22 +48,30 @@ class ProgressTracker(object):
             
             :param hd: The Humble Download to be tracked.
         """
-        ProgressTracker.current_product = hd.product_name
-        ProgressTracker.current_subproduct = hd.subproduct_name
-        ProgressTracker.current_download = hd.machine_name
+        with ProgressTracker.lock:
+            ProgressTracker.current_product = hd.product_name
+            ProgressTracker.current_subproduct = hd.subproduct_name
+            ProgressTracker.current_download = hd.machine_name
 
     @staticmethod
     def display_summary():
         """
             Displays the current tracked download's progress.
         """
+        with ProgressTracker.lock:
+            ProgressTracker.__display_summary()
+
+    @staticmethod
+    def __display_summary():
         global start_time
-        if start_time:
-            elapsed = time.time() - start_time
+        if start_time is None:
+            start_time = time.time()
+        elapsed = time.time() - start_time
+        # Several downloads may start before any of them finished.
+        if elapsed > 0 and ProgressTracker.download_size_current > 0:
             fasts = ProgressTracker.download_size_current / elapsed
             remaining = (ProgressTracker.download_size_total - ProgressTracker.download_size_current) / fasts
         else:
-            start_time = time.time()
             remaining = None
             fasts = 1024**2
 
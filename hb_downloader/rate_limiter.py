@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import datetime
+import threading
+import time
+
+__author__ = "Brian Schkerke"
+__copyright__ = "Copyright 2020 Brian Schkerke"
+__license__ = "MIT"
+
+
+class RateLimiter(object):
+    """
+        A token bucket shared by every transfer, limiting the total download
+        rate in bytes per second.  The limit can change with the time of day
+        according to a schedule.
+
+        A transfer may take more bytes than the bucket holds, going into debt.
+        It then sleeps until the debt is paid back, so the average rate stays
+        exact while a sleep only happens when it is long enough to matter.
+    """
+
+    # The bucket holds up to this many seconds worth of bytes.
+    burst = 1.0
+
+    # Waits shorter than this are carried over instead of slept.
+    minimum_sleep = 0.01
+
+    # Seconds between two evaluations of the schedule.
+    schedule_interval = 30
+
+    def __init__(self, limit=0, schedule=None, clock=time.monotonic,
+                 sleep=time.sleep):
+        """
+            Parameterized constructor for the RateLimiter.
+
+            :param int limit:  The rate in bytes per second outside of the
+            scheduled windows.  0 means no limit.
+            :param list schedule:  (optional) The windows with another limit,
+            each a dictionary with "start" and "end" times as "HH:MM" and a
+            "limit" in bytes per second.  A window may wrap past midnight.
+            :param clock:  (optional) The monotonic clock, in seconds.
+            :param sleep:  (optional) The function waiting for a number of
+            seconds.
+            :raises ValueError:  If a window of the schedule is invalid.
+        """
+        self.limit = max(0, int(limit or 0))
+        self.schedule = [RateLimiter.__parse_window(window)
+                         for window in schedule or []]
+        self.rate = self.limit
+        self.clock = clock
+        self.sleep = sleep
+        self.__tokens = 0.0
+        self.__updated = self.clock()
+        self.__schedule_checked = None
+        self.__lock = threading.Lock()
+
+        self.__update_rate(self.__updated)
+
+    @property
+    def unlimited(self):
+        """ True if no limit applies at all, at any time. """
+        return self.limit == 0 and all(w[2] == 0 for w in self.schedule)
+
+    def chunk_size(self, chunk_size):
+        """
+            Reduces a read size so that a single chunk can't exceed a tenth
+            of a second of the current rate, which keeps transfers smooth.
+
+            :param int chunk_size:  The configured size of a read.
+            :rtype: int
+        """
+        if self.rate == 0:
+            return chunk_size
+
+        return max(16 * 1024, min(chunk_size, int(self.rate / 10)))
+
+    def reserve(self, byte_count):
+        """
+            Takes byte_count bytes from the bucket.
+
+            :param int byte_count:  The number of bytes just received.
+            :return:  The number of seconds the caller must wait.
+            :rtype: float
+        """
+        if self.unlimited:
+            return 0
+
+        with self.__lock:
+            now = self.clock()
+            self.__update_rate(now)
+            if self.rate == 0:
+                self.__tokens = 0.0
+                self.__updated = now
+                return 0
+
+            self.__tokens = min(self.rate * self.burst, self.__tokens +
+                                (now - self.__updated) * self.rate)
+            self.__updated = now
+            self.__tokens -= byte_count
+
+            if self.__tokens >= 0:
+                return 0
+
+            wait = -self.__tokens / self.rate
+            return wait if wait >= self.minimum_sleep else 0
+
+    def consume(self, byte_count):
+        """
+            Takes byte_count bytes from the bucket, sleeping if the rate is
+            exceeded.
+
+            :param int byte_count:  The number of bytes just received.
+        """
+        wait = self.reserve(byte_count)
+        if wait > 0:
+            self.sleep(wait)
+
+    def __update_rate(self, now):
+        """ Applies the limit of the window of the schedule we are in. """
+        if len(self.schedule) == 0:
+            return
+        if (self.__schedule_checked is not None and
+                now - self.__schedule_checked < self.schedule_interval):
+            return
+
+        self.__schedule_checked = now
+        self.rate = RateLimiter.scheduled_limit(
+                self.limit, self.schedule, datetime.datetime.now().time())
+
+    @staticmethod
+    def scheduled_limit(limit, schedule, current_time):
+        """
+            Determines the limit applying at a given time of the day.
+
+            :param int limit:  The limit outside of the scheduled windows.
+            :param list schedule:  The parsed windows of the schedule.
+            :param datetime.time current_time:  The time of the day.
+            :return:  The limit of the first window containing the time, or
+            limit if there is none.
+            :rtype: int
+        """
+        for start, end, window_limit in schedule:
+            if start <= end:
+                inside = start <= current_time < end
+            else:
+                inside = current_time >= start or current_time < end
+            if inside:
+                return window_limit
+
+        return limit
+
+    @staticmethod
+    def __parse_window(window):
+        """ Parses a window of the schedule into (start, end, limit). """
+        try:
+            return (RateLimiter.__parse_time(window["start"]),
+                    RateLimiter.__parse_time(window["end"]),
+                    max(0, int(window.get("limit", 0) or 0)))
+        except (KeyError, TypeError, AttributeError, ValueError):
+            raise ValueError("Invalid bandwidth schedule window %r, expected "
+                             "start and end as HH:MM and a limit in bytes "
+                             "per second." % (window,))
+
+    @staticmethod
+    def __parse_time(value):
+        """ Parses a time of the day written as HH:MM. """
+        # YAML reads an unquoted 23:15 as a number of minutes.
+        if isinstance(value, int):
+            return datetime.time(value // 60, value % 60)
+
+        return datetime.datetime.strptime(value, "%H:%M").time()
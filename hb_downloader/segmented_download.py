@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from hb_downloader.config_data import ConfigData
+from hb_downloader.humble_api.events import Events
+from hb_downloader.humble_api.humble_hash import HumbleHash
+from hb_downloader.humble_api.progress_aggregator import ProgressAggregator
+from hb_downloader.rate_limiter import RateLimiter
+from hb_downloader import logger
+
+__author__ = "Brian Schkerke"
+__copyright__ = "Copyright 2020 Brian Schkerke"
+__license__ = "MIT"
+
+
+class SegmentedDownload(object):
+    """
+        Downloads a single large file over several connections.  The file is
+        split into byte ranges which are fetched concurrently and written at
+        their position in a preallocated target file.  Completed segments are
+        recorded in a state file next to the target so that an interrupted
+        download only fetches the missing segments when resumed.
+    """
+
+    def __init__(self, hd, segment_count, rate_limiter=None):
+        """
+            Parameterized constructor for the SegmentedDownload.
+
+            :param hd:  The Humble Download to download.
+            :param int segment_count:  The number of segments, and therefore
+            connections, to use.
+            :param rate_limiter:  (optional) The RateLimiter shared with the
+            other transfers.
+        """
+        self.hd = hd
+        self.segment_count = max(1, segment_count)
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.full_filename = hd.full_filename
+        self.state_filename = SegmentedDownload.state_filename(
+                self.full_filename)
+        self.segments = []
+        self.completed = set()
+        self.read_bytes = 0
+        self.task = None
+        self.__lock = threading.Lock()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1,
+                              pool_maxsize=self.segment_count)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    @staticmethod
+    def state_filename(full_filename):
+        """
+            Calculates the filename of the segment state for a given file.
+
+            :param str full_filename:  The full path and filename of the
+            download.
+            :return:  The full path and filename of its segment state.
+            :rtype: str
+        """
+        return full_filename + ".segments"
+
+    @staticmethod
+    def has_state(full_filename):
+        """
+            Determines whether a segmented download of the given file was
+            interrupted.
+
+            :param str full_filename:  The full path and filename of the
+            download.
+            :rtype: bool
+        """
+        return os.path.exists(SegmentedDownload.state_filename(full_filename))
+
+    @staticmethod
+    def remove_state(full_filename):
+        """
+            Removes the segment state of the given file, if any.
+
+            :param str full_filename:  The full path and filename of the
+            download.
+        """
+        state_filename = SegmentedDownload.state_filename(full_filename)
+        if os.path.exists(state_filename):
+            os.remove(state_filename)
+
+    def download(self):
+        """
+            Downloads the file in segments, then verifies its MD5.
+
+            :return:  False if the server doesn't support byte ranges and the
+            file must be downloaded over a single connection instead.
+            :rtype: bool
+            :raises requests.HTTPError:  If the server rejected the request,
+            e.g. because the URL expired.  The completed segments are kept.
+            :raises IOError:  If the downloaded file doesn't match its MD5, or
+            the server answered the range probe unexpectedly.
+        """
+        try:
+            return self.__download()
+        finally:
+            self.session.close()
+
+    def __download(self):
+        """ Downloads the file, see download. """
+        total_length = self.hd.humble_file_size
+
+        if not self.__supports_range(total_length):
+            logger.display_message(
+                    False, "Download",
+                    "%s: server doesn't support byte ranges, downloading over "
+                    "a single connection." % self.hd.filename)
+            if SegmentedDownload.has_state(self.full_filename):
+                self.hd.remove()
+            return False
+
+        self.__load_state(total_length)
+        self.read_bytes = sum(self.segments[i][1] - self.segments[i][0] + 1
+                              for i in self.completed)
+
+        fd = os.open(self.full_filename,
+                     os.O_RDWR | os.O_CREAT | getattr(os, "O_BINARY", 0))
+        try:
+            pending = [i for i in range(len(self.segments))
+                       if i not in self.completed]
+            with ProgressAggregator.task(
+                    ProgressAggregator.DOWNLOAD, self.hd.filename,
+                    total_length, self.read_bytes) as self.task, \
+                    ThreadPoolExecutor(
+                        max_workers=self.segment_count) as executor:
+                for _ in executor.map(
+                        lambda index: self.__download_segment(fd, index),
+                        pending):
+                    pass
+            if ConfigData.fsync_downloads:
+                os.fsync(fd)
+        finally:
+            os.close(fd)
+
+        self.__verify()
+        return True
+
+    def __supports_range(self, total_length):
+        """
+            Probes whether the server honors byte ranges for the current URL.
+
+            :param int total_length:  The expected size of the file.
+            :return:  False only if the server sent the whole file instead of
+            the range.
+            :rtype: bool
+            :raises requests.HTTPError:  If the server rejected the request.
+            :raises IOError:  If the server answered with another range or
+            status.
+        """
+        response = self.session.get(self.hd.download_url,
+                                    headers={"Range": "bytes=0-0"},
+                                    stream=True, timeout=30)
+        response.close()
+        # An error, e.g. a 503 or an expired URL, says nothing about ranges.
+        # It is raised for the retry policy without touching the segments.
+        response.raise_for_status()
+
+        content_range = response.headers.get("Content-Range")
+        if (response.status_code == requests.codes.ok and
+                content_range is None):
+            return False
+
+        if (response.status_code != requests.codes.partial_content or
+                not (content_range or "").endswith("/%d" % total_length)):
+            raise IOError("Unexpected answer to the range request of %s: "
+                          "%d %s" % (self.hd.filename, response.status_code,
+                                     content_range or ""))
+
+        return True
+
+    def __load_state(self, total_length):
+        """
+            Loads the segments left from an interrupted download of the same
+            file, or preallocates the file and plans new segments.
+
+            :param int total_length:  The expected size of the file.
+        """
+        if SegmentedDownload.has_state(self.full_filename):
+            try:
+                with open(self.state_filename, "r") as f:
+                    state = json.load(f)
+                if (state.get("size") == total_length and
+                        state.get("md5") == self.hd.humble_md5 and
+                        os.path.exists(self.full_filename)):
+                    self.segments = [tuple(s) for s in state["segments"]]
+                    self.completed = set(state["completed"])
+                    return
+            except (ValueError, KeyError, TypeError):
+                pass
+
+        segment_length = -(-total_length // self.segment_count)
+        self.segments = [
+                (start, min(start + segment_length, total_length) - 1)
+                for start in range(0, total_length, segment_length)]
+        self.completed = set()
+
+        with open(self.full_filename, "wb") as f:
+            f.truncate(total_length)
+        HumbleHash.remove_md5file(self.full_filename)
+        self.__save_state()
+
+    def __save_state(self):
+        """ Atomically writes the segment state next to the target file. """
+        temporary_filename = self.state_filename + ".tmp"
+        with open(temporary_filename, "w") as f:
+            json.dump({"size": self.hd.humble_file_size,
+                       "md5": self.hd.humble_md5,
+                       "segments": self.segments,
+                       "completed": sorted(self.completed)}, f)
+        os.replace(temporary_filename, self.state_filename)
+
+    def __download_segment(self, fd, index):
+        """
+            Fetches a single segment and writes it at its position in the
+            target file.
+
+            :param int fd:  The file descriptor of the target file.
+            :param int index:  The index of the segment to download.
+        """
+        start, end = self.segments[index]
+        response = self.session.get(
+                self.hd.download_url,
+                headers={"Range": "bytes=%d-%d" % (start, end)},
+                stream=True, timeout=30)
+        if response.status_code >= 400:
+            # An expired URL is reported as such, to be refreshed.
+            response.close()
+            response.raise_for_status()
+        if response.status_code != requests.codes.partial_content:
+            response.close()
+            raise IOError("Segment %d of %s was not served as a byte range "
+                          "(HTTP %d)." %
+                          (index, self.hd.filename, response.status_code))
+
+        position = start
+        rate_limiter = self.rate_limiter
+        for chunk in response.iter_content(
+                chunk_size=rate_limiter.chunk_size(ConfigData.chunk_size)):
+            if not chunk:
+                continue
+            rate_limiter.consume(len(chunk))
+            if position + len(chunk) > end + 1:
+                raise IOError("Segment %d of %s is larger than requested." %
+                              (index, self.hd.filename))
+            SegmentedDownload.__pwrite(fd, chunk, position, self.__lock)
+            position += len(chunk)
+            Events.trigger(Events.EVENT_DOWNLOAD_BYTES, len(chunk))
+
+            # The segments share the task, so they update it in turn.
+            with self.__lock:
+                self.read_bytes += len(chunk)
+                self.task.add(len(chunk))
+
+        if position != end + 1:
+            raise IOError("Segment %d of %s is incomplete (%d of %d bytes)." %
+                          (index, self.hd.filename, position - start,
+                           end + 1 - start))
+
+        with self.__lock:
+            self.completed.add(index)
+            self.__save_state()
+
+    @staticmethod
+    def __pwrite(fd, data, offset, lock):
+        """
+            Writes data at the given offset of the file without moving a
+            shared file position, where the platform supports it.
+        """
+        data = memoryview(data)
+        if hasattr(os, "pwrite"):
+            while len(data) > 0:
+                written = os.pwrite(fd, data, offset)
+                data = data[written:]
+                offset += written
+            return
+
+        with lock:
+            os.lseek(fd, offset, os.SEEK_SET)
+            while len(data) > 0:
+                data = data[os.write(fd, data):]
+
+    def __verify(self):
+        """
+            Verifies the MD5 of the completed file against the Humble Bundle
+            specified MD5.
+
+            :raises IOError:  If the checksums don't match.
+        """
+        SegmentedDownload.remove_state(self.full_filename)
+        if ConfigData.ignore_md5:
+            return
+
+        local_md5 = HumbleHash.calculate_checksum(self.full_filename)
+
+        if local_md5 != self.hd.humble_md5:
+            self.hd.remove()
+            raise IOError("MD5 of %s doesn't match (expected %s actual %s)." %
+                          (self.hd.filename, self.hd.humble_md5, local_md5))
@@ -0,0 +1,18 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import pytest
+from hb_downloader.progress_tracker import ProgressTracker
+
+
+@pytest.fixture
+def progress_tracker(monkeypatch):
+    """ Resets the ProgressTracker, restoring its progress after the test. """
+    for name in ["item_count_current", "item_count_total",
+                 "download_size_current", "download_size_total",
+                 "current_product", "current_subproduct",
+                 "current_download"]:
+        monkeypatch.setattr(ProgressTracker, name,
+                            getattr(ProgressTracker, name))
+    ProgressTracker.reset()
+    return ProgressTracker
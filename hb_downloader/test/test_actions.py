@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import time
+from hb_downloader.actions import Action
+from hb_downloader.config_data import ConfigData
+
+
+def test_map_orders_keeps_order(monkeypatch):
+    """
+        Checks that orders retrieved in parallel are returned in the order
+        they were requested, even when they complete out of order
+    """
+    def fetch(hapi, key):
+        time.sleep(0.01 * (5 - key))
+        return key * 10
+
+    monkeypatch.setattr(ConfigData, "order_workers", 4)
+    results = list(Action.map_orders(fetch, None, [0, 1, 2, 3, 4]))
+    assert([key for key, _, _ in results] == [0, 1, 2, 3, 4])
+    assert([result for _, result, _ in results] == [0, 10, 20, 30, 40])
+
+
+def test_map_orders_reports_failures(monkeypatch):
+    """
+        Checks that a failing order is reported without aborting the others
+    """
+    def fetch(hapi, key):
+        if key == "bad":
+            raise ValueError("broken order")
+        return key
+
+    monkeypatch.setattr(ConfigData, "order_workers", 2)
+    results = list(Action.map_orders(fetch, None, ["a", "bad", "c"]))
+    assert(results[0] == ("a", "a", None))
+    assert(results[1][1] is None)
+    assert(isinstance(results[1][2], ValueError))
+    assert(results[2] == ("c", "c", None))
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from types import SimpleNamespace
+import pytest
+from hb_downloader.config_data import ConfigData
+from hb_downloader.humble_api.events import Events
+from hb_downloader.humble_api.humble_api import HumbleApi
+from hb_downloader.humble_api.humble_hash import HumbleHash
+from hb_downloader.humble_api.retry_policy import RetryPolicy
+from hb_downloader.humble_download import HumbleDownload
+
+pytest.importorskip("aiohttp")
+
+from hb_downloader.async_engine import AsyncEngine  # noqa: E402
+from hb_downloader.humble_api.async_humble_api import (  # noqa: E402
+    AsyncHumbleApi)
+
+content = os.urandom(50000)
+
+
+class Handler(BaseHTTPRequestHandler):
+    """ Serves orders under /order/ and the test content elsewhere. """
+
+    def do_GET(self):
+        if self.path.split("?")[0] == "/orders":
+            body = json.dumps([{"gamekey": "a"}, {"gamekey": "b"}]).encode()
+            self.send_response(200)
+        elif self.path.startswith("/order/"):
+            key = self.path[len("/order/"):].split("?")[0]
+            if key == "missing":
+                self.send_response(404)
+                self.end_headers()
+                return
+            if key == "flaky" and not self.server.failed:
+                self.server.failed = True
+                self.send_response(503)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            url = "http://127.0.0.1:%d/file.bin?ttl=%d" % (
+                    self.server.server_port, time.time() + 3600)
+            body = json.dumps({
+                    "product": {"machine_name": key, "human_name": key},
+                    "subproducts": [{
+                        "machine_name": "game", "payee": {},
+                        "downloads": [{
+                            "machine_name": "game", "platform": "linux",
+                            "options_dict": {},
+                            "download_struct": [{
+                                "url": {"web": url}, "file_size": len(content),
+                                "md5": hashlib.md5(content).hexdigest()}]}]}]
+                    }).encode()
+            self.send_response(200)
+        elif self.headers.get("Range"):
+            start = int(self.headers.get("Range")[6:].rstrip("-"))
+            body = content[start:]
+            self.send_response(206)
+        else:
+            body = content
+            self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server(monkeypatch):
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    server.failed = False
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = "http://127.0.0.1:%d" % server.server_port
+    monkeypatch.setattr(HumbleApi, "ORDER_URL", base_url + "/order/{order_id}")
+    monkeypatch.setattr(HumbleApi, "ORDER_LIST_URL", base_url + "/orders")
+    monkeypatch.setattr(HumbleApi, "order_cache", None)
+    yield base_url
+    server.shutdown()
+
+
+def test_map_orders_keeps_key_order(server):
+    engine = AsyncEngine("cookie", order_workers=4)
+    results = list(engine.map_orders(
+            lambda order, key: order.product.machine_name,
+            ["a", "missing", "b", "c"]))
+
+    assert([key for key, _, _ in results] == ["a", "missing", "b", "c"])
+    assert([result for _, result, _ in results] == ["a", None, "b", "c"])
+    assert(results[1][2] is not None)
+
+
+def test_get_gamekeys(server):
+    async def get_gamekeys():
+        async with AsyncHumbleApi("cookie") as api:
+            return await api.get_gamekeys()
+
+    assert(asyncio.run(get_gamekeys()) == ["a", "b"])
+
+
+def test_map_orders_retries_transient_errors(server, monkeypatch):
+    monkeypatch.setattr(HumbleApi, "retry_policy",
+                        RetryPolicy(retries=1, backoff=0))
+    monkeypatch.setattr(Events, "_callbacks", None)
+    requests_seen = []
+    Events.on(Events.EVENT_API_REQUEST, requests_seen.append)
+
+    results = list(AsyncEngine("cookie").map_orders(
+            lambda order, key: order.product.machine_name, ["flaky"]))
+
+    assert(results == [("flaky", "flaky", None)])
+    assert([status for _, status, _ in requests_seen] == [503, 200])
+
+
+def test_download_resumes_and_verifies(server, tmp_path, monkeypatch,
+                                       progress_tracker):
+    monkeypatch.setattr(ConfigData, "download_location", str(tmp_path))
+    monkeypatch.setattr(ConfigData, "chunk_size", 4096)
+    monkeypatch.setattr(ConfigData, "resume_downloads", True)
+    monkeypatch.setattr(ConfigData, "ignore_md5", False)
+    monkeypatch.setitem(ConfigData.download_platforms, "linux", True)
+    monkeypatch.setattr(HumbleHash, "write_md5", True)
+
+    hd = HumbleDownload(
+            SimpleNamespace(platform="linux", machine_name="game"),
+            SimpleNamespace(download_web=server + "/file.bin",
+                            filename="file.bin", file_size=len(content),
+                            human_size="", md5=hashlib.md5(content).hexdigest()),
+            SimpleNamespace(created=None, product=SimpleNamespace(
+                    human_name="Bundle", machine_name="bundle")),
+            SimpleNamespace(product_name="game"), "KEY")
+    os.makedirs(os.path.dirname(hd.full_filename))
+    with open(hd.full_filename, "wb") as f:
+        f.write(content[:20000])
+
+    # The URL has no expiry date and was never refreshed, the order is
+    # retrieved again for a fresh one.
+    failed = AsyncEngine("cookie").download([hd])
+
+    assert(failed == [])
+    assert("ttl=" in hd.download_url)
+    with open(hd.full_filename, "rb") as f:
+        assert(f.read() == content)
+    assert(HumbleHash.read_md5file(hd.full_filename) == hd.humble_md5)
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import hashlib
+import os
+import pytest
+from hb_downloader.deduplicator import Deduplicator
+from hb_downloader.humble_api.humble_hash import HumbleHash
+from hb_downloader.humble_api.state_store import StateStore
+
+CONTENT = b"the same book" * 100
+MD5 = hashlib.md5(CONTENT).hexdigest()
+
+
+class FakeDownload(object):
+    def __init__(self, full_filename, md5=MD5, size=len(CONTENT)):
+        self.full_filename = full_filename
+        self.filename = os.path.basename(full_filename)
+        self.humble_md5 = md5
+        self.humble_file_size = size
+        self.requires_download = True
+        self.status_message = None
+
+    def create_directory(self):
+        os.makedirs(os.path.dirname(self.full_filename), exist_ok=True)
+
+    def remove(self):
+        if os.path.exists(self.full_filename):
+            os.remove(self.full_filename)
+
+    def download(self):
+        self.create_directory()
+        with open(self.full_filename, "wb") as f:
+            f.write(CONTENT)
+
+
+@pytest.fixture(autouse=True)
+def no_md5_files(monkeypatch):
+    monkeypatch.setattr(HumbleHash, "write_md5", False)
+    monkeypatch.setattr(HumbleHash, "state_store", None)
+
+
+def test_plan_keeps_one_download_per_content(tmp_path):
+    first = FakeDownload(str(tmp_path / "a" / "book.pdf"))
+    other = FakeDownload(str(tmp_path / "b" / "other.pdf"), md5="0" * 32)
+    second = FakeDownload(str(tmp_path / "c" / "book.pdf"))
+
+    deduplicator = Deduplicator("copy", download_location=str(tmp_path))
+    assert(deduplicator.plan([first, other, second]) == [first, other])
+    assert(Deduplicator("off").plan([first, second]) == [first, second])
+
+
+@pytest.mark.parametrize("mode", ["hardlink", "reflink", "copy"])
+def test_duplicates_are_materialized(tmp_path, mode):
+    first = FakeDownload(str(tmp_path / "a" / "book.pdf"))
+    second = FakeDownload(str(tmp_path / "b" / "book.pdf"))
+
+    deduplicator = Deduplicator(mode, download_location=str(tmp_path))
+    for hd in deduplicator.plan([first, second]):
+        hd.download()
+    assert(deduplicator.complete([]) == [])
+
+    with open(second.full_filename, "rb") as f:
+        assert(f.read() == CONTENT)
+    assert(not second.requires_download)
+    same_inode = (os.stat(first.full_filename).st_ino ==
+                  os.stat(second.full_filename).st_ino)
+    assert(same_inode == (mode == "hardlink"))
+
+
+def test_failed_source_fails_duplicates(tmp_path):
+    first = FakeDownload(str(tmp_path / "a" / "book.pdf"))
+    second = FakeDownload(str(tmp_path / "b" / "book.pdf"))
+
+    deduplicator = Deduplicator("copy", download_location=str(tmp_path))
+    deduplicator.plan([first, second])
+    assert(deduplicator.complete([first]) == [second])
+    assert(not os.path.exists(second.full_filename))
+
+
+def test_existing_copy_is_used(tmp_path):
+    existing = FakeDownload(str(tmp_path / "old" / "book.pdf"))
+    existing.download()
+    state_store = StateStore(str(tmp_path / "state.sqlite"))
+    state_store.record(existing.full_filename, MD5)
+
+    wanted = FakeDownload(str(tmp_path / "new" / "book.pdf"))
+    deduplicator = Deduplicator("copy", state_store, str(tmp_path))
+    assert(deduplicator.plan([wanted]) == [])
+    with open(wanted.full_filename, "rb") as f:
+        assert(f.read() == CONTENT)
+
+    # Modified files are no longer identical.
+    with open(existing.full_filename, "ab") as f:
+        f.write(b"changed")
+    another = FakeDownload(str(tmp_path / "another" / "book.pdf"))
+    assert(Deduplicator("copy", state_store, str(tmp_path)).plan(
+            [another]) == [another])
+    state_store.close()
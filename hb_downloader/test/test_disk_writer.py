@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import hashlib
+import os
+import pytest
+from hb_downloader.disk_writer import DiskWriter
+from hb_downloader.humble_api.hash_checkpoint import HashCheckpoint
+
+
+def test_chunks_are_written_and_hashed(tmp_path):
+    full_filename = str(tmp_path / "file.bin")
+    chunks = [os.urandom(1000) for _ in range(50)]
+    md5_hash = hashlib.md5()
+
+    with DiskWriter(full_filename, "wb", md5_hash,
+                    HashCheckpoint(full_filename), queue_size=2,
+                    fsync=True) as writer:
+        for chunk in chunks:
+            writer.write(chunk)
+
+    with open(full_filename, "rb") as f:
+        assert(f.read() == b"".join(chunks))
+    assert(md5_hash.hexdigest() == hashlib.md5(b"".join(chunks)).hexdigest())
+    assert(os.path.exists(HashCheckpoint.checkpoint_filename(full_filename)))
+
+
+def test_write_error_reaches_reader(tmp_path):
+    class FailingCheckpoint(object):
+        def update(self, data):
+            raise OSError("disk full")
+
+        def save(self):
+            pass
+
+    full_filename = str(tmp_path / "file.bin")
+    with pytest.raises(OSError):
+        with DiskWriter(full_filename, "wb", hashlib.md5(),
+                        FailingCheckpoint(), queue_size=1) as writer:
+            for _ in range(20):
+                writer.write(b"data")
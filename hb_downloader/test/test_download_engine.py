@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import threading
+import time
+from hb_downloader.download_engine import DownloadEngine
+from hb_downloader.progress_tracker import ProgressTracker
+
+
+class FakeDownload(object):
+    """ Stands in for a HumbleDownload. """
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def __init__(self, name, fail=False, url="https://dl.example.com/a"):
+        self.filename = name
+        self.machine_name = name
+        self.product_name = name
+        self.subproduct_name = name
+        self.download_url = url
+        self.humble_file_size = 10
+        self.humble_file_size_human = "10 bytes"
+        self.status_message = ""
+        self.fail = fail
+
+    def download_file(self):
+        with FakeDownload.lock:
+            FakeDownload.active += 1
+            FakeDownload.peak = max(FakeDownload.peak, FakeDownload.active)
+        time.sleep(0.02)
+        with FakeDownload.lock:
+            FakeDownload.active -= 1
+        if self.fail:
+            raise IOError("connection reset")
+
+
+def test_failure_does_not_stop_siblings(progress_tracker):
+    downloads = [FakeDownload("a"), FakeDownload("b", True), FakeDownload("c")]
+    failed = DownloadEngine(workers=3).run(downloads)
+    assert(failed == [downloads[1]])
+    assert(ProgressTracker.item_count_current == 3)
+    assert(ProgressTracker.download_size_current == 30)
+
+
+def test_host_connections_cap(progress_tracker, monkeypatch):
+    monkeypatch.setattr(FakeDownload, "peak", 0)
+    downloads = [FakeDownload(str(i)) for i in range(6)]
+    DownloadEngine(workers=6, host_connections=2).run(downloads)
+    assert(FakeDownload.peak == 2)
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from types import SimpleNamespace
+import pytest
+from hb_downloader.download_scheduler import DownloadScheduler
+
+
+def planned_downloads():
+    def hd(name, size, platform, created):
+        return SimpleNamespace(filename=name, humble_file_size=size,
+                               platform=platform, order_created=created)
+
+    return {"old": [hd("a", 30, "windows", "2015-01-01"),
+                    hd("b", 10, "linux", "2015-01-01"),
+                    hd("c", 20, "ebook", "2015-01-01")],
+            "new": [hd("d", 5, "mac", "2019-06-01"),
+                    hd("e", 40, "linux", "2019-06-01")],
+            "undated": [hd("f", 1, "audio", None)]}
+
+
+@pytest.mark.parametrize("policy, expected", [
+    ("default", "abcdef"),
+    ("smallest", "fdbcae"),
+    ("largest", "eacbdf"),
+    ("newest", "deabcf"),
+    ("round-robin", "adfbec"),
+])
+def test_policies(policy, expected):
+    schedule = DownloadScheduler(policy).schedule(planned_downloads())
+    assert("".join(hd.filename for hd in schedule) == expected)
+
+
+def test_platform_priority():
+    schedule = DownloadScheduler("platform", ["linux", "ebook"]).schedule(
+            planned_downloads())
+    assert("".join(hd.filename for hd in schedule) == "becadf")
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        DownloadScheduler("fastest")
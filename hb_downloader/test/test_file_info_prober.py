@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from hb_downloader.humble_api.file_info_prober import FileInfoProber
+from hb_downloader.humble_api.model.download_struct import DownloadStruct
+
+
+class HeadHandler(BaseHTTPRequestHandler):
+    """ Answers HEAD requests with a fixed Last-Modified header. """
+    requests = []
+
+    def do_HEAD(self):
+        HeadHandler.requests.append(self.path)
+        if self.path.startswith("/missing"):
+            self.send_response(404)
+        else:
+            self.send_response(200)
+            self.send_header("Last-Modified", "Wed, 21 Oct 2015 07:28:00 GMT")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def download_struct(url):
+    return DownloadStruct({"url": {"web": url}, "file_size": 1, "md5": "0"})
+
+
+def test_probe_is_cached_across_signatures(tmp_path):
+    server = HTTPServer(("127.0.0.1", 0), HeadHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = "http://127.0.0.1:%d" % server.server_port
+    cache_filename = str(tmp_path / "file-info.json")
+    HeadHandler.requests = []
+
+    structs = [download_struct(base_url + "/a.zip?sig=1"),
+               download_struct(base_url + "/b.zip?sig=1"),
+               download_struct(base_url + "/missing.zip?sig=1")]
+    FileInfoProber(cache_filename, workers=4).probe(structs)
+    assert([ds.last_modified for ds in structs] ==
+           ["2015-10-21", "2015-10-21", "1970-01-01"])
+    assert(len(HeadHandler.requests) == 3)
+
+    # A later run with newly signed URLs only probes the failed file again.
+    structs = [download_struct(base_url + "/a.zip?sig=2"),
+               download_struct(base_url + "/missing.zip?sig=2")]
+    FileInfoProber(cache_filename, workers=4).probe(structs)
+    server.shutdown()
+
+    assert(structs[0].last_modified == "2015-10-21")
+    assert(HeadHandler.requests[3:] == ["/missing.zip?sig=2"])
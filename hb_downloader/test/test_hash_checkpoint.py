@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import hashlib
+import os
+from hb_downloader.humble_api.hash_checkpoint import HashCheckpoint
+from hb_downloader.humble_api.humble_hash import HumbleHash
+
+content = os.urandom(10000)
+
+
+def write_partial(filename, data):
+    checkpoint = HashCheckpoint(filename)
+    with open(filename, "wb") as f:
+        f.write(data)
+    checkpoint.update(data)
+    checkpoint.save()
+    return checkpoint
+
+
+def test_unchanged_partial_file_is_trusted(tmp_path, monkeypatch):
+    monkeypatch.setattr(HashCheckpoint, "block_size", 1000)
+    filename = str(tmp_path / "file.bin")
+    write_partial(filename, content[:4500])
+
+    md5_hash, length = HashCheckpoint(filename).resume(hashlib.md5(), 4500)
+    assert(length == 4500)
+    assert(md5_hash.hexdigest() == hashlib.md5(content[:4500]).hexdigest())
+
+
+def test_damaged_partial_file_is_truncated(tmp_path, monkeypatch):
+    monkeypatch.setattr(HashCheckpoint, "block_size", 1000)
+    filename = str(tmp_path / "file.bin")
+    write_partial(filename, content[:4500])
+    # Damage the third block, which also changes the modification time.
+    with open(filename, "r+b") as f:
+        f.seek(2500)
+        f.write(b"\0" * 10)
+    os.utime(filename, ns=(0, 0))
+
+    checkpoint = HashCheckpoint(filename)
+    md5_hash, length = checkpoint.resume(hashlib.md5(), 4500)
+    assert(length == 2000)
+    assert(os.path.getsize(filename) == 2000)
+    assert(md5_hash.hexdigest() == hashlib.md5(content[:2000]).hexdigest())
+    assert(checkpoint.verified_offset == 2000)
+
+
+def test_nested_reads_keep_their_chunks(tmp_path, monkeypatch):
+    monkeypatch.setattr(HumbleHash, "chunk_size", 1000)
+    first = str(tmp_path / "first.bin")
+    second = str(tmp_path / "second.bin")
+    with open(first, "wb") as f:
+        f.write(content[:3000])
+    with open(second, "wb") as f:
+        f.write(content[3000:])
+
+    with open(first, "rb") as f, open(second, "rb") as g:
+        pairs = [(bytes(a), bytes(b)) for a, b in
+                 zip(HumbleHash.read_chunks(f), HumbleHash.read_chunks(g))]
+    assert(b"".join(a for a, _ in pairs) == content[:3000])
+    assert(b"".join(b for _, b in pairs) == content[3000:6000])
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import hashlib
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from types import SimpleNamespace
+import pytest
+from hb_downloader.config_data import ConfigData
+from hb_downloader.humble_api.humble_hash import HumbleHash
+from hb_downloader.humble_download import HumbleDownload
+
+content = os.urandom(50000)
+
+
+class FileHandler(BaseHTTPRequestHandler):
+    """ Serves the test content, honoring open ended byte ranges. """
+
+    def do_GET(self):
+        byte_range = self.headers.get("Range")
+        if byte_range:
+            start = int(byte_range[6:].rstrip("-"))
+            self.send_response(206)
+            body = content[start:]
+        else:
+            self.send_response(200)
+            body = content
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def create_download(tmp_path, monkeypatch, md5):
+    server = HTTPServer(("127.0.0.1", 0), FileHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = "http://127.0.0.1:%d/file.bin" % server.server_port
+
+    monkeypatch.setattr(ConfigData, "download_location", str(tmp_path))
+    monkeypatch.setattr(ConfigData, "chunk_size", 4096)
+    monkeypatch.setattr(ConfigData, "resume_downloads", True)
+    monkeypatch.setattr(ConfigData, "ignore_md5", False)
+    monkeypatch.setattr(ConfigData, "segment_threshold", 0)
+    monkeypatch.setattr(HumbleHash, "write_md5", True)
+
+    hd = HumbleDownload(
+            SimpleNamespace(platform="linux", machine_name="game"),
+            SimpleNamespace(download_web=url, filename="file.bin",
+                            file_size=len(content), human_size="", md5=md5),
+            SimpleNamespace(created=None, product=SimpleNamespace(
+                    human_name="Bundle", machine_name="bundle")),
+            SimpleNamespace(product_name="game"), "KEY")
+    return server, hd
+
+
+def test_download_writes_md5_without_rereading(tmp_path, monkeypatch):
+    server, hd = create_download(tmp_path, monkeypatch,
+                                 hashlib.md5(content).hexdigest())
+    hd.download_file()
+    server.shutdown()
+
+    with open(hd.full_filename, "rb") as f:
+        assert(f.read() == content)
+    assert(HumbleHash.read_md5file(hd.full_filename) == hd.humble_md5)
+
+
+def test_resumed_download_hashes_prefix(tmp_path, monkeypatch):
+    server, hd = create_download(tmp_path, monkeypatch,
+                                 hashlib.md5(content).hexdigest())
+    os.makedirs(os.path.dirname(hd.full_filename))
+    with open(hd.full_filename, "wb") as f:
+        f.write(content[:20000])
+
+    hd.download_file()
+    server.shutdown()
+
+    with open(hd.full_filename, "rb") as f:
+        assert(f.read() == content)
+    assert(HumbleHash.read_md5file(hd.full_filename) == hd.humble_md5)
+
+
+def test_md5_mismatch_fails_download(tmp_path, monkeypatch):
+    server, hd = create_download(tmp_path, monkeypatch, "0" * 32)
+    with pytest.raises(IOError):
+        hd.download_file()
+    server.shutdown()
+
+    assert(hd.requires_download)
+    assert(not os.path.exists(hd.full_filename))
+
+
+def test_status_checks_grouped_by_directory():
+    from concurrent.futures import ThreadPoolExecutor
+
+    class FakeDownload(object):
+        checked = []
+
+        def __init__(self, full_filename, needed):
+            self.full_filename = full_filename
+            self.requires_download = False
+            self.needed = needed
+
+        def check_status(self):
+            FakeDownload.checked.append(self.full_filename)
+            self.requires_download = self.needed
+            return not self.needed
+
+    downloads = [FakeDownload("/a/1", True), FakeDownload("/b/1", False),
+                 FakeDownload("/a/2", False), FakeDownload("/b/2", True)]
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        needed_downloads = HumbleDownload.submit_status_checks(
+                executor, downloads)
+        assert(needed_downloads() == [downloads[0], downloads[3]])
+    assert(FakeDownload.checked == ["/a/1", "/a/2", "/b/1", "/b/2"])
+
+
+def test_url_refresher_only_retrieves_stale_orders(monkeypatch):
+    from hb_downloader.humble_download import DownloadUrlRefresher
+    retrieved = []
+
+    def downloads_from_key(hapi, key, force_refresh=False):
+        retrieved.append(key)
+        return [SimpleNamespace(humble_md5=md5,
+                                download_url="https://dl/%s?v=%d" %
+                                (md5, len(retrieved)))
+                for md5 in ["m1", "m2"]]
+
+    monkeypatch.setattr(HumbleDownload, "downloads_from_key",
+                        staticmethod(downloads_from_key))
+
+    def hd(md5, url):
+        return SimpleNamespace(order_number="KEY", humble_md5=md5,
+                               filename=md5, download_url=url,
+                               url_fetched_at=None)
+
+    refresher = DownloadUrlRefresher(None)
+    signed = hd("m1", "https://dl/m1?ttl=%d" % (time.time() + 3600))
+    refresher.refresh(signed)
+    assert(retrieved == [])
+
+    first, second = hd("m1", "https://dl/old"), hd("m2", "https://dl/old")
+    refresher.refresh(first)
+    refresher.refresh(second)
+    assert(retrieved == ["KEY"])
+    assert(second.download_url == "https://dl/m2?v=1")
+
+    # The server rejected the URL, the order is retrieved again.
+    refresher.refresh(first, expired=True)
+    assert(retrieved == ["KEY", "KEY"])
+    assert(first.download_url == "https://dl/m1?v=2")
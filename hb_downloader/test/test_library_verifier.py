@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import hashlib
+import json
+import os
+from types import SimpleNamespace
+from hb_downloader.humble_api.humble_hash import HumbleHash
+from hb_downloader.library_verifier import LibraryVerifier
+
+
+def create_file(tmp_path, name, data, expected=None):
+    full_filename = str(tmp_path / name)
+    if data is not None:
+        with open(full_filename, "wb") as f:
+            f.write(data)
+    expected = data if expected is None else expected
+    return SimpleNamespace(full_filename=full_filename, order_number="KEY",
+                           product_name="Bundle", subproduct_name=name,
+                           humble_file_size=len(expected),
+                           humble_md5=hashlib.md5(expected).hexdigest())
+
+
+def test_report_lists_problems(tmp_path, monkeypatch):
+    monkeypatch.setattr(HumbleHash, "write_md5", True)
+    monkeypatch.setattr(HumbleHash, "state_store", None)
+    downloads = [create_file(tmp_path, "ok.bin", b"content"),
+                 create_file(tmp_path, "missing.bin", None, b"content"),
+                 create_file(tmp_path, "short.bin", b"con", b"content"),
+                 create_file(tmp_path, "bad.bin", b"CONTENT", b"content")]
+    report = str(tmp_path / "report.json")
+
+    problems = LibraryVerifier(report, 2).run(downloads)
+
+    assert([p["status"] for p in problems] ==
+           ["missing", "truncated", "mismatched"])
+    with open(report) as f:
+        summary = json.load(f)["summary"]
+    assert(summary["ok"] == 1 and summary["mismatched"] == 1)
+    assert(not os.path.exists(report + ".checkpoint"))
+    # The audit doesn't write to the library.
+    assert(not [name for name in os.listdir(str(tmp_path))
+                if name.endswith(".md5")])
+
+
+def test_checkpointed_files_are_not_verified_again(tmp_path):
+    downloads = [create_file(tmp_path, "ok.bin", b"content")]
+    report = str(tmp_path / "report.csv")
+    # Pretend an interrupted run already found the file mismatched.
+    with open(report + ".checkpoint", "w") as f:
+        json.dump({"%s|%s" % (downloads[0].full_filename,
+                              downloads[0].humble_md5):
+                   {"status": "mismatched",
+                    "path": downloads[0].full_filename,
+                    "expected_md5": downloads[0].humble_md5}}, f)
+
+    problems = LibraryVerifier(report).run(downloads)
+
+    assert([p["status"] for p in problems] == ["mismatched"])
+    with open(report) as f:
+        assert(f.readline().startswith("status,path"))
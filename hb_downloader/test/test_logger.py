@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import glob
+import threading
+import time
+import pytest
+import hb_downloader.logger as logger
+
+
+def test_messages_are_written_in_order(tmp_path, monkeypatch, capsys):
+    # The log file is kept open, so close the one of the previous tests.
+    logger.shutdown()
+    monkeypatch.chdir(tmp_path)
+    logger.display_message(False, "Download", "a.bin: ", False)
+    logger.display_message(False, "Download", "finished.")
+    logger.display_message(True, "Config", "not in debug mode")
+    logger.display_message(False, "Processing", "done")
+    logger.flush()
+
+    output = capsys.readouterr().out.splitlines()
+    assert(len(output) == 2)
+    assert(output[0].endswith("] [  Download] finished."))
+    assert(output[0].count("[  Download]") == 2)
+    assert(output[1].endswith("[Processing] done"))
+
+    logger.shutdown()
+    logfiles = glob.glob(str(tmp_path / "hb-downloader_*.log"))
+    assert(len(logfiles) == 1)
+    with open(logfiles[0]) as f:
+        logged = f.read().splitlines()
+    assert(len(logged) == 3)
+    assert("not in debug mode" not in "".join(logged))
+
+
+def test_status_is_redrawn_below_the_messages(capsys):
+    logger.display_status(["[  Download] a.bin: 50%", "[  Progress] 1/2"])
+    logger.flush()
+    logger.display_message(False, "Download", "b.bin: finished.")
+    logger.flush()
+    logger.display_status([])
+    logger.flush()
+
+    output = capsys.readouterr().out
+    assert(output.startswith("[  Download] a.bin: 50%\n[  Progress] 1/2\n"))
+    # The status is erased before the message, which is drawn below it.
+    assert("\x1b[2F\x1b[J[" in output)
+    assert(output.endswith("b.bin: finished.\n[  Download] a.bin: 50%\n"
+                           "[  Progress] 1/2\n\x1b[2F\x1b[J"))
+
+
+def test_unwritable_log_file_is_skipped(tmp_path, monkeypatch, capsys):
+    logger.shutdown()
+    monkeypatch.chdir(tmp_path)
+    # A directory stands in the way of the log file of the day.
+    (tmp_path / ("hb-downloader_%s.log" % time.strftime("%Y-%m-%d"))).mkdir()
+    logger.display_message(False, "Download", "a.bin: finished.")
+    logger.flush()
+    logger.display_message(False, "Download", "b.bin: finished.")
+    logger.flush()
+
+    captured = capsys.readouterr()
+    assert(captured.out.count("finished.") == 2)
+    assert("log file can't be written" in captured.err)
+    logger.shutdown()
+
+
+def test_flush_returns_if_the_writer_died(monkeypatch):
+    writer = threading.Thread(target=lambda: None)
+    writer.start()
+    writer.join()
+    monkeypatch.setattr(logger, "_writer", writer)
+    logger.flush()
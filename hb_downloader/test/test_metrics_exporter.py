@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import socket
+import urllib.request
+import pytest
+from hb_downloader.humble_api.events import Events
+from hb_downloader.metrics_exporter import MetricsExporter
+
+
+@pytest.fixture
+def events():
+    callbacks = Events._callbacks
+    Events._callbacks = None
+    yield
+    Events._callbacks = callbacks
+
+
+def test_textfile(tmp_path, events):
+    textfile = str(tmp_path / "hb_downloader.prom")
+    exporter = MetricsExporter(textfile, interval=3600)
+    exporter.start()
+    Events.trigger(Events.EVENT_DOWNLOAD_BYTES, 1000)
+    Events.trigger(Events.EVENT_DOWNLOAD_BYTES, 24)
+    Events.trigger(Events.EVENT_MD5_BYTES, 512)
+    Events.trigger(Events.EVENT_DOWNLOAD_END, "a.bin")
+    Events.trigger(Events.EVENT_DOWNLOAD_FAILED, "b.bin")
+    Events.trigger(Events.EVENT_DOWNLOAD_SKIPPED, "c.bin")
+    Events.trigger(Events.EVENT_RETRY, "b.bin")
+    Events.trigger(Events.EVENT_API_REQUEST, ("https://a/", 200, 0.2))
+    Events.trigger(Events.EVENT_API_REQUEST, ("https://a/", None, 3))
+    exporter.stop()
+
+    with open(textfile) as f:
+        metrics = f.read().splitlines()
+    assert("hb_downloader_running 0" in metrics)
+    assert("hb_downloader_downloaded_bytes_total 1024" in metrics)
+    assert("hb_downloader_hashed_bytes_total 512" in metrics)
+    assert('hb_downloader_files_total{state="completed"} 1' in metrics)
+    assert('hb_downloader_files_total{state="failed"} 1' in metrics)
+    assert('hb_downloader_files_total{state="skipped"} 1' in metrics)
+    assert("hb_downloader_retries_total 1" in metrics)
+    assert('hb_downloader_api_requests_total{status="200"} 1' in metrics)
+    assert('hb_downloader_api_requests_total{status="error"} 1' in metrics)
+    assert('hb_downloader_api_request_duration_seconds_bucket{le="0.1"} 0'
+           in metrics)
+    assert('hb_downloader_api_request_duration_seconds_bucket{le="0.25"} 1'
+           in metrics)
+    assert('hb_downloader_api_request_duration_seconds_bucket{le="+Inf"} 2'
+           in metrics)
+    assert("hb_downloader_api_request_duration_seconds_sum 3.2" in metrics)
+    assert(exporter.peak_throughput > 0)
+    assert(not (tmp_path / "hb_downloader.prom.tmp").exists())
+
+
+def test_endpoint(events):
+    # Port 0 disables the endpoint, so look for a free port.
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    exporter = MetricsExporter(port=port)
+    exporter.start()
+    try:
+        Events.trigger(Events.EVENT_DOWNLOAD_BYTES, 42)
+        with urllib.request.urlopen(
+                "http://127.0.0.1:%d/metrics" % port) as response:
+            body = response.read().decode("utf-8")
+    finally:
+        exporter.stop()
+    assert("hb_downloader_running 1" in body.splitlines())
+    assert("hb_downloader_downloaded_bytes_total 42" in body.splitlines())
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from hb_downloader.humble_api.model.base_model import BaseModel
+from hb_downloader.humble_api.model.order import Order
+
+order_data = {
+    "gamekey": "ABC",
+    "product": {"machine_name": "bundle", "human_name": "Bundle"},
+    "subproducts": [{
+        "machine_name": "game_soundtrack",
+        "payee": {"machine_name": "dev"},
+        "downloads": [{
+            "machine_name": "game_linux",
+            "platform": "linux",
+            "options_dict": {},
+            "download_struct": [{
+                "md5": "0" * 32,
+                "file_size": 10,
+                "timestamp": 0,
+                "url": {"web": "https://dl.example.com/dir/game.tar.gz?t=1"}}]}]}]}
+
+
+def test_children_are_built_lazily():
+    order = Order(order_data)
+    assert(order._data is None)
+    assert(order.subscriptions is None)
+    assert(isinstance(order._subproducts[0], dict))
+
+    subproduct = order.subproducts[0]
+    assert(order.subproducts[0] is subproduct)
+    assert(subproduct.product_name == "game")
+    assert(subproduct.payee.machine_name == "dev")
+
+    ds = subproduct.downloads[0].download_structs[0]
+    assert(ds.filename == "dir_game.tar.gz")
+    assert(ds.last_modified == "1970-01-01")
+    ds.set_last_modified("Wed, 21 Oct 2015 07:28:00 GMT")
+    assert(ds.last_modified == "2015-10-21")
+    assert("filename" in dict.fromkeys(ds))
+    assert(not hasattr(ds, "__dict__"))
+
+
+def test_raw_data_retained_when_debugging(monkeypatch):
+    monkeypatch.setattr(BaseModel, "retain_data", True)
+    order = Order(order_data)
+    assert(order._data is order_data)
+    assert(order.subproducts[0]._data is order_data["subproducts"][0])
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import requests
+from hb_downloader.humble_api.humble_api import HumbleApi
+from hb_downloader.humble_api.order_cache import OrderCache
+
+order_data = {"product": {"machine_name": "bundle", "human_name": "Bundle"},
+              "gamekey": "ABC", "subproducts": []}
+
+
+class FakeSession(object):
+    """ Records the requests made and answers them with canned responses. """
+
+    def __init__(self, status_code=200):
+        self.status_code = status_code
+        self.requests = []
+
+    def request(self, method, url, **kwargs):
+        self.requests.append(kwargs.get("headers", {}))
+        response = requests.Response()
+        response.status_code = self.status_code
+        response.headers["ETag"] = '"v1"'
+        response._content = b'{"product": {"machine_name": "bundle"}}'
+        return response
+
+
+def create_api(tmp_path, ttl, session):
+    hapi = HumbleApi("cookie")
+    hapi.order_cache = OrderCache(str(tmp_path), ttl)
+    hapi.session = session
+    return hapi
+
+
+def test_fresh_order_skips_network(tmp_path):
+    session = FakeSession()
+    hapi = create_api(tmp_path, 3600, session)
+    hapi.order_cache.put("ABC", order_data, '"v1"')
+    order = hapi.get_order("ABC")
+    assert(order.product.human_name == "Bundle")
+    assert(session.requests == [])
+
+
+def test_stale_order_is_revalidated(tmp_path):
+    session = FakeSession(status_code=304)
+    hapi = create_api(tmp_path, 0, session)
+    hapi.order_cache.put("ABC", order_data, '"v1"')
+    order = hapi.get_order("ABC")
+    assert(order.product.human_name == "Bundle")
+    assert(session.requests == [{"If-None-Match": '"v1"'}])
+
+
+def test_force_refresh_bypasses_cache(tmp_path):
+    session = FakeSession()
+    hapi = create_api(tmp_path, 3600, session)
+    hapi.order_cache.put("ABC", order_data, '"v1"')
+    order = hapi.get_order("ABC", force_refresh=True)
+    assert(order.product.human_name is None)
+    assert(len(session.requests) == 1)
+    assert(hapi.order_cache.get("ABC")["data"]["product"] ==
+           {"machine_name": "bundle"})
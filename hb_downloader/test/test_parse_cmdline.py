@@ -6,7 +6,7 @@ import subprocess
 from hb_downloader.config_data import ConfigData
 from hb_downloader.configuration import Configuration
 
-actions = ["download", "download-product", "list"]
+actions = ["download", "download-product", "list", "import-md5", "verify"]
 
 def test_help():
     # Check that the script runs and displays the help text without errors
@@ -99,3 +99,26 @@ def test_simple_parse_to_config():
     for platform in ["mac", "ebook", "audio", "asmjs"]:
         print("checking if %s is disabled as it should" % platform)
         assert(ConfigData.download_platforms.get(platform) is False)
+
+
+def test_order_workers_to_config():
+    """
+        Tests that the number of parallel order retrievals is parsed
+    """
+    sys.argv = ["", "--order_workers", "3", "list"]
+    Configuration.load_configuration("hb-downloader-settings.yaml")
+    Configuration.parse_command_line()
+    assert(ConfigData.order_workers == 3)
+
+
+def test_verify_to_config():
+    """
+        Tests the verify action and its report
+    """
+    sys.argv = ["", "verify", "-r", "report.csv", "ebooks"]
+    Configuration.load_configuration("hb-downloader-settings.yaml")
+    Configuration.parse_command_line()
+    assert(ConfigData.action == "verify")
+    assert(ConfigData.verify_report == "report.csv")
+    assert(ConfigData.download_platforms["ebook"] is True)
+    assert(ConfigData.download_platforms["linux"] is False)
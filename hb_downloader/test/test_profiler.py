@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import pstats
+import threading
+from hb_downloader.humble_api.profiler import Profiler
+
+
+def busy_worker_function():
+    with Profiler.phase("transfer", "file.bin"):
+        sum(i * i for i in range(200000))
+
+
+def test_phases_are_free_while_disabled():
+    Profiler.reset()
+    assert(Profiler.phase("get_order", "a") is Profiler.phase("transfer"))
+    with Profiler.phase("get_order", "a"):
+        pass
+    assert(Profiler.summary(1, 1).count("get_order") == 0)
+
+
+def test_report(tmp_path):
+    output_prefix = str(tmp_path / "profile")
+    Profiler.start()
+    with Profiler.phase("get_order", "key1"):
+        pass
+    thread = threading.Thread(target=busy_worker_function)
+    thread.start()
+    thread.join()
+    summary_filename = Profiler.stop(output_prefix)
+
+    with open(summary_filename) as f:
+        summary = f.read()
+    assert("transfer" in summary and "file.bin" in summary)
+    assert("Slowest get_order:" in summary)
+    stats = pstats.Stats(output_prefix + ".pstats")
+    assert(any(function[2] == "busy_worker_function"
+               for function in stats.stats))
+
+    # Stopping twice doesn't write anything.
+    assert(Profiler.stop(output_prefix) is None)
+    assert(Profiler.phase("get_order") is Profiler.phase("transfer"))
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import threading
+from hb_downloader.humble_api.progress_aggregator import ProgressAggregator
+from hb_downloader.progress_renderer import ProgressRenderer
+from hb_downloader.progress_tracker import ProgressTracker
+
+
+def test_concurrent_tasks():
+    ProgressAggregator.reset()
+
+    def hash_file(index):
+        with ProgressAggregator.task("Checksum", "file%d.bin" % index,
+                                     1000) as task:
+            for _ in range(100):
+                task.add(10)
+
+    threads = [threading.Thread(target=hash_file, args=(index,))
+               for index in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    tasks, processed = ProgressAggregator.snapshot()
+    assert(tasks == [])
+    assert(processed == {"Checksum": 8000})
+
+
+def test_resumed_bytes_are_not_processed():
+    ProgressAggregator.reset()
+    with ProgressAggregator.task("Download", "a.bin", 1000, 400) as task:
+        task.add(100)
+        tasks, processed = ProgressAggregator.snapshot()
+        assert([t[:4] for t in tasks] == [("Download", "a.bin", 500, 1000)])
+        assert(processed == {"Download": 100})
+    assert(ProgressAggregator.snapshot() == ([], {"Download": 100}))
+
+
+def test_render(monkeypatch):
+    ProgressAggregator.reset()
+    monkeypatch.setattr(ProgressTracker, "item_count_current", 1)
+    monkeypatch.setattr(ProgressTracker, "item_count_total", 3)
+    monkeypatch.setattr(ProgressTracker, "download_size_current", 1024)
+    monkeypatch.setattr(ProgressTracker, "download_size_total", 4096)
+    renderer = ProgressRenderer(True)
+
+    with ProgressAggregator.task("Download", "a.bin", 2048) as first, \
+            ProgressAggregator.task("Checksum", "b.bin", 1024) as second:
+        lines = renderer.render(now=100)
+        assert(lines[-2] == ("Checksum", "1 file, 0.00 bytes/s"))
+        assert(lines[-1] == ("Progress",
+                             "1/3, 1024.00 bytes/4.00 KiB (25.00%), "
+                             "waiting for data"))
+
+        first.add(1024)
+        second.add(512)
+        lines = renderer.render(now=101)
+        assert(lines[0] == ("Download",
+                            "a.bin: 1024.00 bytes/2.00 KiB (50.00%)"))
+        assert(lines[1] == ("Checksum",
+                            "b.bin: 512.00 bytes/1024.00 bytes (50.00%)"))
+        # Hashed bytes are reported apart from the downloaded bytes.
+        assert(lines[2] == ("Checksum", "1 file, 512.00 bytes/s"))
+        # 1 KiB was downloaded in a second, 2 KiB are left.
+        assert(lines[3] == ("Progress",
+                            "1/3, 2.00 KiB/4.00 KiB (50.00%), "
+                            "2s left @ 1024.00 bytes/s"))
+
+        renderer.max_tasks = 1
+        lines = renderer.render(now=102)
+        assert(len(lines) == 4)
+        assert(lines[1] == ("", "and 1 more."))
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import datetime
+import pytest
+from hb_downloader.rate_limiter import RateLimiter
+
+
+def test_shared_rate_is_enforced():
+    now = [0.0]
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    limiter = RateLimiter(200000, clock=lambda: now[0], sleep=sleep)
+
+    # Three transfers taking turns, 300000 bytes in all at 200000 bytes/s,
+    # starting with an empty bucket.
+    for _ in range(10):
+        for _ in range(3):
+            limiter.consume(10000)
+
+    assert(sleeps == pytest.approx([0.05] * 30))
+    assert(now[0] == pytest.approx(1.5))
+
+
+def test_debt_is_carried_over_short_waits():
+    now = [0.0]
+    sleeps = []
+    limiter = RateLimiter(1000000, clock=lambda: now[0], sleep=sleeps.append)
+
+    # 5000 bytes are 5 ms at 1000000 bytes/s, too short to sleep.
+    limiter.consume(5000)
+    assert(sleeps == [])
+    # The debt is paid back with the next wait, 15 ms for 15000 bytes.
+    limiter.consume(10000)
+    assert(sleeps == pytest.approx([0.015]))
+
+
+def test_unlimited_never_waits():
+    limiter = RateLimiter(0)
+    assert(limiter.unlimited)
+    assert(limiter.reserve(10 ** 12) == 0)
+    assert(limiter.chunk_size(8192000) == 8192000)
+
+
+def test_schedule_windows():
+    schedule = [{"start": "01:00", "end": "07:00", "limit": 0},
+                {"start": 1380, "end": "01:00", "limit": 1000}]
+    limiter = RateLimiter(5000000, schedule)
+
+    def limit_at(hour, minute):
+        return RateLimiter.scheduled_limit(limiter.limit, limiter.schedule,
+                                           datetime.time(hour, minute))
+
+    assert(limit_at(3, 0) == 0)
+    assert(limit_at(12, 0) == 5000000)
+    assert(limit_at(23, 30) == 1000)
+    assert(limit_at(0, 59) == 1000)
+    assert(limit_at(7, 0) == 5000000)
+
+
+def test_invalid_window():
+    with pytest.raises(ValueError):
+        RateLimiter(0, [{"start": "25:00", "end": "07:00"}])
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from types import SimpleNamespace
+import requests
+from hb_downloader.download_engine import DownloadEngine
+from hb_downloader.humble_api.humble_api import HumbleApi
+from hb_downloader.humble_api.retry_policy import CircuitBreaker
+from hb_downloader.humble_api.retry_policy import RetryPolicy
+
+
+def http_error(status_code, headers=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers or {})
+    return requests.HTTPError(response=response)
+
+
+def test_transient_errors_are_retried():
+    policy = RetryPolicy(retries=2)
+    assert(policy.should_retry(requests.ConnectionError(), 0))
+    assert(policy.should_retry(http_error(503), 1))
+    assert(not policy.should_retry(http_error(503), 2))
+    assert(not policy.should_retry(http_error(404), 0))
+    assert(not policy.should_retry(ValueError(), 0))
+    assert(policy.should_retry_status(502, 0))
+    assert(not policy.should_retry_status(200, 0))
+
+
+def test_delay_is_jittered_and_capped():
+    policy = RetryPolicy(retries=10, backoff=2.0)
+    policy.max_delay = 5
+    delays = [policy.delay(attempt) for attempt in range(10)]
+    assert(all(0 <= delay <= 5 for delay in delays))
+    assert(len(set(delays)) > 1)
+    assert(policy.delay(0, "4") >= 4)
+    assert(policy.delay(0, "3600") == 5)
+    assert(RetryPolicy.retry_after(http_error(429, {"Retry-After": "7"}))
+           == "7")
+
+
+def test_circuit_breaker_opens_after_threshold():
+    breaker = CircuitBreaker(threshold=2, cooldown=30)
+    assert(not breaker.record_failure("cdn"))
+    assert(breaker.record_failure("cdn"))
+    assert(25 < breaker.remaining("cdn") <= 30)
+    assert(breaker.remaining("other") == 0)
+
+    disabled = CircuitBreaker(threshold=0)
+    assert(not any(disabled.record_failure("cdn") for _ in range(10)))
+
+
+class FlakyDownload(object):
+    """ Stands in for a HumbleDownload failing a number of times. """
+
+    def __init__(self, failures):
+        self.filename = "flaky"
+        self.machine_name = self.product_name = self.subproduct_name = "x"
+        self.download_url = "https://dl.example.com/flaky"
+        self.humble_file_size = 10
+        self.humble_file_size_human = "10 bytes"
+        self.status_message = ""
+        self.failures = failures
+        self.calls = []
+
+    def download_file(self, resume=False):
+        self.calls.append(resume)
+        if len(self.calls) <= self.failures:
+            raise requests.ConnectionError("connection reset")
+
+
+def test_download_engine_retries_and_resumes(progress_tracker):
+    breaker = CircuitBreaker(threshold=5)
+    engine = DownloadEngine(retry_policy=RetryPolicy(retries=2, backoff=0),
+                            circuit_breaker=breaker)
+    recovered = FlakyDownload(2)
+    assert(engine.run([recovered]) == [])
+    assert(recovered.calls == [False, True, True])
+    assert(breaker.remaining("dl.example.com") == 0)
+
+    exhausted = FlakyDownload(5)
+    assert(engine.run([exhausted]) == [exhausted])
+    assert(len(exhausted.calls) == 3)
+    assert("connection reset" in exhausted.status_message)
+
+
+def test_api_request_retries_server_errors(monkeypatch):
+    statuses = [503, 502, 200]
+
+    def request(*args, **kwargs):
+        return SimpleNamespace(status_code=statuses.pop(0), headers={},
+                               close=lambda: None)
+
+    monkeypatch.setattr(HumbleApi, "retry_policy",
+                        RetryPolicy(retries=3, backoff=0))
+    api = HumbleApi("cookie")
+    monkeypatch.setattr(api.session, "request", request)
+    assert(api._request("GET", HumbleApi.ORDER_LIST_URL).status_code == 200)
+    assert(statuses == [])
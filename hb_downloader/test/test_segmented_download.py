@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import hashlib
+import json
+import os
+import threading
+import pytest
+import requests
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from hb_downloader.config_data import ConfigData
+from hb_downloader.segmented_download import SegmentedDownload
+
+content = os.urandom(100000)
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    """ Serves the test content, honoring byte ranges if asked to. """
+    honor_range = True
+    fail_probe = False
+    requested_ranges = []
+
+    def do_GET(self):
+        byte_range = self.headers.get("Range")
+        if byte_range == "bytes=0-0" and RangeHandler.fail_probe:
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if byte_range and RangeHandler.honor_range:
+            start, end = byte_range[6:].split("-")
+            start, end = int(start), int(end)
+            RangeHandler.requested_ranges.append((start, end))
+            self.send_response(206)
+            self.send_header("Content-Range", "bytes %d-%d/%d" %
+                             (start, end, len(content)))
+            body = content[start:end + 1]
+        else:
+            self.send_response(200)
+            body = content
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeDownload(object):
+    """ Stands in for a HumbleDownload. """
+
+    def __init__(self, url, full_filename):
+        self.filename = os.path.basename(full_filename)
+        self.full_filename = full_filename
+        self.download_url = url
+        self.humble_file_size = len(content)
+        self.humble_md5 = hashlib.md5(content).hexdigest()
+
+    def remove(self):
+        if os.path.exists(self.full_filename):
+            os.remove(self.full_filename)
+        SegmentedDownload.remove_state(self.full_filename)
+
+
+def serve():
+    server = HTTPServer(("127.0.0.1", 0), RangeHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, "http://127.0.0.1:%d/file.bin" % server.server_port
+
+
+def test_segmented_download(tmp_path, monkeypatch):
+    server, url = serve()
+    monkeypatch.setattr(ConfigData, "chunk_size", 4096)
+    monkeypatch.setattr(RangeHandler, "honor_range", True)
+    hd = FakeDownload(url, str(tmp_path / "file.bin"))
+
+    assert(SegmentedDownload(hd, 4).download())
+    with open(hd.full_filename, "rb") as f:
+        assert(f.read() == content)
+    assert(not SegmentedDownload.has_state(hd.full_filename))
+    server.shutdown()
+
+
+def test_segmented_download_resumes_missing_segments(tmp_path, monkeypatch):
+    server, url = serve()
+    monkeypatch.setattr(ConfigData, "chunk_size", 4096)
+    monkeypatch.setattr(RangeHandler, "honor_range", True)
+    hd = FakeDownload(url, str(tmp_path / "file.bin"))
+
+    # Pretend the first two of four segments were downloaded previously.
+    with open(hd.full_filename, "wb") as f:
+        f.write(content[:50000])
+        f.truncate(len(content))
+    with open(SegmentedDownload.state_filename(hd.full_filename), "w") as f:
+        json.dump({"size": len(content), "md5": hd.humble_md5,
+                   "segments": [[0, 24999], [25000, 49999],
+                                [50000, 74999], [75000, 99999]],
+                   "completed": [0, 1]}, f)
+
+    monkeypatch.setattr(RangeHandler, "requested_ranges", [])
+    assert(SegmentedDownload(hd, 4).download())
+    assert(sorted(r for r in RangeHandler.requested_ranges if r != (0, 0)) ==
+           [(50000, 74999), (75000, 99999)])
+    with open(hd.full_filename, "rb") as f:
+        assert(f.read() == content)
+    server.shutdown()
+
+
+def test_segmented_download_without_range_support(tmp_path, monkeypatch):
+    server, url = serve()
+    monkeypatch.setattr(RangeHandler, "honor_range", False)
+    hd = FakeDownload(url, str(tmp_path / "file.bin"))
+
+    download = SegmentedDownload(hd, 4)
+    closed = []
+    download.session.close = lambda: closed.append(True)
+    assert(not download.download())
+    assert(not os.path.exists(hd.full_filename))
+    # The connections are released even though nothing was downloaded.
+    assert(closed == [True])
+    server.shutdown()
+
+
+def test_failed_probe_keeps_completed_segments(tmp_path, monkeypatch):
+    server, url = serve()
+    monkeypatch.setattr(ConfigData, "chunk_size", 4096)
+    monkeypatch.setattr(RangeHandler, "honor_range", True)
+    monkeypatch.setattr(RangeHandler, "fail_probe", True)
+    hd = FakeDownload(url, str(tmp_path / "file.bin"))
+
+    with open(hd.full_filename, "wb") as f:
+        f.write(content[:50000])
+        f.truncate(len(content))
+    with open(SegmentedDownload.state_filename(hd.full_filename), "w") as f:
+        json.dump({"size": len(content), "md5": hd.humble_md5,
+                   "segments": [[0, 49999], [50000, 99999]],
+                   "completed": [0]}, f)
+
+    with pytest.raises(requests.HTTPError):
+        SegmentedDownload(hd, 2).download()
+    assert(os.path.exists(hd.full_filename))
+    assert(SegmentedDownload.has_state(hd.full_filename))
+
+    # Once the server recovers, only the missing segment is downloaded.
+    monkeypatch.setattr(RangeHandler, "fail_probe", False)
+    monkeypatch.setattr(RangeHandler, "requested_ranges", [])
+    assert(SegmentedDownload(hd, 2).download())
+    assert(sorted(r for r in RangeHandler.requested_ranges if r != (0, 0)) ==
+           [(50000, 99999)])
+    with open(hd.full_filename, "rb") as f:
+        assert(f.read() == content)
+    server.shutdown()
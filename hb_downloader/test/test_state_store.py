@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+from hb_downloader.humble_api.state_store import StateStore
+
+
+def test_record_is_trusted_until_file_changes(tmp_path):
+    store = StateStore(str(tmp_path / "state.sqlite"))
+    filename = str(tmp_path / "file.bin")
+    with open(filename, "wb") as f:
+        f.write(b"content")
+
+    store.record(filename, "0123456789abcdef0123456789abcdef")
+    assert(store.lookup(filename) == "0123456789abcdef0123456789abcdef")
+
+    with open(filename, "ab") as f:
+        f.write(b" changed")
+    assert(store.lookup(filename) == "")
+
+
+def test_import_md5_files(tmp_path):
+    store = StateStore(str(tmp_path / "state.sqlite"))
+    os.makedirs(str(tmp_path / "bundle"))
+    filename = str(tmp_path / "bundle" / "book.pdf")
+    with open(filename, "wb") as f:
+        f.write(b"content")
+    with open(filename + ".md5", "wb") as f:
+        f.write(b"0123456789abcdef0123456789abcdef *book.pdf")
+    with open(str(tmp_path / "bundle" / "orphan.pdf.md5"), "wb") as f:
+        f.write(b"fedcba9876543210fedcba9876543210 *orphan.pdf")
+
+    assert(store.import_md5_files(str(tmp_path)) == 1)
+    assert(store.lookup(filename) == "0123456789abcdef0123456789abcdef")
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import gzip
+import io
+import json
+import pytest
+import requests
+from hb_downloader.humble_api.exceptions.humble_exception import HumbleException
+from hb_downloader.humble_api.events import Events
+from hb_downloader.humble_api.humble_api import HumbleApi
+from hb_downloader.humble_api.retry_policy import RetryPolicy
+from hb_downloader.humble_api.traffic_archive import TrafficArchive
+
+SIGNED_URL = ("https://dl.example.com/game.zip?gamekey=secretkey&ttl=1900000000"
+              "&t=signature")
+
+
+def response(url, data):
+    result = requests.Response()
+    result.status_code = 200
+    result.url = url
+    result.encoding = "utf-8"
+    result.headers.update({"Content-Type": "application/json",
+                           "Set-Cookie": "_simpleauth_sess=secret"})
+    result._content = json.dumps(data).encode("utf-8")
+    return result
+
+
+def served(method, url, *args, **kwargs):
+    if url == HumbleApi.ORDER_LIST_URL:
+        return response(url, [{"gamekey": "abc"}])
+    return response(url, {
+            "product": {"machine_name": "bundle", "human_name": "Bundle"},
+            "subproducts": [{
+                "machine_name": "game", "payee": {},
+                "downloads": [{
+                    "machine_name": "game", "platform": "linux",
+                    "options_dict": {},
+                    "download_struct": [{"url": {"web": SIGNED_URL},
+                                         "md5": "0" * 32,
+                                         "file_size": 10}]}]}]})
+
+
+def offline(*args, **kwargs):
+    raise requests.ConnectionError("offline")
+
+
+def test_record_then_replay(tmp_path, monkeypatch):
+    archive_filename = str(tmp_path / "traffic.gz")
+    monkeypatch.setattr(HumbleApi, "order_cache", None)
+
+    monkeypatch.setattr(HumbleApi, "traffic_archive",
+                        TrafficArchive(archive_filename, TrafficArchive.RECORD))
+    api = HumbleApi("secret")
+    monkeypatch.setattr(api.session, "request", served)
+    assert(api.get_gamekeys() == ["abc"])
+    api.get_order("abc")
+
+    with gzip.open(archive_filename, "rt") as f:
+        recorded = f.read()
+    assert("secret" not in recorded)
+    assert("signature" not in recorded)
+    assert("ttl=1900000000" in recorded)
+
+    monkeypatch.setattr(HumbleApi, "traffic_archive",
+                        TrafficArchive(archive_filename, TrafficArchive.REPLAY))
+    api = HumbleApi("cookie")
+    monkeypatch.setattr(api.session, "request", offline)
+    assert(api.get_gamekeys() == ["abc"])
+    order = api.get_order("abc")
+    download_struct = order.subproducts[0].downloads[0].download_structs[0]
+    assert(download_struct.download_web ==
+           "https://dl.example.com/game.zip?ttl=1900000000")
+
+    with pytest.raises(HumbleException):
+        api.get_order("unknown")
+
+
+def test_retried_responses_are_not_recorded(tmp_path, monkeypatch):
+    archive_filename = str(tmp_path / "traffic.gz")
+    monkeypatch.setattr(HumbleApi, "order_cache", None)
+    monkeypatch.setattr(HumbleApi, "retry_policy", RetryPolicy(backoff=0))
+    monkeypatch.setattr(Events, "_callbacks", None)
+    unavailable = []
+
+    def unavailable_once(method, url, *args, **kwargs):
+        if not unavailable:
+            unavailable.append(url)
+            result = response(url, {})
+            result.status_code = 503
+            result.raw = io.BytesIO()
+            return result
+        return served(method, url)
+
+    monkeypatch.setattr(HumbleApi, "traffic_archive",
+                        TrafficArchive(archive_filename, TrafficArchive.RECORD))
+    api = HumbleApi("secret")
+    monkeypatch.setattr(api.session, "request", unavailable_once)
+    assert(api.get_gamekeys() == ["abc"])
+    assert(len(unavailable) == 1)
+
+    requests_seen = []
+    Events.on(Events.EVENT_API_REQUEST, requests_seen.append)
+    monkeypatch.setattr(HumbleApi, "traffic_archive",
+                        TrafficArchive(archive_filename, TrafficArchive.REPLAY))
+    api = HumbleApi("cookie")
+    monkeypatch.setattr(api.session, "request", offline)
+    assert(api.get_gamekeys() == ["abc"])
+    assert([status for _, status, _ in requests_seen] == [200])
+
+
+def test_scrub_url():
+    assert(TrafficArchive.scrub_url(SIGNED_URL) ==
+           "https://dl.example.com/game.zip?ttl=1900000000")
+    assert(TrafficArchive.scrub_url("https://www.example.com/a") ==
+           "https://www.example.com/a")